@@ -1,9 +1,31 @@
-from fastapi import FastAPI, HTTPException, Query
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Depends, HTTPException, Query
+from typing import Literal
 from fastapi.responses import FileResponse
 import sqlite3
-from main import run_etl_pipeline, DATABASE_FILE
-
-app = FastAPI()
+from main import run_blue_green_etl, run_blue_green_redrive, ensure_schema
+from data_processing.snapshot import RefreshInProgress
+from database import get_db
+from crud import etl as pokemon_repo
+from routers.etl import router as etl_router, check_sort_by
+from routers.similarity import router as similarity_router
+from routers.stats import router as stats_router
+from routers.admin import router as admin_router
+from routers.runs import router as runs_router
+from schemas import RedriveResult
+from constants import DATABASE_FILE
+
+
+@asynccontextmanager
+async def lifespan(app):
+    # Every query expects the current schema; upgrade an older serving database before the first request
+    if not ensure_schema():
+        raise RuntimeError(f"{DATABASE_FILE} is on an older schema and could not be migrated; "
+                           "run `python main.py --migrate`")
+    yield
+
+
+app = FastAPI(lifespan=lifespan)
 
 @app.get("/")
 async def root():
@@ -11,18 +33,11 @@ async def root():
 
 
 @app.get("/pokemon")
-async def get_pokemon():
-    conn = sqlite3.connect(DATABASE_FILE)
-    conn.row_factory = sqlite3.Row
-    cur = conn.cursor()
+async def get_pokemon(db: sqlite3.Connection = Depends(get_db)):
     try:
-        cur.execute("SELECT name FROM pokemon ORDER BY id")
-        rows = cur.fetchall()
-        return [row["name"] for row in rows]
+        return pokemon_repo.all_names(db)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        conn.close()
 
 
 # ✅ NEW: Pokémon Filtering API
@@ -31,57 +46,54 @@ async def filter_pokemon(
     is_evolved: bool | None = Query(None),
     hp_min: int | None = Query(None),
     attack_min: int | None = Query(None),
-    type_name: str | None = Query(None)
+    type_name: str | None = Query(None),
+    sort_by: str = Query("id", description="id, name or a stat name, e.g. speed"),
+    order: Literal["asc", "desc"] = Query("asc"),
+    limit: int | None = Query(None, ge=1),
+    db: sqlite3.Connection = Depends(get_db)
 ):
-    conn = sqlite3.connect(DATABASE_FILE)
-    conn.row_factory = sqlite3.Row
-    cur = conn.cursor()
-
+    check_sort_by(sort_by)
     try:
-        # Base query
-        query = """
-        SELECT DISTINCT p.name
-        FROM pokemon p
-        LEFT JOIN pokemon_stats s_hp ON p.id = s_hp.pokemon_id AND s_hp.stat_name = 'hp'
-        LEFT JOIN pokemon_stats s_atk ON p.id = s_atk.pokemon_id AND s_atk.stat_name = 'attack'
-        LEFT JOIN pokemon_types pt ON p.id = pt.pokemon_id
-        WHERE 1=1
-        """
-
-        params = []
-
-        if is_evolved is not None:
-            query += " AND p.is_evolved = ?"
-            params.append(1 if is_evolved else 0)
-
-        if hp_min is not None:
-            query += " AND s_hp.base_stat >= ?"
-            params.append(hp_min)
-
-        if attack_min is not None:
-            query += " AND s_atk.base_stat >= ?"
-            params.append(attack_min)
-
-        if type_name:
-            query += " AND pt.type_name = ?"
-            params.append(type_name.lower())
-
-        query += " ORDER BY p.id"
-
-        cur.execute(query, params)
-        rows = cur.fetchall()
-
-        return [row["name"] for row in rows]
-
+        # One fixed statement per sort order; unset filters are bound as NULL
+        return pokemon_repo.filter_names(db, is_evolved, hp_min, attack_min, type_name, sort_by, order, limit)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        conn.close()
 
 
+# Plain `def`: FastAPI runs these in its threadpool, so a refresh (network fetches, backoff
+# sleeps, VACUUM INTO, fsync) does not block the event loop serving other requests.
+# Refreshes hold the serving database's refresh lock; a second one meanwhile gets 409.
 @app.post("/etl/run-pipeline")
-async def run_pipeline():
+def run_pipeline():
     print("ETL Pipeline STARTED")
-    run_etl_pipeline()
+    # Build into a staging file and swap it in atomically; readers never see a partial refresh
+    try:
+        published = run_blue_green_etl()
+    except RefreshInProgress as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if not published:
+        print("ETL Pipeline FAILED")
+        raise HTTPException(status_code=500, detail="Pipeline failed; serving data left unchanged.")
     print("ETL Pipeline FINISHED")
     return {"detail": "Pipeline completed."}
+
+
+@app.post("/etl/dead-letters/redrive", response_model=RedriveResult)
+def redrive_dead_letters():
+    """Reprocess only the dead-lettered Pokémon, then swap the result in like a full run."""
+    try:
+        result = run_blue_green_redrive()
+    except RefreshInProgress as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if result is None:
+        raise HTTPException(status_code=500, detail="Re-drive failed; serving data left unchanged.")
+    return result
+
+
+# Pokémon detail/list endpoints served from the pre-rendered documents.
+# Included last so literal paths (/pokemon/filter, /pokemon/similar) win over /pokemon/{pokemon_id}.
+app.include_router(admin_router)
+app.include_router(runs_router)
+app.include_router(stats_router)
+app.include_router(similarity_router)
+app.include_router(etl_router)
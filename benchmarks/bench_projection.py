@@ -0,0 +1,94 @@
+"""
+Benchmark: full json.loads() vs project_json() on /pokemon/{id} payloads.
+
+Reports CPU time and peak traced memory per payload for both parsers.
+
+    python -m benchmarks.bench_projection                 # synthetic PokeAPI-shaped payload
+    python -m benchmarks.bench_projection pikachu.json    # a saved real response
+"""
+import json
+import sys
+import time
+import tracemalloc
+
+from data_processing.extract import POKEMON_FIELDS
+from data_processing.projection import project_json
+
+
+def synthetic_payload(moves=90, details_per_move=12, game_indices=20):
+    """A payload with the shape and rough size of a real /pokemon response."""
+    def named(kind, i):
+        return {"name": f"{kind}-{i}", "url": f"https://pokeapi.co/api/v2/{kind}/{i}/"}
+
+    sprite_set = {k: f"https://raw.githubusercontent.com/PokeAPI/sprites/{k}.png"
+                  for k in ("back_default", "back_shiny", "front_default", "front_shiny")}
+    return {
+        "abilities": [{"ability": named("ability", i), "is_hidden": i == 1, "slot": i + 1} for i in range(2)],
+        "base_experience": 112,
+        "forms": [named("pokemon-form", 25)],
+        "game_indices": [{"game_index": 84, "version": named("version", i)} for i in range(game_indices)],
+        "height": 4,
+        "held_items": [],
+        "id": 25,
+        "is_default": True,
+        "location_area_encounters": "https://pokeapi.co/api/v2/pokemon/25/encounters",
+        "moves": [
+            {
+                "move": named("move", m),
+                "version_group_details": [
+                    {"level_learned_at": d, "move_learn_method": named("move-learn-method", 1),
+                     "version_group": named("version-group", d)}
+                    for d in range(details_per_move)
+                ],
+            }
+            for m in range(moves)
+        ],
+        "name": "pikachu",
+        "order": 35,
+        "species": named("pokemon-species", 25),
+        "sprites": {**sprite_set, "other": {f"set-{i}": dict(sprite_set) for i in range(6)},
+                    "versions": {f"generation-{g}": {f"game-{v}": dict(sprite_set) for v in range(3)}
+                                 for g in range(8)}},
+        "stats": [{"base_stat": 35 + i, "effort": 0, "stat": named("stat", i)} for i in range(6)],
+        "types": [{"slot": 1, "type": named("type", 13)}],
+        "weight": 60,
+    }
+
+
+def measure(parse, payload, rounds):
+    start = time.process_time()
+    for _ in range(rounds):
+        parse(payload)
+    cpu_ms = (time.process_time() - start) * 1000 / rounds
+
+    tracemalloc.start()
+    parse(payload)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return cpu_ms, peak / 1024
+
+
+def main(argv):
+    if argv:
+        with open(argv[0], "rb") as f:
+            payload = f.read()
+    else:
+        payload = json.dumps(synthetic_payload(), separators=(",", ":")).encode("utf-8")
+
+    rounds = 200
+    assert project_json(payload, POKEMON_FIELDS) == {
+        k: v for k, v in json.loads(payload).items() if k in POKEMON_FIELDS
+    }
+
+    print(f"Payload: {len(payload) / 1024:.1f} KiB, {rounds} rounds")
+    print(f"{'parser':<14}{'CPU ms/payload':>16}{'peak KiB':>12}")
+    for label, parse in (
+        ("json.loads", lambda p: json.loads(p)),
+        ("project_json", lambda p: project_json(p, POKEMON_FIELDS)),
+    ):
+        cpu_ms, peak_kib = measure(parse, payload, rounds)
+        print(f"{label:<14}{cpu_ms:>16.3f}{peak_kib:>12.1f}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
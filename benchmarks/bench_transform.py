@@ -0,0 +1,73 @@
+"""
+Benchmark: per-record transform_pokemon_data() vs transform_batch(), in-process and
+across 1..N worker processes (transform_in_processes).
+
+Reports records/sec for each. Logging stays enabled (written to /dev/null) because the
+per-record log calls are part of what the batch API saves.
+
+    python -m benchmarks.bench_transform                  # 20 000 synthetic records
+    python -m benchmarks.bench_transform 100000 8         # record count, max workers
+"""
+import logging
+import os
+import sys
+import time
+
+from data_processing.records import RawPokemon
+from data_processing.transform import transform_pokemon_data, transform_batch, transform_in_processes
+from constants import STAT_NAMES, TRANSFORM_BATCH_SIZE
+
+
+def synthetic_records(count, family_size=3):
+    """RawPokemon records in evolution families of `family_size`, like a full PokeAPI rebuild."""
+    records = []
+    for i in range(count):
+        root = i - i % family_size
+        chain = tuple(f"poke{root + j}" for j in range(family_size))
+        records.append(RawPokemon(
+            id=i + 1,
+            name=f"poke{i}",
+            types=("grass", "poison") if i % 2 else ("fire",),
+            abilities=("overgrow", "chlorophyll"),
+            stats=tuple((name, 40 + (i * 7 + s) % 100) for s, name in enumerate(STAT_NAMES)),
+            evolution_chain=chain,
+            is_evolved=i % family_size > 0,
+            evolution_edges=tuple(zip(chain, chain[1:])),
+        ))
+    return records
+
+
+def measure(label, run, count):
+    start = time.perf_counter()
+    results = run()
+    elapsed = time.perf_counter() - start
+    assert len(results) == count and all(results)
+    print(f"{label:<28}{count / elapsed:>14,.0f}{elapsed:>10.2f}")
+    return results
+
+
+def main(argv):
+    count = int(argv[0]) if argv else 20000
+    max_workers = int(argv[1]) if len(argv) > 1 else (os.cpu_count() or 1)
+
+    devnull = open(os.devnull, "w")
+    for handler in logging.getLogger().handlers:
+        handler.setStream(devnull)
+
+    records = synthetic_records(count)
+    print(f"{count} records, batch size {TRANSFORM_BATCH_SIZE}, {os.cpu_count()} CPU(s)")
+    print(f"{'transform':<28}{'records/sec':>14}{'seconds':>10}")
+
+    baseline = measure("transform_pokemon_data", lambda: [transform_pokemon_data(r) for r in records], count)
+    batched = measure("transform_batch", lambda: transform_batch(records), count)
+    assert batched == baseline
+
+    workers = 1
+    while workers <= max_workers:
+        measure(f"transform_in_processes ×{workers}",
+                lambda: list(transform_in_processes(records, workers=workers)), count)
+        workers *= 2
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
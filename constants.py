@@ -1,5 +1,6 @@
 # constants.py
 # Centralised configuration for the Pokémon ETL pipeline
+import os
 
 # --------------------------------------------------------------------------- #
 # API & Network
@@ -12,16 +13,65 @@ EVOLUTION_CHAIN_ENDPOINT = "evolution-chain"
 
 
 API_DELAY = 0.5           # sleep between calls (rate-limit friendliness)
+LIST_PAGE_LIMIT = 1000    # ?limit= used when paging PokeAPI list endpoints
+REQUEST_TIMEOUT = 10      # seconds per HTTP request
+
+# Adaptive concurrency & retries (used when ADAPTIVE_CONCURRENCY is enabled)
+ADAPTIVE_CONCURRENCY = False
+INITIAL_CONCURRENCY = 2   # starting number of in-flight requests
+MAX_CONCURRENCY = 16      # ceiling for the AIMD controller (and worker threads)
+LATENCY_TOLERANCE = 2.0   # back off when latency exceeds baseline × this factor
+MAX_RETRIES = 4           # retries on 429/5xx, timeouts and connection errors
+RETRY_BASE_DELAY = 0.5    # seconds; doubled per attempt, with full jitter
+RETRY_MAX_DELAY = 30.0    # cap for a single backoff sleep
 
 # --------------------------------------------------------------------------- #
 # Database
 # --------------------------------------------------------------------------- #
-DATABASE_FILE = "db/pokemon_database.db"
+DATABASE_FILE = "db/pokemon_database.db"                 # serving snapshot read by the API
+STAGING_DATABASE_FILE = "db/pokemon_database.staging.db"  # blue/green ETL builds here, then swaps in
+DB_POOL_SIZE = 4                      # idle read-only connections kept by the API pool
+DB_STATEMENT_CACHE = 128              # compiled statements kept per pooled connection (crud.etl.STATEMENTS fits)
+ETL_STATE_FILE = "db/etl_state.db"    # operational state (work queue) kept apart from the dataset
+DB_BUSY_TIMEOUT_MS = 30000            # how long a worker waits on another worker's write lock
+RAW_ARCHIVE_FILE = "db/raw_archive.db"  # zlib-compressed raw payloads, replayable without the API
+PACKED_SNAPSHOT_FILE = "db/pokemon_snapshot.bin"  # read-only binary image of the serving data, mmap'd by API workers
+EXPORT_PACKED_SNAPSHOT = True         # write PACKED_SNAPSHOT_FILE after every publish
 
 # --------------------------------------------------------------------------- #
 # ETL Behaviour
 # --------------------------------------------------------------------------- #
 POKEMON_TO_FETCH = 12             # default for tests / dev; override in prod if needed
+EXTRACT_STRATEGY = "per_id"       # "per_id" (3 calls per Pokémon) or "chain" (bulk discovery)
+SHARD_WORKERS = os.cpu_count() or 4   # worker processes for the sharded ETL mode
+ARCHIVE_RAW_PAYLOADS = False      # store each extracted payload in RAW_ARCHIVE_FILE
+REPLAY_WORKERS = os.cpu_count() or 4  # transform processes when replaying the archive
+TRANSFORM_BATCH_SIZE = 256        # records per transform_batch() call sent to a worker process
+
+# Distributed work queue (cooperating ETL workers)
+QUEUE_BATCH_SIZE = 10             # IDs claimed per lease
+QUEUE_LEASE_SECONDS = 120         # lease expiry; crashed workers' items are re-claimed after this
+QUEUE_MAX_ATTEMPTS = 3            # attempts before an item is marked 'failed'
+QUEUE_POLL_INTERVAL = 5           # seconds to wait while other workers still hold leases
+
+# Dead-letter queue (failed Pokémon parked in ETL_STATE_FILE for targeted re-drive)
+DEAD_LETTER_PAYLOADS = True       # keep the extracted record so re-drive can skip the API call
+REDRIVE_MAX_ROUNDS = 3            # passes over still-failing items, with backoff in between
+
+# --------------------------------------------------------------------------- #
+# API / Analytics
+# --------------------------------------------------------------------------- #
+STAT_NAMES = ("hp", "attack", "defense", "special-attack", "special-defense", "speed")
+SIMILAR_DEFAULT_K = 5
+SIMILAR_MAX_K = 50
+BATCH_MAX_ITEMS = 1000  # IDs + names accepted by /pokemon/batch (and IDs by /pokemon/similar) in one request
+
+# Statement profiler (db_profiler.py); opt-in, applies to connections opened while enabled
+SQL_PROFILING = False
+SLOW_QUERY_MS = 50                        # statements at least this slow go to the slow-query log
+SLOW_QUERY_LOG_FILE = "db/slow_queries.log"
+PROFILE_TOP_DEFAULT = 20                  # statements returned by GET /admin/queries
+ADMIN_TOKEN = None                        # if set, /admin requests must send it as X-Admin-Token
 
 # --------------------------------------------------------------------------- #
 # Logging (shared format)
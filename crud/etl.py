@@ -0,0 +1,359 @@
+import json
+import logging
+from typing import NamedTuple
+
+from data_processing.packed_snapshot import current_snapshot
+from constants import STAT_NAMES, LOG_FORMAT, LOG_LEVEL
+
+logging.basicConfig(level=getattr(logging, LOG_LEVEL), format=LOG_FORMAT)
+
+
+# Read access for both API surfaces (app.py and routers/): the serving snapshot through
+# get_db, and the ETL state database (run ledger, dead letters) through get_state_db.
+# Every statement is one of a fixed set: optional filters are bound as NULL instead of
+# appended, and LIMIT is always bound (-1 = no limit), so whatever combination a request
+# uses, the SQL text is identical and sqlite3 reuses the statement it compiled the first
+# time on that connection. The set stays well inside DB_STATEMENT_CACHE.
+# Point lookups (documents, names, batches) are served from the memory-mapped packed
+# snapshot instead when one matching the connection's database has been exported.
+
+SORT_COLUMNS = {"id": "p.id", "name": "p.name"}
+SORT_KEYS = (*SORT_COLUMNS, *STAT_NAMES)
+
+# A stat ordering walks idx_pokemon_stats_stat (stat_id, base_stat) or its DESC twin in
+# order, ties broken by pokemon_id, so with a LIMIT SQLite stops after K rows instead of
+# sorting every Pokémon
+_STAT_SORT_JOIN = """
+    JOIN pokemon_stats s_sort ON s_sort.pokemon_id = p.id
+        AND s_sort.stat_id = (SELECT id FROM stats WHERE name = :sort_stat)
+"""
+
+_TYPE_FILTER = """
+    (:type IS NULL OR p.id IN (
+        SELECT pokemon_id FROM pokemon_types
+        WHERE type_id = (SELECT id FROM types WHERE name = :type)
+    ))
+"""
+
+_LIST_DOCS = """
+    SELECT d.doc FROM pokemon p JOIN pokemon_docs d ON d.pokemon_id = p.id {join}
+    WHERE (:search IS NULL OR p.name LIKE :search) AND {type_filter}
+    ORDER BY {order_by} LIMIT :limit
+"""
+
+_FILTER_NAMES = """
+    SELECT p.name
+    FROM pokemon p
+    {join}
+    LEFT JOIN pokemon_stats s_hp ON p.id = s_hp.pokemon_id
+        AND s_hp.stat_id = (SELECT id FROM stats WHERE name = 'hp')
+    LEFT JOIN pokemon_stats s_atk ON p.id = s_atk.pokemon_id
+        AND s_atk.stat_id = (SELECT id FROM stats WHERE name = 'attack')
+    WHERE (:is_evolved IS NULL OR p.is_evolved = :is_evolved)
+      AND (:hp_min IS NULL OR s_hp.base_stat >= :hp_min)
+      AND (:attack_min IS NULL OR s_atk.base_stat >= :attack_min)
+      AND {type_filter}
+    ORDER BY {order_by} LIMIT :limit
+"""
+
+
+def _sorted_variants(name, template):
+    """One statement per (sort kind, direction): id, name or stat × asc/desc."""
+    variants = {}
+    for kind in ("id", "name", "stat"):
+        for direction in ("asc", "desc"):
+            if kind == "stat":
+                join, order_by = _STAT_SORT_JOIN, f"s_sort.base_stat {direction.upper()}, s_sort.pokemon_id"
+            else:
+                join, order_by = "", f"{SORT_COLUMNS[kind]} {direction.upper()}"
+            variants[(name, kind, direction)] = template.format(
+                join=join, order_by=order_by, type_filter=_TYPE_FILTER
+            )
+    return variants
+
+
+STATEMENTS = {
+    **_sorted_variants("list_docs", _LIST_DOCS),
+    **_sorted_variants("filter_names", _FILTER_NAMES),
+    "all_names": "SELECT name FROM pokemon ORDER BY id",
+    "doc": "SELECT doc FROM pokemon_docs WHERE pokemon_id = ?",
+    "pokemon": "SELECT id, name, is_evolved FROM pokemon WHERE id = ?",
+    "types": """
+        SELECT t.name FROM pokemon_types pt JOIN types t ON t.id = pt.type_id
+        WHERE pt.pokemon_id = ?
+    """,
+    "abilities": """
+        SELECT a.name FROM pokemon_abilities pa JOIN abilities a ON a.id = pa.ability_id
+        WHERE pa.pokemon_id = ?
+    """,
+    "stats": """
+        SELECT s.name, ps.base_stat FROM pokemon_stats ps JOIN stats s ON s.id = ps.stat_id
+        WHERE ps.pokemon_id = ?
+    """,
+    # Find the Pokémon's chain through idx_evolution_links_name, then read all its links
+    "evolution_chain": """
+        SELECT el.pokemon_name, el.stage FROM evolution_links el
+        WHERE el.chain_id = (SELECT chain_id FROM evolution_links WHERE pokemon_name = ? LIMIT 1)
+        ORDER BY el.stage
+    """,
+    # json_each() turns each list into a table; both IN lookups use an index (rowid / name)
+    "batch": """
+        SELECT p.id, p.name, d.doc
+        FROM pokemon p LEFT JOIN pokemon_docs d ON d.pokemon_id = p.id
+        WHERE p.id IN (SELECT value FROM json_each(?))
+           OR p.name IN (SELECT value FROM json_each(?))
+    """,
+    "ancestors": """
+        SELECT c.ancestor, c.depth FROM pokemon p
+        JOIN evolution_closure c ON c.descendant = p.name AND c.depth > 0
+        WHERE p.id = ?
+        ORDER BY c.depth
+    """,
+    "descendants": """
+        SELECT c.descendant, c.depth FROM pokemon p
+        JOIN evolution_closure c ON c.ancestor = p.name AND c.depth > 0
+        WHERE p.id = ?
+        ORDER BY c.depth, c.descendant
+    """,
+    "family": """
+        SELECT m.descendant, m.depth, p.ancestor AS parent
+        FROM evolution_closure m
+        LEFT JOIN evolution_closure p ON p.descendant = m.descendant AND p.depth = 1
+        WHERE m.ancestor = (
+            SELECT c.ancestor FROM evolution_closure c
+            WHERE c.descendant = (SELECT name FROM pokemon WHERE id = ?)
+            ORDER BY c.depth DESC LIMIT 1
+        )
+        ORDER BY m.depth, m.descendant
+    """,
+    "exists": "SELECT 1 FROM pokemon WHERE id = ?",
+    # Aggregate tables maintained by load_pokemon(): cost grows with types × stats, not Pokémon
+    "type_aggregates": """
+        SELECT t.name, ta.pokemon_count, ta.evolved_count,
+               s.name, tsa.pokemon_count, tsa.total, tsa.min_stat, tsa.max_stat
+        FROM type_aggregates ta
+        JOIN types t ON t.id = ta.type_id
+        LEFT JOIN type_stat_aggregates tsa ON tsa.type_id = ta.type_id
+        LEFT JOIN stats s ON s.id = tsa.stat_id
+        ORDER BY t.name, s.id
+    """,
+    "overall_aggregates": """
+        SELECT oa.pokemon_count, oa.evolved_count, (SELECT COUNT(*) FROM type_aggregates)
+        FROM overall_aggregates oa WHERE oa.id = 1
+    """,
+    "stat_aggregates": """
+        SELECT s.name, sa.pokemon_count, sa.total, sa.min_stat, sa.max_stat
+        FROM stat_aggregates sa JOIN stats s ON s.id = sa.stat_id
+        ORDER BY s.id
+    """,
+    # ETL state database
+    "runs": """
+        SELECT * FROM etl_runs WHERE (:strategy IS NULL OR strategy = :strategy)
+        ORDER BY id DESC LIMIT :limit
+    """,
+    "run": "SELECT * FROM etl_runs WHERE id = ?",
+    "dead_letters": """
+        SELECT pokemon_id, stage, error_class, error, attempts, payload IS NOT NULL AS has_payload,
+               first_failed_at, last_failed_at
+        FROM dead_letters
+        WHERE (:stage IS NULL OR stage = :stage)
+        ORDER BY first_failed_at, pokemon_id LIMIT :limit
+    """,
+}
+
+
+class PokemonRecord(NamedTuple):
+    """One Pokémon assembled from the normalised tables (snapshots without documents)."""
+    id: int
+    name: str
+    is_evolved: bool
+    types: tuple            # type names
+    abilities: tuple        # ability names
+    stats: tuple            # (stat_name, base_stat) pairs
+    evolution_chain: tuple  # (species name, stage) pairs, root first
+
+
+class Relative(NamedTuple):
+    name: str
+    depth: int
+
+
+class FamilyRow(NamedTuple):
+    name: str
+    depth: int              # 0 for the root of the tree
+    parent: str | None
+
+
+class StatAggregate(NamedTuple):
+    stat_name: str
+    count: int              # Pokémon with this stat
+    total: int
+    min: int
+    max: int
+
+
+class TypeAggregate(NamedTuple):
+    type_name: str
+    pokemon_count: int
+    evolved_count: int
+    stats: tuple            # StatAggregate per stat, in stat order
+
+
+class Overview(NamedTuple):
+    pokemon_count: int
+    evolved_count: int
+    type_count: int
+    stats: tuple            # StatAggregate per stat, in stat order
+
+
+def _sorted_statement(name, sort_by, order):
+    if sort_by not in SORT_KEYS:
+        raise ValueError(f"sort_by must be one of: {', '.join(SORT_KEYS)}")
+    kind = sort_by if sort_by in SORT_COLUMNS else "stat"
+    return STATEMENTS[(name, kind, "desc" if order == "desc" else "asc")]
+
+
+def list_docs(db, search=None, type_name=None, sort_by="id", order="asc", limit=None):
+    """Pre-rendered documents of the matching Pokémon, as JSON strings. Raises ValueError on an unknown sort_by."""
+    sql = _sorted_statement("list_docs", sort_by, order)
+    params = {
+        "search": f"%{search.lower()}%" if search else None,
+        "type": type_name.lower() if type_name else None,
+        "sort_stat": sort_by,
+        "limit": -1 if limit is None else limit,
+    }
+    return [row[0] for row in db.execute(sql, params)]
+
+
+def filter_names(db, is_evolved=None, hp_min=None, attack_min=None, type_name=None,
+                 sort_by="id", order="asc", limit=None):
+    """Names of the Pokémon matching every given filter. Raises ValueError on an unknown sort_by."""
+    sql = _sorted_statement("filter_names", sort_by, order)
+    params = {
+        "is_evolved": None if is_evolved is None else int(is_evolved),
+        "hp_min": hp_min,
+        "attack_min": attack_min,
+        "type": type_name.lower() if type_name else None,
+        "sort_stat": sort_by,
+        "limit": -1 if limit is None else limit,
+    }
+    return [row[0] for row in db.execute(sql, params)]
+
+
+def all_names(db):
+    packed = current_snapshot(db)
+    if packed:
+        return packed.names()
+    return [row[0] for row in db.execute(STATEMENTS["all_names"])]
+
+
+def get_doc(db, pokemon_id):
+    """The pre-rendered JSON document of one Pokémon, or None."""
+    packed = current_snapshot(db)
+    if packed:
+        row = packed.row_of(pokemon_id)
+        return packed.doc(row) if row is not None else None
+    row = db.execute(STATEMENTS["doc"], (pokemon_id,)).fetchone()
+    return row[0] if row else None
+
+
+def get_record(db, pokemon_id):
+    """Assemble a PokemonRecord from the normalised tables, or None if the Pokémon is not stored."""
+    row = db.execute(STATEMENTS["pokemon"], (pokemon_id,)).fetchone()
+    if not row:
+        return None
+    return PokemonRecord(
+        id=row[0],
+        name=row[1],
+        is_evolved=bool(row[2]),
+        types=tuple(r[0] for r in db.execute(STATEMENTS["types"], (pokemon_id,))),
+        abilities=tuple(r[0] for r in db.execute(STATEMENTS["abilities"], (pokemon_id,))),
+        stats=tuple((r[0], r[1]) for r in db.execute(STATEMENTS["stats"], (pokemon_id,))),
+        evolution_chain=tuple((r[0], r[1]) for r in db.execute(STATEMENTS["evolution_chain"], (row[1],))),
+    )
+
+
+def batch_rows(db, ids, names):
+    """(id, name, doc) for every stored Pokémon matching one of `ids` or `names`, in one query."""
+    packed = current_snapshot(db)
+    if packed:
+        rows = {packed.row_of(pid) for pid in ids} | {packed.row_of_name(name) for name in names}
+        rows.discard(None)
+        return [(int(packed.ids[row]), packed.name(row), packed.doc(row)) for row in sorted(rows)]
+    return [tuple(row) for row in db.execute(STATEMENTS["batch"], (json.dumps(ids), json.dumps(names)))]
+
+
+def exists(db, pokemon_id):
+    return db.execute(STATEMENTS["exists"], (pokemon_id,)).fetchone() is not None
+
+
+def ancestors(db, pokemon_id):
+    """Everything `pokemon_id` evolves from, nearest first."""
+    return [Relative._make(row) for row in db.execute(STATEMENTS["ancestors"], (pokemon_id,))]
+
+
+def descendants(db, pokemon_id):
+    """Everything `pokemon_id` can evolve into, nearest first."""
+    return [Relative._make(row) for row in db.execute(STATEMENTS["descendants"], (pokemon_id,))]
+
+
+def family(db, pokemon_id):
+    """The evolution tree `pokemon_id` belongs to, root first, each member with its parent."""
+    return [FamilyRow._make(row) for row in db.execute(STATEMENTS["family"], (pokemon_id,))]
+
+
+def type_aggregates(db):
+    """Per-type counts and stat aggregates, ordered by type name."""
+    by_type = {}
+    for type_name, pokemon_count, evolved_count, *stat in db.execute(STATEMENTS["type_aggregates"]):
+        entry = by_type.get(type_name)
+        if entry is None:
+            entry = by_type[type_name] = TypeAggregate(type_name, pokemon_count, evolved_count, [])
+        if stat[0] is not None:
+            entry.stats.append(StatAggregate._make(stat))
+    return [entry._replace(stats=tuple(entry.stats)) for entry in by_type.values()]
+
+
+def overview(db):
+    """Totals across all Pokémon from the overall and per-stat aggregates."""
+    row = db.execute(STATEMENTS["overall_aggregates"]).fetchone()
+    pokemon_count, evolved_count, type_count = row if row else (0, 0, 0)
+    stats = tuple(StatAggregate._make(r) for r in db.execute(STATEMENTS["stat_aggregates"]))
+    return Overview(pokemon_count, evolved_count, type_count, stats)
+
+
+def _dicts(cursor):
+    columns = [column[0] for column in cursor.description]
+    return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+
+def _run_dict(run):
+    """One etl_runs row (column → value) with config decoded and derived rates added."""
+    run["config"] = json.loads(run["config"])
+    finished = run["finished_at"]
+    run["duration_seconds"] = round(finished - run["started_at"], 3) if finished else None
+
+    lookups = (run["cache_hits"] or 0) + (run["cache_misses"] or 0)
+    run["cache_hit_rate"] = round(run["cache_hits"] / lookups, 4) if lookups else None
+    loaded = run["success_count"] or 0
+    run["pokemon_per_second"] = (
+        round(loaded / run["duration_seconds"], 3) if run["duration_seconds"] else None
+    )
+    return run
+
+
+def list_runs(db, limit=20, strategy=None):
+    """Most recent ETL runs first, as dicts (see _run_dict)."""
+    cursor = db.execute(STATEMENTS["runs"], {"strategy": strategy or None, "limit": limit})
+    return [_run_dict(run) for run in _dicts(cursor)]
+
+
+def get_run(db, run_id):
+    runs = _dicts(db.execute(STATEMENTS["run"], (run_id,)))
+    return _run_dict(runs[0]) if runs else None
+
+
+def list_dead_letters(db, stage=None, limit=None):
+    """Parked items as dicts (without the payload), oldest failure first."""
+    params = {"stage": stage or None, "limit": -1 if limit is None else limit}
+    return _dicts(db.execute(STATEMENTS["dead_letters"], params))
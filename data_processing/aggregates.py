@@ -0,0 +1,196 @@
+import logging
+
+from constants import LOG_FORMAT, LOG_LEVEL
+
+logging.basicConfig(level=getattr(logging, LOG_LEVEL), format=LOG_FORMAT)
+
+
+# Running totals behind /stats/*. Averages are total / pokemon_count at read time, so
+# every table can be adjusted by a delta instead of re-aggregated.
+AGGREGATE_TABLES = [
+    ("overall_aggregates", """
+        CREATE TABLE IF NOT EXISTS overall_aggregates (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            pokemon_count INTEGER NOT NULL,
+            evolved_count INTEGER NOT NULL
+        );
+    """),
+    ("type_aggregates", """
+        CREATE TABLE IF NOT EXISTS type_aggregates (
+            type_id INTEGER PRIMARY KEY,
+            pokemon_count INTEGER NOT NULL,
+            evolved_count INTEGER NOT NULL,
+            FOREIGN KEY (type_id) REFERENCES types (id)
+        );
+    """),
+    ("stat_aggregates", """
+        CREATE TABLE IF NOT EXISTS stat_aggregates (
+            stat_id INTEGER PRIMARY KEY,
+            pokemon_count INTEGER NOT NULL,
+            total INTEGER NOT NULL,
+            min_stat INTEGER,
+            max_stat INTEGER,
+            FOREIGN KEY (stat_id) REFERENCES stats (id)
+        );
+    """),
+    ("type_stat_aggregates", """
+        CREATE TABLE IF NOT EXISTS type_stat_aggregates (
+            type_id INTEGER NOT NULL,
+            stat_id INTEGER NOT NULL,
+            pokemon_count INTEGER NOT NULL,
+            total INTEGER NOT NULL,
+            min_stat INTEGER,
+            max_stat INTEGER,
+            PRIMARY KEY (type_id, stat_id),
+            FOREIGN KEY (type_id) REFERENCES types (id),
+            FOREIGN KEY (stat_id) REFERENCES stats (id)
+        ) WITHOUT ROWID;
+    """),
+]
+
+# Full recomputation from the normalised tables; used for backfills and after bulk merges
+REBUILD_STATEMENTS = [
+    ("overall_aggregates", "DELETE FROM overall_aggregates"),
+    ("overall_aggregates", """
+        INSERT INTO overall_aggregates (id, pokemon_count, evolved_count)
+        SELECT 1, COUNT(*), COALESCE(SUM(is_evolved != 0), 0) FROM pokemon
+    """),
+    ("type_aggregates", "DELETE FROM type_aggregates"),
+    ("type_aggregates", """
+        INSERT INTO type_aggregates (type_id, pokemon_count, evolved_count)
+        SELECT pt.type_id, COUNT(*), SUM(p.is_evolved != 0)
+        FROM pokemon_types pt JOIN pokemon p ON p.id = pt.pokemon_id
+        GROUP BY pt.type_id
+    """),
+    ("stat_aggregates", "DELETE FROM stat_aggregates"),
+    ("stat_aggregates", """
+        INSERT INTO stat_aggregates (stat_id, pokemon_count, total, min_stat, max_stat)
+        SELECT stat_id, COUNT(*), SUM(base_stat), MIN(base_stat), MAX(base_stat)
+        FROM pokemon_stats GROUP BY stat_id
+    """),
+    ("type_stat_aggregates", "DELETE FROM type_stat_aggregates"),
+    ("type_stat_aggregates", """
+        INSERT INTO type_stat_aggregates (type_id, stat_id, pokemon_count, total, min_stat, max_stat)
+        SELECT pt.type_id, ps.stat_id, COUNT(*), SUM(ps.base_stat), MIN(ps.base_stat), MAX(ps.base_stat)
+        FROM pokemon_types pt JOIN pokemon_stats ps ON ps.pokemon_id = pt.pokemon_id
+        GROUP BY pt.type_id, ps.stat_id
+    """),
+]
+
+
+def rebuild_aggregates(cursor):
+    """Recompute every aggregate table from scratch (caller commits)."""
+    for table_name, sql in REBUILD_STATEMENTS:
+        cursor.execute(sql)
+    logging.debug("Rebuilt aggregate tables.")
+
+
+def stored_contribution(cursor, pokemon_id):
+    """
+    Read what one stored Pokémon currently contributes to the aggregates:
+    (is_evolved, type_ids, {stat_id: base_stat}), or None if it is not stored.
+    """
+    row = cursor.execute("SELECT is_evolved FROM pokemon WHERE id = ?", (pokemon_id,)).fetchone()
+    if not row:
+        return None
+    type_ids = {r[0] for r in cursor.execute("SELECT type_id FROM pokemon_types WHERE pokemon_id = ?", (pokemon_id,))}
+    stats = dict(cursor.execute("SELECT stat_id, base_stat FROM pokemon_stats WHERE pokemon_id = ?", (pokemon_id,)).fetchall())
+    return bool(row[0]), type_ids, stats
+
+
+def _stat_deltas(groups, sign, values):
+    """Accumulate [count, total, added values, removed values] per group key."""
+    for key, value in values:
+        delta = groups.setdefault(key, [0, 0, [], []])
+        delta[0] += sign
+        delta[1] += sign * value
+        delta[2 if sign > 0 else 3].append(value)
+
+
+def apply_aggregate_delta(cursor, old, new):
+    """
+    Move the aggregates from a Pokémon's `old` contribution to its `new` one (either may be
+    None), touching only the types and stats involved. Must run after the base tables hold
+    the new rows: a removed value that was a group's min or max is re-read from them.
+    """
+    count_delta = (1 if new else 0) - (1 if old else 0)
+    evolved_delta = (1 if new and new[0] else 0) - (1 if old and old[0] else 0)
+    if count_delta or evolved_delta:
+        cursor.execute("""
+            INSERT INTO overall_aggregates (id, pokemon_count, evolved_count) VALUES (1, ?, ?)
+            ON CONFLICT (id) DO UPDATE SET
+                pokemon_count = pokemon_count + excluded.pokemon_count,
+                evolved_count = evolved_count + excluded.evolved_count
+        """, (count_delta, evolved_delta))
+
+    type_deltas = {}
+    stat_groups = {}
+    type_stat_groups = {}
+    for contribution, sign in ((old, -1), (new, 1)):
+        if not contribution:
+            continue
+        is_evolved, type_ids, stats = contribution
+        for type_id in type_ids:
+            delta = type_deltas.setdefault(type_id, [0, 0])
+            delta[0] += sign
+            delta[1] += sign if is_evolved else 0
+        _stat_deltas(stat_groups, sign, stats.items())
+        _stat_deltas(type_stat_groups, sign,
+                     (((type_id, stat_id), value) for type_id in type_ids for stat_id, value in stats.items()))
+
+    type_rows = [(type_id, count, evolved) for type_id, (count, evolved) in type_deltas.items() if count or evolved]
+    if type_rows:
+        cursor.executemany("""
+            INSERT INTO type_aggregates (type_id, pokemon_count, evolved_count) VALUES (?, ?, ?)
+            ON CONFLICT (type_id) DO UPDATE SET
+                pokemon_count = pokemon_count + excluded.pokemon_count,
+                evolved_count = evolved_count + excluded.evolved_count
+        """, type_rows)
+        cursor.execute("DELETE FROM type_aggregates WHERE pokemon_count <= 0")
+
+    _apply_stat_groups(cursor, "stat_aggregates", ("stat_id",), stat_groups,
+                       "SELECT MIN(base_stat), MAX(base_stat) FROM pokemon_stats WHERE stat_id = ?")
+    _apply_stat_groups(cursor, "type_stat_aggregates", ("type_id", "stat_id"),
+                       type_stat_groups,
+                       """
+                       SELECT MIN(ps.base_stat), MAX(ps.base_stat)
+                       FROM pokemon_types pt JOIN pokemon_stats ps
+                           ON ps.pokemon_id = pt.pokemon_id AND ps.stat_id = ?
+                       WHERE pt.type_id = ?
+                       """)
+
+
+def _apply_stat_groups(cursor, table, key_columns, groups, bounds_sql):
+    """Upsert count/total/min/max deltas into one stat aggregate table."""
+    keys = ", ".join(key_columns)
+    where = " AND ".join(f"{column} = ?" for column in key_columns)
+    rows = []
+    rescan = []
+    for key, (count, total, added, removed) in groups.items():
+        if not (count or total or added != removed):
+            continue
+        key = key if isinstance(key, tuple) else (key,)
+        rows.append((*key, count, total, min(added, default=None), max(added, default=None)))
+        if removed and sorted(added) != sorted(removed):
+            rescan.append((key, min(removed), max(removed)))
+
+    if not rows:
+        return
+    cursor.executemany(f"""
+        INSERT INTO {table} ({keys}, pokemon_count, total, min_stat, max_stat)
+        VALUES ({", ".join("?" * len(key_columns))}, ?, ?, ?, ?)
+        ON CONFLICT ({keys}) DO UPDATE SET
+            pokemon_count = pokemon_count + excluded.pokemon_count,
+            total = total + excluded.total,
+            min_stat = COALESCE(MIN(min_stat, excluded.min_stat), min_stat),
+            max_stat = COALESCE(MAX(max_stat, excluded.max_stat), max_stat)
+    """, rows)
+
+    # Removing a value can only loosen a bound it sat on; re-read just those groups
+    for key, removed_min, removed_max in rescan:
+        current = cursor.execute(f"SELECT min_stat, max_stat FROM {table} WHERE {where}", key).fetchone()
+        if current and (current[0] is None or current[0] >= removed_min or current[1] <= removed_max):
+            # bounds_sql takes the stat id first, then the type id
+            cursor.execute(f"UPDATE {table} SET (min_stat, max_stat) = ({bounds_sql}) WHERE {where}",
+                           (*reversed(key), *key))
+    cursor.execute(f"DELETE FROM {table} WHERE pokemon_count <= 0")
@@ -0,0 +1,94 @@
+import json
+import logging
+import zlib
+from time import time
+from sqlite3 import Error
+
+from data_processing.records import RawPokemon
+from data_processing.transform import transform_pokemon_data, transform_batch
+from constants import LOG_FORMAT, LOG_LEVEL
+
+logging.basicConfig(level=getattr(logging, LOG_LEVEL), format=LOG_FORMAT)
+
+
+def create_archive(conn):
+    """Create the raw-payload archive table. Returns True on success."""
+    if not conn:
+        logging.error("Cannot create archive: Database connection is None.")
+        return False
+
+    try:
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS raw_payloads (
+                pokemon_id INTEGER PRIMARY KEY,
+                payload BLOB NOT NULL,
+                fetched_at REAL NOT NULL
+            )
+        """)
+        conn.commit()
+        logging.info("Table 'raw_payloads' created or already exists.")
+        return True
+    except Error as e:
+        logging.error(f"Failed to create archive: {e}")
+        conn.rollback()
+        return False
+
+
+def encode_payload(raw: RawPokemon) -> bytes:
+    """Serialise a RawPokemon to zlib-compressed JSON."""
+    return zlib.compress(json.dumps(raw.to_dict(), separators=(",", ":")).encode("utf-8"))
+
+
+def decode_payload(blob: bytes) -> RawPokemon:
+    return RawPokemon.from_dict(json.loads(zlib.decompress(blob)))
+
+
+def archive_payload(conn, raw: RawPokemon):
+    """Store (or replace) the raw payload for one Pokémon. Returns True on success."""
+    try:
+        conn.execute(
+            "INSERT OR REPLACE INTO raw_payloads (pokemon_id, payload, fetched_at) VALUES (?, ?, ?)",
+            (raw.id, encode_payload(raw), time())
+        )
+        conn.commit()
+        return True
+    except Error as e:
+        logging.error(f"Failed to archive payload for Pokémon {raw.id}: {e}")
+        conn.rollback()
+        return False
+
+
+def iter_archived(conn):
+    """Yield (pokemon_id, compressed payload) for every archived Pokémon, in ID order."""
+    yield from conn.execute("SELECT pokemon_id, payload FROM raw_payloads ORDER BY pokemon_id")
+
+
+def transform_archived(item):
+    """
+    Worker entry point for replay: decode one (pokemon_id, blob) pair and transform it.
+    Returns (pokemon_id, TransformedPokemon or None).
+    """
+    pokemon_id, blob = item
+    try:
+        return pokemon_id, transform_pokemon_data(decode_payload(blob))
+    except (zlib.error, ValueError, KeyError) as e:
+        logging.error(f"Corrupt archived payload for Pokémon {pokemon_id}: {e}")
+        return pokemon_id, None
+
+
+def transform_archived_batch(items):
+    """
+    Worker entry point for batched replay: decode a list of (pokemon_id, blob) pairs and
+    transform them with one transform_batch() call. Returns [(pokemon_id, TransformedPokemon or None)].
+    """
+    results = {}
+    decoded = []
+    for pokemon_id, blob in items:
+        try:
+            decoded.append(decode_payload(blob))
+        except (zlib.error, ValueError, KeyError) as e:
+            logging.error(f"Corrupt archived payload for Pokémon {pokemon_id}: {e}")
+            results[pokemon_id] = None
+    for raw, transformed in zip(decoded, transform_batch(decoded)):
+        results[raw.id] = transformed
+    return [(pokemon_id, results.get(pokemon_id)) for pokemon_id, _ in items]
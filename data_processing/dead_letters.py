@@ -0,0 +1,110 @@
+import logging
+import zlib
+from time import time
+from sqlite3 import Error
+
+from data_processing.archive import encode_payload, decode_payload
+from data_processing.records import RawPokemon
+from constants import LOG_FORMAT, LOG_LEVEL
+
+logging.basicConfig(level=getattr(logging, LOG_LEVEL), format=LOG_FORMAT)
+
+
+DEAD_LETTER_STAGES = ("extract", "transform", "load")
+
+
+def create_dead_letters(conn):
+    """Create the dead-letter table for Pokémon that failed an ETL stage. Returns True on success."""
+    if not conn:
+        logging.error("Cannot create dead-letter table: Database connection is None.")
+        return False
+
+    try:
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS dead_letters (
+                pokemon_id INTEGER PRIMARY KEY,
+                stage TEXT NOT NULL CHECK (stage IN ('extract', 'transform', 'load')),
+                error_class TEXT NOT NULL,
+                error TEXT,
+                attempts INTEGER NOT NULL DEFAULT 1,
+                payload BLOB,
+                first_failed_at REAL NOT NULL,
+                last_failed_at REAL NOT NULL
+            )
+        """)
+        conn.commit()
+        logging.info("Table 'dead_letters' created or already exists.")
+        return True
+    except Error as e:
+        logging.error(f"Failed to create dead-letter table: {e}")
+        conn.rollback()
+        return False
+
+
+def record_dead_letter(conn, pokemon_id, stage, error_class, error=None, raw: RawPokemon = None):
+    """
+    Park a failed Pokémon, or bump the attempt count of one already parked. `raw` (the
+    extracted record) is stored when available so a re-drive can skip the API call.
+    Returns True on success.
+    """
+    now = time()
+    try:
+        conn.execute(
+            """
+            INSERT INTO dead_letters
+                (pokemon_id, stage, error_class, error, attempts, payload, first_failed_at, last_failed_at)
+            VALUES (?, ?, ?, ?, 1, ?, ?, ?)
+            ON CONFLICT (pokemon_id) DO UPDATE SET
+                stage = excluded.stage,
+                error_class = excluded.error_class,
+                error = excluded.error,
+                attempts = attempts + 1,
+                payload = COALESCE(excluded.payload, payload),
+                last_failed_at = excluded.last_failed_at
+            """,
+            (pokemon_id, stage, error_class, error, encode_payload(raw) if raw else None, now, now)
+        )
+        conn.commit()
+        logging.warning(f"Dead-lettered Pokémon {pokemon_id} at {stage}: {error_class}")
+        return True
+    except Error as e:
+        logging.error(f"Failed to dead-letter Pokémon {pokemon_id}: {e}")
+        conn.rollback()
+        return False
+
+
+def resolve_dead_letters(conn, pokemon_ids):
+    """Remove Pokémon that have since loaded from the dead-letter table. Returns the number removed."""
+    rows = [(pid,) for pid in pokemon_ids]
+    if not rows:
+        return 0
+    try:
+        cursor = conn.executemany("DELETE FROM dead_letters WHERE pokemon_id = ?", rows)
+        conn.commit()
+        if cursor.rowcount:
+            logging.info(f"Resolved {cursor.rowcount} dead-lettered Pokémon.")
+        return cursor.rowcount
+    except Error as e:
+        logging.error(f"Failed to resolve dead letters: {e}")
+        conn.rollback()
+        return 0
+
+
+def has_dead_letters(conn):
+    """True if anything is parked; False as well before the table exists."""
+    try:
+        return bool(conn.execute("SELECT EXISTS (SELECT 1 FROM dead_letters)").fetchone()[0])
+    except Error:
+        return False
+
+
+def dead_letter_payloads(conn):
+    """{pokemon_id: parked RawPokemon, or None if only the ID is known} for every parked item."""
+    payloads = {}
+    for pokemon_id, blob in conn.execute("SELECT pokemon_id, payload FROM dead_letters ORDER BY pokemon_id"):
+        try:
+            payloads[pokemon_id] = decode_payload(blob) if blob else None
+        except (zlib.error, ValueError, KeyError) as e:
+            logging.warning(f"Ignoring unreadable dead-letter payload for Pokémon {pokemon_id}: {e}")
+            payloads[pokemon_id] = None
+    return payloads
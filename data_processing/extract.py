@@ -1,15 +1,20 @@
 import requests
 import logging
 from time import sleep
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from constants import (
     POKEAPI_BASE_URL,
     POKEMON_ENDPOINT,
     SPECIES_ENDPOINT,
     EVOLUTION_CHAIN_ENDPOINT,
     API_DELAY,
+    LIST_PAGE_LIMIT,
     LOG_FORMAT,
     LOG_LEVEL,
 )
+from data_processing.throttle import get_with_retry
+from data_processing.records import RawPokemon
+from data_processing.projection import project_json
 import json
 
 # --------------------------------------------------------------------------- #
@@ -18,8 +23,56 @@ import json
 logging.basicConfig(level=getattr(logging, LOG_LEVEL), format=LOG_FORMAT)
 
 
-def fetch_pokemon_data(pokemon_id):
-    """Fetch Pokémon data including evolution chain from PokeAPI with full logging."""
+# Top-level fields actually used from each payload. Everything else (moves, game_indices,
+# sprites, flavor texts, ...) is skipped by project_json() without being decoded.
+POKEMON_FIELDS = ("id", "name", "types", "abilities", "stats", "species")
+SPECIES_FIELDS = ("evolution_chain",)
+
+
+def extract_evolution_names(chain):
+    """Recursively flatten an evolution chain node into a list of species names."""
+    names = [chain["species"]["name"]]
+    for evolution in chain.get("evolves_to", []):
+        names.extend(extract_evolution_names(evolution))
+    return names
+
+
+def extract_evolution_edges(chain):
+    """Walk an evolution chain node and return its (parent, child) species name pairs."""
+    edges = []
+    pending = [chain]
+    while pending:
+        node = pending.pop()
+        for evolution in node.get("evolves_to", []):
+            edges.append((node["species"]["name"], evolution["species"]["name"]))
+            pending.append(evolution)
+    return edges
+
+
+def build_pokemon_record(data, evolution_chain, evolution_edges=()):
+    """Merge a /pokemon payload and its evolution chain (names + edges) into a RawPokemon."""
+    # Determine if evolved
+    is_evolved = bool(evolution_chain) and evolution_chain[0] != data["name"]
+
+    return RawPokemon(
+        id=data["id"],
+        name=data["name"],
+        types=tuple(t["type"]["name"] for t in data["types"]),
+        abilities=tuple(a["ability"]["name"] for a in data["abilities"]),
+        stats=tuple((s["stat"]["name"], s["base_stat"]) for s in data["stats"]),
+        evolution_chain=tuple(evolution_chain),
+        is_evolved=is_evolved,
+        evolution_edges=tuple(evolution_edges),
+    )
+
+
+def fetch_pokemon_data(pokemon_id, controller=None, counter=None):
+    """
+    Fetch Pokémon data including evolution chain from PokeAPI with full logging.
+    Transient failures (429/5xx, timeouts) are retried with backoff; pass an
+    AdaptiveController to share a concurrency limit across worker threads, and a
+    RequestCounter to count the requests sent for the calling run.
+    """
     
     # Input validation
     if not isinstance(pokemon_id, int) or pokemon_id <= 0:
@@ -31,8 +84,7 @@ def fetch_pokemon_data(pokemon_id):
     # Step 1: Fetch main Pokémon data
     try:
         logging.info(f"Fetching Pokémon data for ID: {pokemon_id}")
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()
+        response = get_with_retry(url, controller, counter=counter)
     except requests.exceptions.HTTPError as err:
         logging.error(f"HTTP error for Pokémon ID {pokemon_id}: {err}")
         return None
@@ -47,7 +99,7 @@ def fetch_pokemon_data(pokemon_id):
         return None
 
     try:
-        data = response.json()
+        data = project_json(response.content, POKEMON_FIELDS)
     except ValueError:
         logging.error("Failed to parse JSON response from PokeAPI.")
         return None
@@ -60,9 +112,8 @@ def fetch_pokemon_data(pokemon_id):
 
     try:
         logging.info(f"Fetching species data from: {species_url}")
-        species_response = requests.get(species_url, timeout=10)
-        species_response.raise_for_status()
-        species_data = species_response.json()
+        species_response = get_with_retry(species_url, controller, counter=counter)
+        species_data = project_json(species_response.content, SPECIES_FIELDS)
     except requests.exceptions.RequestException as err:
         logging.error(f"Failed to fetch species data: {err}")
         return None
@@ -78,8 +129,7 @@ def fetch_pokemon_data(pokemon_id):
 
     try:
         logging.info(f"Fetching evolution chain from: {evolution_chain_url}")
-        evolution_response = requests.get(evolution_chain_url, timeout=10)
-        evolution_response.raise_for_status()
+        evolution_response = get_with_retry(evolution_chain_url, controller, counter=counter)
         evolution_data = evolution_response.json()
     except requests.exceptions.RequestException as err:
         logging.error(f"Failed to fetch evolution chain: {err}")
@@ -88,37 +138,157 @@ def fetch_pokemon_data(pokemon_id):
         logging.error("Failed to parse evolution chain JSON.")
         return None
 
-    # Helper: Recursively extract evolution names
-    def extract_evolution_names(chain):
-        names = [chain["species"]["name"]]
-        for evolution in chain.get("evolves_to", []):
-            names.extend(extract_evolution_names(evolution))
-        return names
-
     try:
         evolution_chain = extract_evolution_names(evolution_data["chain"])
+        evolution_edges = extract_evolution_edges(evolution_data["chain"])
     except Exception as err:
         logging.error(f"Error parsing evolution chain: {err}")
-        evolution_chain = []
+        evolution_chain, evolution_edges = [], []
 
-    # Determine if evolved
-    is_evolved = evolution_chain and evolution_chain[0] != data["name"]
-
-    # Build final Pokémon dict
-    pokemon = {
-        "name": data["name"],
-        "id": data["id"],
-        "types": [t["type"]["name"] for t in data["types"]],
-        "abilities": [a["ability"]["name"] for a in data["abilities"]],
-        "stats": {s["stat"]["name"]: s["base_stat"] for s in data["stats"]},
-        "evolution_chain": evolution_chain,
-        "is_evolved": is_evolved
-    }
-
-    logging.info(f"Successfully fetched data for Pokémon: {pokemon['name'].capitalize()} (ID: {pokemon_id})")
+    pokemon = build_pokemon_record(data, evolution_chain, evolution_edges)
+
+    logging.info(f"Successfully fetched data for Pokémon: {pokemon.name.capitalize()} (ID: {pokemon_id})")
     return pokemon
 
 
+# --------------------------------------------------------------------------- #
+# Chain-centric bulk discovery
+# --------------------------------------------------------------------------- #
+def resource_id_from_url(url):
+    """Return the trailing numeric ID of a PokeAPI resource URL."""
+    return int(url.rstrip("/").rsplit("/", 1)[-1])
+
+
+def fetch_resource_list(endpoint, limit=LIST_PAGE_LIMIT, max_items=None, controller=None, counter=None):
+    """
+    Page through a PokeAPI list endpoint (e.g. 'pokemon', 'evolution-chain').
+    Returns the list of {'name', 'url'} entries, or None if a page could not be fetched.
+    """
+    page_size = min(limit, max_items) if max_items else limit
+    url = f"{POKEAPI_BASE_URL}/{endpoint}/?limit={page_size}&offset=0"
+    results = []
+
+    while url and (max_items is None or len(results) < max_items):
+        try:
+            logging.info(f"Fetching resource list page: {url}")
+            page = get_with_retry(url, controller, counter=counter).json()
+        except requests.exceptions.RequestException as err:
+            logging.error(f"Failed to fetch '{endpoint}' list page: {err}")
+            return None
+        except ValueError:
+            logging.error(f"Failed to parse '{endpoint}' list JSON.")
+            return None
+
+        results.extend(page.get("results", []))
+        url = page.get("next")
+
+    return results[:max_items] if max_items else results
+
+
+def _fetch_chain(chain_url, controller=None, counter=None):
+    """Fetch one evolution chain; returns (flattened names, edges, member species IDs) or None."""
+    try:
+        logging.info(f"Fetching evolution chain from: {chain_url}")
+        chain = get_with_retry(chain_url, controller, counter=counter).json()["chain"]
+        evolution_chain = extract_evolution_names(chain)
+        evolution_edges = extract_evolution_edges(chain)
+    except requests.exceptions.RequestException as err:
+        logging.error(f"Failed to fetch evolution chain {chain_url}: {err}")
+        return None
+    except (ValueError, KeyError) as err:
+        logging.error(f"Error parsing evolution chain {chain_url}: {err}")
+        return None
+
+    # Walk the chain tree and collect member species IDs
+    member_ids = []
+    pending = [chain]
+    while pending:
+        node = pending.pop()
+        member_ids.append(resource_id_from_url(node["species"]["url"]))
+        pending.extend(node.get("evolves_to", []))
+
+    return evolution_chain, evolution_edges, sorted(member_ids)
+
+
+def _fetch_chain_member(species_id, evolution_chain, evolution_edges, controller=None, counter=None):
+    """Fetch the default Pokémon of a chain member; returns the raw record or None."""
+    url = f"{POKEAPI_BASE_URL}/{POKEMON_ENDPOINT}/{species_id}/"
+    try:
+        logging.info(f"Fetching Pokémon data for ID: {species_id}")
+        response = get_with_retry(url, controller, counter=counter)
+        return build_pokemon_record(project_json(response.content, POKEMON_FIELDS), evolution_chain, evolution_edges)
+    except requests.exceptions.RequestException as err:
+        logging.error(f"HTTP error for Pokémon ID {species_id}: {err}")
+    except (ValueError, KeyError) as err:
+        logging.error(f"Failed to parse Pokémon ID {species_id}: {err}")
+    return None
+
+
+def fetch_pokemon_bulk(max_id=None, controller=None, max_workers=1, counter=None, delay=0):
+    """
+    Chain-centric extraction: fetch every evolution chain exactly once and fan out
+    to its members. Yields (pokemon_id, raw_data) pairs, where raw_data has the same
+    shape as fetch_pokemon_data() output, or None if the Pokémon could not be fetched.
+
+    Costs roughly N + chains HTTP calls instead of 3N. Members that cannot be
+    resolved through their chain fall back to per-ID extraction. With max_workers > 1,
+    chains and members are fetched concurrently, gated by the optional controller.
+    Without one, pass delay=API_DELAY: every chain and member fetch then waits that long
+    first, so a family's requests stay spaced out even though all of them are queued at once.
+    """
+    def paced(fetch, *args):
+        if delay:
+            sleep(delay)
+        return fetch(*args)
+
+    pokemon_index = fetch_resource_list(POKEMON_ENDPOINT, max_items=max_id, controller=controller, counter=counter)
+    if pokemon_index is None:
+        logging.error("Bulk discovery aborted: could not list Pokémon.")
+        return
+
+    remaining = {resource_id_from_url(p["url"]) for p in pokemon_index}
+    if max_id:
+        remaining = {pid for pid in remaining if pid <= max_id}
+    logging.info(f"Bulk discovery targeting {len(remaining)} Pokémon")
+
+    chain_index = fetch_resource_list(EVOLUTION_CHAIN_ENDPOINT, controller=controller, counter=counter) or []
+    unresolved = set()
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        # Chains are listed roughly in dex order, so stop once every target is covered
+        for start in range(0, len(chain_index), max_workers):
+            if not remaining:
+                break
+
+            batch = [ref["url"] for ref in chain_index[start:start + max_workers]]
+            futures = {}
+            for chain in executor.map(lambda url: paced(_fetch_chain, url, controller, counter), batch):
+                if not chain:
+                    continue
+                evolution_chain, evolution_edges, member_ids = chain
+                for species_id in member_ids:
+                    if species_id in remaining:
+                        remaining.discard(species_id)
+                        future = executor.submit(paced, _fetch_chain_member, species_id, evolution_chain,
+                                                 evolution_edges, controller, counter)
+                        futures[future] = species_id
+
+            for future in as_completed(futures):
+                species_id = futures[future]
+                pokemon = future.result()
+                if pokemon:
+                    yield species_id, pokemon
+                else:
+                    unresolved.add(species_id)
+
+        remaining |= unresolved
+        if remaining:
+            logging.warning(f"{len(remaining)} Pokémon not resolved via chains. Falling back to per-ID fetch.")
+            fallback_ids = sorted(remaining)
+            results = executor.map(lambda pid: paced(fetch_pokemon_data, pid, controller, counter), fallback_ids)
+            for pokemon_id, pokemon in zip(fallback_ids, results):
+                yield pokemon_id, pokemon
+
 
 def fetch_pokemon_example():
     """Fetch a single Pokémon (ID 2 - Ivysaur) for testing. Returns data or None."""
@@ -132,8 +302,8 @@ def fetch_pokemon_example():
     pokemon = fetch_pokemon_data(TEST_ID)
 
     if pokemon:
-        logging.info(f"SUCCESS: Fetched Pokémon - {pokemon['name'].title()} (ID: {pokemon['id']})")
-        print(f"Fetched: {pokemon['name'].title()}")  # Keep simple print for console
+        logging.info(f"SUCCESS: Fetched Pokémon - {pokemon.name.title()} (ID: {pokemon.id})")
+        print(f"Fetched: {pokemon.name.title()}")  # Keep simple print for console
         return pokemon
     else:
         logging.error(f"FAILED: Could not fetch test Pokémon (ID: {TEST_ID} - {pokemon_name})")
@@ -147,4 +317,4 @@ if __name__ == "__main__":
     pokemon = fetch_pokemon_example()
     if pokemon:
         print("\n✅ Successfully fetched Pokemon data!\n")
-        print(json.dumps(pokemon, indent=2))
\ No newline at end of file
+        print(json.dumps(pokemon.to_dict(), indent=2))
\ No newline at end of file
@@ -1,11 +1,116 @@
+import json
 import sqlite3
 from sqlite3 import Error
 import logging
 from constants import DATABASE_FILE, LOG_FORMAT, LOG_LEVEL
+from db_profiler import connection_factory
+from data_processing.aggregates import AGGREGATE_TABLES, apply_aggregate_delta, rebuild_aggregates, stored_contribution
+from data_processing.records import TransformedPokemon
+from data_processing.transform import compute_content_hash
 
 logging.basicConfig(level=getattr(logging, LOG_LEVEL), format=LOG_FORMAT)
 
 
+# Schema version stored in PRAGMA user_version.
+#   1: TEXT primary keys on types/abilities/stats, names repeated in junction tables
+#   2: integer surrogate keys; junction tables hold small integer IDs
+#   3: idx_pokemon_stats_stat_desc for descending stat leaderboards
+SCHEMA_VERSION = 3
+
+# Lookup tables intern names into integer IDs
+LOOKUP_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS {table} (
+        id INTEGER PRIMARY KEY,
+        name TEXT UNIQUE NOT NULL
+    );
+"""
+
+JUNCTION_TABLE_SQL = {
+    "pokemon_types": """
+        CREATE TABLE IF NOT EXISTS {table} (
+            pokemon_id INTEGER NOT NULL,
+            type_id INTEGER NOT NULL,
+            PRIMARY KEY (pokemon_id, type_id),
+            FOREIGN KEY (pokemon_id) REFERENCES pokemon (id),
+            FOREIGN KEY (type_id) REFERENCES {lookup} (id)
+        ) WITHOUT ROWID;
+    """,
+    "pokemon_abilities": """
+        CREATE TABLE IF NOT EXISTS {table} (
+            pokemon_id INTEGER NOT NULL,
+            ability_id INTEGER NOT NULL,
+            PRIMARY KEY (pokemon_id, ability_id),
+            FOREIGN KEY (pokemon_id) REFERENCES pokemon (id),
+            FOREIGN KEY (ability_id) REFERENCES {lookup} (id)
+        ) WITHOUT ROWID;
+    """,
+    "pokemon_stats": """
+        CREATE TABLE IF NOT EXISTS {table} (
+            pokemon_id INTEGER NOT NULL,
+            stat_id INTEGER NOT NULL,
+            base_stat INTEGER NOT NULL,
+            PRIMARY KEY (pokemon_id, stat_id),
+            FOREIGN KEY (pokemon_id) REFERENCES pokemon (id),
+            FOREIGN KEY (stat_id) REFERENCES {lookup} (id)
+        ) WITHOUT ROWID;
+    """,
+}
+
+# (lookup table, junction table, v1 name column, v2 id column, extra junction columns)
+LOOKUP_JUNCTIONS = [
+    ("types", "pokemon_types", "type_name", "type_id", []),
+    ("abilities", "pokemon_abilities", "ability_name", "ability_id", []),
+    ("stats", "pokemon_stats", "stat_name", "stat_id", ["base_stat"]),
+]
+
+
+class LookupCache:
+    """
+    In-process name → id cache for the types/abilities/stats lookup tables, so the load
+    path only queries an ID back the first time it sees a name. New entries are staged
+    until the surrounding transaction commits, so a rollback cannot leave dangling IDs.
+    """
+
+    def __init__(self):
+        self.ids = {"types": {}, "abilities": {}, "stats": {}}
+        self.pending = {"types": {}, "abilities": {}, "stats": {}}
+        self.hits = 0
+        self.misses = 0
+
+    def resolve(self, cursor, table, names):
+        """Return {name: id} for `names`, inserting unknown names into `table`."""
+        known = self.ids[table]
+        staged = self.pending[table]
+        missing = [n for n in dict.fromkeys(names) if n not in known and n not in staged]
+        self.hits += len(names) - len(missing)
+        self.misses += len(missing)
+
+        if missing:
+            cursor.executemany(f"INSERT OR IGNORE INTO {table} (name) VALUES (?)", [(n,) for n in missing])
+            placeholders = ", ".join("?" * len(missing))
+            cursor.execute(f"SELECT name, id FROM {table} WHERE name IN ({placeholders})", missing)
+            staged.update(cursor.fetchall())
+
+        return {n: known.get(n, staged.get(n)) for n in names}
+
+    def commit(self):
+        for table, staged in self.pending.items():
+            self.ids[table].update(staged)
+            staged.clear()
+
+    def discard(self):
+        for staged in self.pending.values():
+            staged.clear()
+
+
+class PokemonConnection(sqlite3.Connection):
+    """sqlite3 connection that carries the loader's LookupCache for its lifetime."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.lookup_cache = LookupCache()
+
+
 
 def create_connection(db_file):
     """Create a connection to SQLite database with logging and error handling."""
@@ -17,7 +122,7 @@ def create_connection(db_file):
     conn = None
     try:
         logging.info(f"Attempting to connect to SQLite database: {db_file}")
-        conn = sqlite3.connect(db_file)
+        conn = sqlite3.connect(db_file, factory=connection_factory(PokemonConnection))
         
         # Enable foreign key support
         conn.execute("PRAGMA foreign_keys = ON")
@@ -42,6 +147,151 @@ def create_connection(db_file):
 
 
 
+def _migrate_to_integer_keys(conn):
+    """
+    Schema v1 → v2: rebuild the lookup and junction tables with integer surrogate keys,
+    preserving all data. No-op for new databases or ones already on v2.
+    """
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(types)")}
+    if not columns or "id" in columns:
+        return True
+
+    logging.info("Migrating lookup tables to integer surrogate keys (schema v2)...")
+    try:
+        conn.execute("BEGIN")
+        for lookup, junction, name_column, id_column, extra in LOOKUP_JUNCTIONS:
+            conn.execute(LOOKUP_TABLE_SQL.format(table=f"{lookup}_v2"))
+            conn.execute(f"INSERT INTO {lookup}_v2 (name) SELECT name FROM {lookup} ORDER BY name")
+            conn.execute(JUNCTION_TABLE_SQL[junction].format(table=f"{junction}_v2", lookup=f"{lookup}_v2"))
+            extra_columns = "".join(f", {c}" for c in extra)
+            extra_values = "".join(f", j.{c}" for c in extra)
+            conn.execute(f"""
+                INSERT INTO {junction}_v2 (pokemon_id, {id_column}{extra_columns})
+                SELECT j.pokemon_id, l.id{extra_values}
+                FROM {junction} j JOIN {lookup}_v2 l ON l.name = j.{name_column}
+            """)
+            conn.execute(f"DROP TABLE {junction}")
+            conn.execute(f"DROP TABLE {lookup}")
+            # Renaming also rewrites the junction's foreign key to point at the final name
+            conn.execute(f"ALTER TABLE {lookup}_v2 RENAME TO {lookup}")
+            conn.execute(f"ALTER TABLE {junction}_v2 RENAME TO {junction}")
+        conn.commit()
+        logging.info("Schema migration to v2 complete.")
+        return True
+    except Error as e:
+        logging.error(f"Schema migration to v2 failed: {e}")
+        conn.rollback()
+        return False
+
+
+# Transitive closure of each chain's edges, including a depth-0 row per member, so
+# ancestors, descendants and whole families are single indexed lookups.
+CLOSURE_REBUILD_SQL = """
+    INSERT OR REPLACE INTO evolution_closure (chain_id, ancestor, descendant, depth)
+    WITH RECURSIVE walk (chain_id, ancestor, descendant, depth) AS (
+        SELECT chain_id, pokemon_name, pokemon_name, 0 FROM evolution_links WHERE chain_id = ?1
+        UNION
+        SELECT w.chain_id, w.ancestor, e.child_name, w.depth + 1
+        FROM walk w
+        JOIN evolution_edges e ON e.chain_id = w.chain_id AND e.parent_name = w.descendant
+        WHERE w.depth < 32
+    )
+    SELECT chain_id, ancestor, descendant, MIN(depth) FROM walk GROUP BY ancestor, descendant
+"""
+
+
+def rebuild_evolution_closure(cursor, chain_id):
+    """Recompute the closure rows of one chain from its links and edges."""
+    cursor.execute("DELETE FROM evolution_closure WHERE chain_id = ?", (chain_id,))
+    cursor.execute(CLOSURE_REBUILD_SQL, (chain_id,))
+    return cursor.rowcount
+
+
+def _backfill_evolution_graph(cursor):
+    """
+    Derive edges for chains loaded before evolution_edges existed. Only strictly linear
+    chains (one member per stage) can be reconstructed from stages; branching ones are
+    filled in by the next ETL run. Returns the number of chains backfilled.
+    """
+    cursor.execute("""
+        INSERT OR IGNORE INTO evolution_edges (chain_id, parent_name, child_name)
+        SELECT c.chain_id, p.pokemon_name, c.pokemon_name
+        FROM evolution_links c
+        JOIN evolution_links p ON p.chain_id = c.chain_id AND p.stage = c.stage - 1
+        WHERE c.chain_id NOT IN (SELECT chain_id FROM evolution_edges)
+          AND c.chain_id NOT IN (
+              SELECT chain_id FROM evolution_links GROUP BY chain_id, stage HAVING COUNT(*) > 1
+          )
+    """)
+    chain_ids = [row[0] for row in cursor.execute("""
+        SELECT DISTINCT chain_id FROM evolution_links
+        WHERE chain_id NOT IN (SELECT chain_id FROM evolution_closure)
+    """).fetchall()]
+    for chain_id in chain_ids:
+        rebuild_evolution_closure(cursor, chain_id)
+    if chain_ids:
+        logging.info(f"Backfilled evolution closure for {len(chain_ids)} chain(s).")
+    return len(chain_ids)
+
+
+def render_pokemon_doc(transformed: TransformedPokemon) -> str:
+    """Serialise one Pokémon in the PokemonOut shape served by GET /pokemon/{id}."""
+    return json.dumps({
+        "id": transformed.id,
+        "name": transformed.name,
+        "is_evolved": bool(transformed.is_evolved),
+        "types": list(transformed.types),
+        "abilities": list(transformed.abilities),
+        "stats": [{"stat_name": name, "base_stat": value} for name, value in transformed.stats],
+        "evolution_chain": [
+            {"name": name, "stage": stage}
+            for name, stage in sorted(transformed.evolution_links, key=lambda link: link[1])
+        ],
+    }, separators=(",", ":"))
+
+
+def _backfill_pokemon_docs(cursor):
+    """
+    Render documents for Pokémon loaded before pokemon_docs existed, from the normalised
+    tables. Returns the number of documents written.
+    """
+    missing = cursor.execute("""
+        SELECT id, name, is_evolved FROM pokemon
+        WHERE id NOT IN (SELECT pokemon_id FROM pokemon_docs)
+    """).fetchall()
+
+    docs = []
+    for pokemon_id, name, is_evolved in missing:
+        types = [row[0] for row in cursor.execute(
+            "SELECT t.name FROM pokemon_types pt JOIN types t ON t.id = pt.type_id WHERE pt.pokemon_id = ?",
+            (pokemon_id,)
+        )]
+        abilities = [row[0] for row in cursor.execute(
+            "SELECT a.name FROM pokemon_abilities pa JOIN abilities a ON a.id = pa.ability_id WHERE pa.pokemon_id = ?",
+            (pokemon_id,)
+        )]
+        stats = cursor.execute(
+            "SELECT s.name, ps.base_stat FROM pokemon_stats ps JOIN stats s ON s.id = ps.stat_id WHERE ps.pokemon_id = ?",
+            (pokemon_id,)
+        ).fetchall()
+        links = cursor.execute("""
+            SELECT el.pokemon_name, el.stage FROM evolution_links el
+            WHERE el.chain_id = (SELECT chain_id FROM evolution_links WHERE pokemon_name = ? LIMIT 1)
+        """, (name,)).fetchall()
+
+        record = TransformedPokemon(
+            id=pokemon_id, name=name, is_evolved=bool(is_evolved),
+            types=tuple(types), abilities=tuple(abilities), stats=tuple(stats),
+            evolution_chain_identifier=None, evolution_links=tuple(links),
+        )
+        docs.append((pokemon_id, render_pokemon_doc(record)))
+
+    if docs:
+        cursor.executemany("INSERT INTO pokemon_docs (pokemon_id, doc) VALUES (?, ?)", docs)
+        logging.info(f"Backfilled {len(docs)} Pokémon document(s).")
+    return len(docs)
+
+
 def create_tables(conn):
     """Create all required tables in the SQLite database with detailed logging."""
     
@@ -55,52 +305,24 @@ def create_tables(conn):
             CREATE TABLE IF NOT EXISTS pokemon (
                 id INTEGER PRIMARY KEY,
                 name TEXT UNIQUE NOT NULL,
-                is_evolved BOOLEAN NOT NULL
-            );
-        """),
-        ("types", """
-            CREATE TABLE IF NOT EXISTS types (
-                name TEXT PRIMARY KEY
-            );
-        """),
-        ("abilities", """
-            CREATE TABLE IF NOT EXISTS abilities (
-                name TEXT PRIMARY KEY
-            );
-        """),
-        ("stats", """
-            CREATE TABLE IF NOT EXISTS stats (
-                name TEXT PRIMARY KEY
-            );
-        """),
-        ("pokemon_types", """
-            CREATE TABLE IF NOT EXISTS pokemon_types (
-                pokemon_id INTEGER,
-                type_name TEXT,
-                PRIMARY KEY (pokemon_id, type_name),
-                FOREIGN KEY (pokemon_id) REFERENCES pokemon (id),
-                FOREIGN KEY (type_name) REFERENCES types (name)
-            );
-        """),
-        ("pokemon_abilities", """
-            CREATE TABLE IF NOT EXISTS pokemon_abilities (
-                pokemon_id INTEGER,
-                ability_name TEXT,
-                PRIMARY KEY (pokemon_id, ability_name),
-                FOREIGN KEY (pokemon_id) REFERENCES pokemon (id),
-                FOREIGN KEY (ability_name) REFERENCES abilities (name)
+                is_evolved BOOLEAN NOT NULL,
+                content_hash TEXT
             );
         """),
-        ("pokemon_stats", """
-            CREATE TABLE IF NOT EXISTS pokemon_stats (
-                pokemon_id INTEGER,
-                stat_name TEXT,
-                base_stat INTEGER NOT NULL,
-                PRIMARY KEY (pokemon_id, stat_name),
-                FOREIGN KEY (pokemon_id) REFERENCES pokemon (id),
-                FOREIGN KEY (stat_name) REFERENCES stats (name)
+        # Pre-rendered API response per Pokémon, rewritten whenever the Pokémon is (re)loaded
+        ("pokemon_docs", """
+            CREATE TABLE IF NOT EXISTS pokemon_docs (
+                pokemon_id INTEGER PRIMARY KEY,
+                doc TEXT NOT NULL,
+                FOREIGN KEY (pokemon_id) REFERENCES pokemon (id)
             );
         """),
+        ("types", LOOKUP_TABLE_SQL.format(table="types")),
+        ("abilities", LOOKUP_TABLE_SQL.format(table="abilities")),
+        ("stats", LOOKUP_TABLE_SQL.format(table="stats")),
+        ("pokemon_types", JUNCTION_TABLE_SQL["pokemon_types"].format(table="pokemon_types", lookup="types")),
+        ("pokemon_abilities", JUNCTION_TABLE_SQL["pokemon_abilities"].format(table="pokemon_abilities", lookup="abilities")),
+        ("pokemon_stats", JUNCTION_TABLE_SQL["pokemon_stats"].format(table="pokemon_stats", lookup="stats")),
         ("evolution_chains", """
             CREATE TABLE IF NOT EXISTS evolution_chains (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -115,13 +337,53 @@ def create_tables(conn):
                 PRIMARY KEY (chain_id, pokemon_name),
                 FOREIGN KEY (chain_id) REFERENCES evolution_chains (id)
             );
+        """),
+        ("evolution_edges", """
+            CREATE TABLE IF NOT EXISTS evolution_edges (
+                chain_id INTEGER NOT NULL,
+                parent_name TEXT NOT NULL,
+                child_name TEXT NOT NULL,
+                PRIMARY KEY (chain_id, parent_name, child_name),
+                FOREIGN KEY (chain_id) REFERENCES evolution_chains (id)
+            ) WITHOUT ROWID;
+        """),
+        ("evolution_closure", """
+            CREATE TABLE IF NOT EXISTS evolution_closure (
+                ancestor TEXT NOT NULL,
+                descendant TEXT NOT NULL,
+                depth INTEGER NOT NULL,
+                chain_id INTEGER NOT NULL,
+                PRIMARY KEY (ancestor, descendant),
+                FOREIGN KEY (chain_id) REFERENCES evolution_chains (id)
+            ) WITHOUT ROWID;
         """)
+    ] + AGGREGATE_TABLES
+
+    # Columns added after the original schema; applied to databases created before them
+    column_migrations = [
+        ("pokemon", "content_hash", "TEXT"),
+    ]
+
+    index_definitions = [
+        ("idx_pokemon_types_type", "CREATE INDEX IF NOT EXISTS idx_pokemon_types_type ON pokemon_types (type_id, pokemon_id)"),
+        ("idx_pokemon_abilities_ability", "CREATE INDEX IF NOT EXISTS idx_pokemon_abilities_ability ON pokemon_abilities (ability_id, pokemon_id)"),
+        ("idx_evolution_links_name", "CREATE INDEX IF NOT EXISTS idx_evolution_links_name ON evolution_links (pokemon_name)"),
+        ("idx_evolution_closure_descendant", "CREATE INDEX IF NOT EXISTS idx_evolution_closure_descendant ON evolution_closure (descendant, depth)"),
+        ("idx_evolution_closure_chain", "CREATE INDEX IF NOT EXISTS idx_evolution_closure_chain ON evolution_closure (chain_id)"),
+        # Lets the aggregates re-read a stat's min/max without scanning every Pokémon
+        ("idx_pokemon_stats_stat", "CREATE INDEX IF NOT EXISTS idx_pokemon_stats_stat ON pokemon_stats (stat_id, base_stat)"),
+        # Serves `sort_by=<stat>&order=desc` leaderboards without a temp B-tree
+        ("idx_pokemon_stats_stat_desc", "CREATE INDEX IF NOT EXISTS idx_pokemon_stats_stat_desc ON pokemon_stats (stat_id, base_stat DESC, pokemon_id)"),
     ]
 
     cursor = None
     success_count = 0
+    migration_failures = 0
 
     try:
+        if not _migrate_to_integer_keys(conn):
+            migration_failures += 1
+
         cursor = conn.cursor()
         logging.info("Starting table creation...")
 
@@ -134,6 +396,46 @@ def create_tables(conn):
             except Error as e:
                 logging.error(f"Failed to create table '{table_name}': {e}")
 
+        for table_name, column, column_type in column_migrations:
+            try:
+                existing = {row[1] for row in cursor.execute(f"PRAGMA table_info({table_name})")}
+                if column not in existing:
+                    cursor.execute(f"ALTER TABLE {table_name} ADD COLUMN {column} {column_type}")
+                    logging.info(f"Added column '{table_name}.{column}'.")
+            except Error as e:
+                migration_failures += 1
+                logging.error(f"Failed to add column '{table_name}.{column}': {e}")
+
+        for index_name, sql in index_definitions:
+            try:
+                cursor.execute(sql)
+            except Error as e:
+                migration_failures += 1
+                logging.error(f"Failed to create index '{index_name}': {e}")
+
+        try:
+            _backfill_pokemon_docs(cursor)
+        except Error as e:
+            migration_failures += 1
+            logging.error(f"Failed to backfill Pokémon documents: {e}")
+
+        try:
+            _backfill_evolution_graph(cursor)
+        except Error as e:
+            migration_failures += 1
+            logging.error(f"Failed to backfill evolution graph: {e}")
+
+        try:
+            if not cursor.execute("SELECT 1 FROM overall_aggregates").fetchone():
+                rebuild_aggregates(cursor)
+                logging.info("Backfilled aggregate tables.")
+        except Error as e:
+            migration_failures += 1
+            logging.error(f"Failed to backfill aggregate tables: {e}")
+
+        if migration_failures == 0:
+            cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
         # Only commit if at least one table was processed
         if success_count > 0:
             conn.commit()
@@ -142,7 +444,7 @@ def create_tables(conn):
             logging.warning("No tables were created. Rolling back any changes.")
             conn.rollback()
 
-        return success_count == len(table_definitions)  # True if ALL succeeded
+        return success_count == len(table_definitions) and migration_failures == 0  # True if ALL succeeded
 
     except Error as e:
         logging.error(f"Critical database error in create_tables(): {e}")
@@ -165,53 +467,74 @@ def create_tables(conn):
             
             
 
-def load_pokemon(conn, transformed_data: dict):
+def _sync_rows(cursor, table, key_column, pokemon_id, value_column, wanted: set):
+    """Diff a Pokémon's junction rows against `wanted`, deleting and inserting only the delta."""
+    existing = {row[0] for row in cursor.execute(
+        f"SELECT {value_column} FROM {table} WHERE {key_column} = ?", (pokemon_id,)
+    )}
+    stale = [(pokemon_id, v) for v in existing - wanted]
+    missing = [(pokemon_id, v) for v in wanted - existing]
+    if stale:
+        cursor.executemany(f"DELETE FROM {table} WHERE {key_column} = ? AND {value_column} = ?", stale)
+    if missing:
+        cursor.executemany(f"INSERT INTO {table} ({key_column}, {value_column}) VALUES (?, ?)", missing)
+    return len(stale) + len(missing)
+
+
+def load_pokemon(conn, transformed_data: TransformedPokemon | dict):
     """
-    Load one Pokémon's transformed data into the database.
-    Idempotent using INSERT OR IGNORE.
+    Load one Pokémon's transformed data (a TransformedPokemon, or its nested dict form)
+    into the database.
+    Idempotent: if the stored content hash matches, nothing is written. Otherwise the
+    row is upserted and junction tables are diffed so only changed rows are touched.
     Returns True on success, False on any error.
     """
     if not conn:
         logging.error("Cannot load Pokémon: Database connection is None.")
         return False
 
-    if not transformed_data or "main" not in transformed_data:
-        logging.error("Invalid transformed_data: missing 'main' section.")
+    if isinstance(transformed_data, dict):
+        if "main" not in transformed_data:
+            logging.error("Invalid transformed_data: missing 'main' section.")
+            return False
+        transformed_data = TransformedPokemon.from_dict(transformed_data)
+    elif not isinstance(transformed_data, TransformedPokemon):
+        logging.error("Invalid transformed_data: expected a TransformedPokemon.")
         return False
 
-    pokemon_id = transformed_data["main"].get("id")
-    pokemon_name = transformed_data["main"].get("name", "Unknown")
+    pokemon_id = transformed_data.id
+    pokemon_name = transformed_data.name
 
     logging.info(f"Starting load for Pokémon: {pokemon_name} (ID: {pokemon_id})")
 
+    cache = getattr(conn, "lookup_cache", None) or LookupCache()
     cursor = None
     try:
         cursor = conn.cursor()
 
-        # === 1. Insert into Lookup Tables ===
+        # === 0. Change detection ===
+        content_hash = transformed_data.content_hash or compute_content_hash(transformed_data)
+        cursor.execute("SELECT content_hash FROM pokemon WHERE id = ?", (pokemon_id,))
+        existing = cursor.fetchone()
+        if existing and existing[0] == content_hash:
+            logging.info(f"UNCHANGED: Pokémon '{pokemon_name}' (ID: {pokemon_id}) already up to date")
+            return True
+
+        # === 1. Resolve Lookup IDs (inserting unseen names) ===
         try:
-            types = [(t,) for t in transformed_data.get("types", [])]
-            if types:
-                cursor.executemany("INSERT OR IGNORE INTO types (name) VALUES (?)", types)
-                logging.debug(f"Inserted {len(types)} type(s).")
-
-            abilities = [(a,) for a in transformed_data.get("abilities", [])]
-            if abilities:
-                cursor.executemany("INSERT OR IGNORE INTO abilities (name) VALUES (?)", abilities)
-                logging.debug(f"Inserted {len(abilities)} ability(s).")
-
-            stats = [(s["stat_name"],) for s in transformed_data.get("stats", [])]
-            if stats:
-                cursor.executemany("INSERT OR IGNORE INTO stats (name) VALUES (?)", stats)
-                logging.debug(f"Inserted {len(stats)} stat name(s).")
+            stat_values = dict(transformed_data.stats)
+            type_ids = cache.resolve(cursor, "types", transformed_data.types)
+            ability_ids = cache.resolve(cursor, "abilities", transformed_data.abilities)
+            stat_ids = cache.resolve(cursor, "stats", list(stat_values))
+            logging.debug(f"Resolved {len(type_ids)} type(s), {len(ability_ids)} ability(s), {len(stat_ids)} stat name(s).")
         except Error as e:
             logging.error(f"Failed to insert lookup data for Pokémon {pokemon_id}: {e}")
             conn.rollback()
             return False
 
-        # === 2. Insert Evolution Chain ===
+        # === 2. Upsert Evolution Chain ===
         try:
-            chain_id = transformed_data.get("evolution_chain_identifier")
+            chain_id = transformed_data.evolution_chain_identifier
             if not chain_id:
                 logging.warning(f"No evolution chain identifier for Pokémon {pokemon_id}")
             else:
@@ -220,11 +543,48 @@ def load_pokemon(conn, transformed_data: dict):
                 row = cursor.fetchone()
                 if row:
                     chain_db_id = row[0]
-                    links = [(chain_db_id, link["name"], link["stage"]) 
-                             for link in transformed_data.get("evolution_links", [])]
+                    links = dict(transformed_data.evolution_links)
+                    graph_changed = False
+                    # Every member carries the whole chain, so the chain's links can be diffed here
+                    stale = [(chain_db_id, name) for (name,) in cursor.execute(
+                        "SELECT pokemon_name FROM evolution_links WHERE chain_id = ?", (chain_db_id,)
+                    ).fetchall() if name not in links]
+                    if stale:
+                        cursor.executemany("DELETE FROM evolution_links WHERE chain_id = ? AND pokemon_name = ?", stale)
+                        graph_changed = True
                     if links:
-                        cursor.executemany("INSERT OR IGNORE INTO evolution_links (chain_id, pokemon_name, stage) VALUES (?, ?, ?)", links)
-                        logging.debug(f"Inserted {len(links)} evolution link(s).")
+                        cursor.executemany(
+                            """
+                            INSERT INTO evolution_links (chain_id, pokemon_name, stage) VALUES (?, ?, ?)
+                            ON CONFLICT (chain_id, pokemon_name) DO UPDATE SET stage = excluded.stage
+                            WHERE stage IS NOT excluded.stage
+                            """,
+                            [(chain_db_id, name, stage) for name, stage in links.items()]
+                        )
+                        graph_changed |= cursor.rowcount > 0
+                        logging.debug(f"Upserted {len(links)} evolution link(s).")
+
+                    if transformed_data.evolution_edges:
+                        # Edges: diff against the stored chain
+                        wanted_edges = set(transformed_data.evolution_edges)
+                        stored_edges = set(cursor.execute(
+                            "SELECT parent_name, child_name FROM evolution_edges WHERE chain_id = ?", (chain_db_id,)
+                        ).fetchall())
+                        if stored_edges - wanted_edges:
+                            cursor.executemany(
+                                "DELETE FROM evolution_edges WHERE chain_id = ? AND parent_name = ? AND child_name = ?",
+                                [(chain_db_id, parent, child) for parent, child in stored_edges - wanted_edges]
+                            )
+                            graph_changed = True
+                        if wanted_edges - stored_edges:
+                            cursor.executemany(
+                                "INSERT INTO evolution_edges (chain_id, parent_name, child_name) VALUES (?, ?, ?)",
+                                [(chain_db_id, parent, child) for parent, child in wanted_edges - stored_edges]
+                            )
+                            graph_changed = True
+                    # Siblings carry the same chain: only the first one to change it pays for the closure
+                    if graph_changed:
+                        rebuild_evolution_closure(cursor, chain_db_id)
                 else:
                     logging.warning(f"Could not retrieve chain_db_id for chain_identifier: {chain_id}")
         except Error as e:
@@ -232,46 +592,99 @@ def load_pokemon(conn, transformed_data: dict):
             conn.rollback()
             return False
 
-        # === 3. Insert Main Pokémon ===
+        # === 3. Upsert Main Pokémon ===
         try:
-            main = transformed_data["main"]
+            old_contribution = stored_contribution(cursor, pokemon_id) if existing else None
             cursor.execute(
-                "INSERT OR IGNORE INTO pokemon (id, name, is_evolved) VALUES (?, ?, ?)",
-                (main["id"], main["name"], main["is_evolved"])
+                """
+                INSERT INTO pokemon (id, name, is_evolved, content_hash) VALUES (?, ?, ?, ?)
+                ON CONFLICT (id) DO UPDATE SET
+                    name = excluded.name,
+                    is_evolved = excluded.is_evolved,
+                    content_hash = excluded.content_hash
+                """,
+                (pokemon_id, pokemon_name, transformed_data.is_evolved, content_hash)
             )
-            if cursor.rowcount > 0:
-                logging.debug(f"Inserted main Pokémon: {main['name']}")
+            logging.debug(f"{'Updated' if existing else 'Inserted'} main Pokémon: {pokemon_name}")
         except Error as e:
             logging.error(f"Failed to insert main Pokémon {pokemon_id}: {e}")
             conn.rollback()
             return False
 
-        # === 4. Insert Junction Tables ===
+        # === 4. Sync Junction Tables ===
         try:
-            # Types
-            type_data = [(pokemon_id, t) for t in transformed_data.get("types", [])]
-            if type_data:
-                cursor.executemany("INSERT OR IGNORE INTO pokemon_types (pokemon_id, type_name) VALUES (?, ?)", type_data)
-
-            # Abilities
-            ability_data = [(pokemon_id, a) for a in transformed_data.get("abilities", [])]
-            if ability_data:
-                cursor.executemany("INSERT OR IGNORE INTO pokemon_abilities (pokemon_id, ability_name) VALUES (?, ?)", ability_data)
-
-            # Stats
-            stat_data = [(pokemon_id, s["stat_name"], s["base_stat"]) for s in transformed_data.get("stats", [])]
+            stats_by_id = {stat_ids[name]: value for name, value in stat_values.items()}
+
+            if existing:
+                # Changed record: write only the difference
+                changed = _sync_rows(cursor, "pokemon_types", "pokemon_id", pokemon_id, "type_id",
+                                     set(type_ids.values()))
+                changed += _sync_rows(cursor, "pokemon_abilities", "pokemon_id", pokemon_id, "ability_id",
+                                      set(ability_ids.values()))
+
+                old_stats = dict(cursor.execute(
+                    "SELECT stat_id, base_stat FROM pokemon_stats WHERE pokemon_id = ?", (pokemon_id,)
+                ).fetchall())
+                stale = [(pokemon_id, stat_id) for stat_id in old_stats if stat_id not in stats_by_id]
+                if stale:
+                    cursor.executemany("DELETE FROM pokemon_stats WHERE pokemon_id = ? AND stat_id = ?", stale)
+                stat_data = [(pokemon_id, stat_id, value) for stat_id, value in stats_by_id.items()
+                             if old_stats.get(stat_id) != value]
+                changed += len(stale)
+            else:
+                type_data = [(pokemon_id, type_id) for type_id in type_ids.values()]
+                if type_data:
+                    cursor.executemany("INSERT OR IGNORE INTO pokemon_types (pokemon_id, type_id) VALUES (?, ?)", type_data)
+
+                ability_data = [(pokemon_id, ability_id) for ability_id in ability_ids.values()]
+                if ability_data:
+                    cursor.executemany("INSERT OR IGNORE INTO pokemon_abilities (pokemon_id, ability_id) VALUES (?, ?)", ability_data)
+
+                stat_data = [(pokemon_id, stat_id, value) for stat_id, value in stats_by_id.items()]
+                changed = len(type_data) + len(ability_data)
+
             if stat_data:
-                cursor.executemany("INSERT OR IGNORE INTO pokemon_stats (pokemon_id, stat_name, base_stat) VALUES (?, ?, ?)", stat_data)
+                cursor.executemany(
+                    """
+                    INSERT INTO pokemon_stats (pokemon_id, stat_id, base_stat) VALUES (?, ?, ?)
+                    ON CONFLICT (pokemon_id, stat_id) DO UPDATE SET base_stat = excluded.base_stat
+                    """,
+                    stat_data
+                )
 
-            logging.debug(f"Inserted junction data: {len(type_data)} types, {len(ability_data)} abilities, {len(stat_data)} stats")
+            logging.debug(f"Wrote {changed + len(stat_data)} junction row change(s) for Pokémon {pokemon_id}")
 
         except Error as e:
             logging.error(f"Failed to insert junction tables for Pokémon {pokemon_id}: {e}")
             conn.rollback()
             return False
 
+        # === 5. Materialise API Document ===
+        try:
+            cursor.execute(
+                """
+                INSERT INTO pokemon_docs (pokemon_id, doc) VALUES (?, ?)
+                ON CONFLICT (pokemon_id) DO UPDATE SET doc = excluded.doc
+                """,
+                (pokemon_id, render_pokemon_doc(transformed_data))
+            )
+        except Error as e:
+            logging.error(f"Failed to write document for Pokémon {pokemon_id}: {e}")
+            conn.rollback()
+            return False
+
+        # === 6. Update Aggregates ===
+        try:
+            new_contribution = (bool(transformed_data.is_evolved), set(type_ids.values()), stats_by_id)
+            apply_aggregate_delta(cursor, old_contribution, new_contribution)
+        except Error as e:
+            logging.error(f"Failed to update aggregates for Pokémon {pokemon_id}: {e}")
+            conn.rollback()
+            return False
+
         # === Commit ===
         conn.commit()
+        cache.commit()
         logging.info(f"SUCCESS: Fully loaded Pokémon '{pokemon_name}' (ID: {pokemon_id})")
         return True
 
@@ -284,5 +697,7 @@ def load_pokemon(conn, transformed_data: dict):
             pass
         return False
     finally:
+        # Anything not committed was rolled back; forget IDs staged during this load
+        cache.discard()
         if cursor:
-            cursor.close()
\ No newline at end of file
+            cursor.close()
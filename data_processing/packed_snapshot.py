@@ -0,0 +1,254 @@
+import logging
+import mmap
+import os
+import sqlite3
+import struct
+import threading
+from bisect import bisect_left
+from pathlib import Path
+
+import numpy as np
+
+from constants import PACKED_SNAPSHOT_FILE, STAT_NAMES, LOG_FORMAT, LOG_LEVEL
+from db_profiler import connection_factory
+
+logging.basicConfig(level=getattr(logging, LOG_LEVEL), format=LOG_FORMAT)
+
+
+# Read-only binary image of the serving snapshot, written after each publish and mmap'd by
+# every API worker, so all processes share one page-cache copy instead of each keeping its
+# own SQLite cache and in-process copies. Layout (little-endian): a header naming the
+# SQLite file it was exported from, a section table, then 8-byte aligned sections:
+#   ids          int32[N]      Pokémon IDs, ascending (row order of every other array)
+#   stats        int16[N×6]    base stats in STAT_NAMES order, -1 when missing
+#   types        uint64[N]     bitset over type_names
+#   flags        uint8[N]      bit 0: is_evolved
+#   name_offsets uint32[N+1]   + name_bytes: UTF-8 names
+#   name_order   uint32[N]     rows sorted by name, for binary search
+#   doc_offsets  uint64[N+1]   + doc_bytes: pre-rendered JSON documents (empty = none)
+#   type_offsets uint32[T+1]   + type_bytes: type names, bit i = type i
+MAGIC = b"POKEPAK1"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<8sIIIIqqqq")  # magic, version, N, T, stat count, source dev/ino/size/mtime_ns
+SECTIONS = (
+    "ids", "stats", "types", "flags", "name_offsets", "name_bytes", "name_order",
+    "doc_offsets", "doc_bytes", "type_offsets", "type_bytes",
+)
+SECTION_ENTRY = struct.Struct("<QQ")  # offset, length
+MAX_TYPES = 64
+EVOLVED_FLAG = 1
+
+
+def _file_identity(path):
+    st = os.stat(path)
+    return st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns
+
+
+def _blob(strings, offset_dtype):
+    """UTF-8 encode `strings` back to back; returns (offsets[len+1], bytes)."""
+    encoded = [s.encode("utf-8") for s in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=offset_dtype)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    return offsets, b"".join(encoded)
+
+
+def export_packed_snapshot(db_file, packed_file=None):
+    """
+    Write the packed image of `db_file` to `packed_file` (via a temp file and an atomic
+    rename, so mapped readers never see a partial file). Returns True on success.
+    """
+    packed_file = packed_file or PACKED_SNAPSHOT_FILE
+    tmp_file = packed_file + ".tmp"
+    conn = None
+    try:
+        source = _file_identity(db_file)
+        uri = Path(db_file).absolute().as_uri() + "?mode=ro"
+        conn = sqlite3.connect(uri, uri=True, factory=connection_factory())
+
+        rows = conn.execute("SELECT id, name, is_evolved FROM pokemon ORDER BY id").fetchall()
+        ids = np.array([row[0] for row in rows], dtype=np.int32)
+        row_of = {row[0]: i for i, row in enumerate(rows)}
+        names = [row[1] for row in rows]
+
+        stat_column = {name: i for i, name in enumerate(STAT_NAMES)}
+        stats = np.full((len(rows), len(STAT_NAMES)), -1, dtype=np.int16)
+        for pokemon_id, stat_name, base_stat in conn.execute("""
+            SELECT ps.pokemon_id, s.name, ps.base_stat FROM pokemon_stats ps JOIN stats s ON s.id = ps.stat_id
+        """):
+            if pokemon_id in row_of and stat_name in stat_column:
+                stats[row_of[pokemon_id], stat_column[stat_name]] = base_stat
+
+        type_names = [row[0] for row in conn.execute("SELECT name FROM types ORDER BY id")]
+        if len(type_names) > MAX_TYPES:
+            raise ValueError(f"{len(type_names)} types do not fit a {MAX_TYPES}-bit type set")
+        type_bit = {name: i for i, name in enumerate(type_names)}
+        types = np.zeros(len(rows), dtype=np.uint64)
+        for pokemon_id, type_name in conn.execute("""
+            SELECT pt.pokemon_id, t.name FROM pokemon_types pt JOIN types t ON t.id = pt.type_id
+        """):
+            if pokemon_id in row_of:
+                types[row_of[pokemon_id]] |= np.uint64(1 << type_bit[type_name])
+
+        docs = [""] * len(rows)
+        for pokemon_id, doc in conn.execute("SELECT pokemon_id, doc FROM pokemon_docs"):
+            if pokemon_id in row_of:
+                docs[row_of[pokemon_id]] = doc
+        conn.close()
+        conn = None
+
+        flags = np.array([EVOLVED_FLAG if row[2] else 0 for row in rows], dtype=np.uint8)
+        name_offsets, name_bytes = _blob(names, np.uint32)
+        encoded_names = [n.encode("utf-8") for n in names]
+        name_order = np.array(sorted(range(len(names)), key=encoded_names.__getitem__), dtype=np.uint32)
+        doc_offsets, doc_bytes = _blob(docs, np.uint64)
+        type_offsets, type_bytes = _blob(type_names, np.uint32)
+
+        payloads = {
+            "ids": ids.tobytes(), "stats": stats.tobytes(), "types": types.tobytes(),
+            "flags": flags.tobytes(), "name_offsets": name_offsets.tobytes(), "name_bytes": name_bytes,
+            "name_order": name_order.tobytes(), "doc_offsets": doc_offsets.tobytes(), "doc_bytes": doc_bytes,
+            "type_offsets": type_offsets.tobytes(), "type_bytes": type_bytes,
+        }
+
+        position = HEADER.size + SECTION_ENTRY.size * len(SECTIONS)
+        table = []
+        for name in SECTIONS:
+            position += -position % 8
+            table.append((position, len(payloads[name])))
+            position += len(payloads[name])
+
+        with open(tmp_file, "wb") as f:
+            f.write(HEADER.pack(MAGIC, FORMAT_VERSION, len(rows), len(type_names), len(STAT_NAMES), *source))
+            for entry in table:
+                f.write(SECTION_ENTRY.pack(*entry))
+            for name, (offset, _) in zip(SECTIONS, table):
+                f.write(b"\0" * (offset - f.tell()))
+                f.write(payloads[name])
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, packed_file)
+        logging.info(f"Exported packed snapshot {packed_file}: {len(rows)} Pokémon, {position} bytes")
+        return True
+
+    except (sqlite3.Error, OSError, ValueError) as e:
+        logging.error(f"Failed to export packed snapshot of {db_file}: {e}")
+        try:
+            os.remove(tmp_file)
+        except FileNotFoundError:
+            pass
+        return False
+    finally:
+        if conn:
+            conn.close()
+
+
+class PackedSnapshot:
+    """
+    A mapped packed image. The arrays are NumPy views straight onto the mapping (no copy);
+    names and documents are sliced out of it on demand.
+    """
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, count, type_count, stat_count, *source = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != FORMAT_VERSION or stat_count != len(STAT_NAMES):
+            raise ValueError(f"{path} is not a version {FORMAT_VERSION} packed snapshot")
+        self.path = path
+        self.count = count
+        self.source = tuple(source)
+        self._sections = {
+            name: SECTION_ENTRY.unpack_from(self._map, HEADER.size + i * SECTION_ENTRY.size)
+            for i, name in enumerate(SECTIONS)
+        }
+
+        self.ids = self._array("ids", np.int32)
+        self.stats = self._array("stats", np.int16).reshape(count, stat_count)
+        self.types = self._array("types", np.uint64)
+        self.flags = self._array("flags", np.uint8)
+        self._name_offsets = self._array("name_offsets", np.uint32)
+        self._name_order = self._array("name_order", np.uint32)
+        self._doc_offsets = self._array("doc_offsets", np.uint64)
+        type_offsets = self._array("type_offsets", np.uint32)
+        type_base = self._sections["type_bytes"][0]
+        self.type_names = tuple(
+            self._map[type_base + int(start):type_base + int(end)].decode("utf-8")
+            for start, end in zip(type_offsets[:-1], type_offsets[1:])
+        )
+
+    def _array(self, section, dtype):
+        offset, length = self._sections[section]
+        return np.frombuffer(self._map, dtype=dtype, count=length // np.dtype(dtype).itemsize, offset=offset)
+
+    def _slice(self, section, offsets, row):
+        base = self._sections[section][0]
+        return self._map[base + int(offsets[row]):base + int(offsets[row + 1])]
+
+    def row_of(self, pokemon_id):
+        """Row index of `pokemon_id`, or None."""
+        row = int(np.searchsorted(self.ids, pokemon_id))
+        return row if row < self.count and self.ids[row] == pokemon_id else None
+
+    def row_of_name(self, name):
+        key = name.encode("utf-8")
+        i = bisect_left(range(self.count), key,
+                        key=lambda j: self._slice("name_bytes", self._name_offsets, self._name_order[j]))
+        if i < self.count:
+            row = int(self._name_order[i])
+            if self._slice("name_bytes", self._name_offsets, row) == key:
+                return row
+        return None
+
+    def name(self, row):
+        return self._slice("name_bytes", self._name_offsets, row).decode("utf-8")
+
+    def names(self):
+        """Every name in ID order."""
+        return [self.name(row) for row in range(self.count)]
+
+    def doc(self, row):
+        """The JSON document of `row` as a str, or None if the snapshot had none."""
+        doc = self._slice("doc_bytes", self._doc_offsets, row)
+        return doc.decode("utf-8") if doc else None
+
+    def is_evolved(self, row):
+        return bool(self.flags[row] & EVOLVED_FLAG)
+
+    def type_set(self, row):
+        bits = int(self.types[row])
+        return [name for i, name in enumerate(self.type_names) if bits >> i & 1]
+
+
+_current = None
+_current_lock = threading.Lock()
+
+
+def current_snapshot(conn, packed_file=None):
+    """
+    The packed image matching the SQLite file behind `conn`, or None (no image, or one
+    exported from a different snapshot). A new image is mapped as soon as the file is
+    replaced; the old mapping is released once no request still uses it.
+    """
+    global _current
+    packed_file = packed_file or PACKED_SNAPSHOT_FILE
+    try:
+        packed_identity = _file_identity(packed_file)
+        db_path = next((row[2] for row in conn.execute("PRAGMA database_list") if row[1] == "main"), "")
+        if not db_path:
+            return None
+        source = _file_identity(db_path)
+    except OSError:
+        return None
+
+    with _current_lock:
+        if _current is None or _current[0] != (packed_file, packed_identity):
+            try:
+                snapshot = PackedSnapshot(packed_file)
+                logging.info(f"Mapped packed snapshot {packed_file} ({snapshot.count} Pokémon)")
+            except (OSError, ValueError, struct.error) as e:
+                # Remember the bad file so it is not re-opened on every request
+                logging.error(f"Cannot map packed snapshot {packed_file}: {e}")
+                snapshot = None
+            _current = ((packed_file, packed_identity), snapshot)
+        snapshot = _current[1]
+    return snapshot if snapshot is not None and snapshot.source == source else None
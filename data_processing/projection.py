@@ -0,0 +1,97 @@
+import json
+import re
+
+# All scanning works on the raw UTF-8 bytes: only the values that are kept get decoded.
+# Possessive quantifiers (`++`, `*+`) need Python 3.11+; greedy ones would keep a backtracking
+# entry per repetition, costing megabytes on a large payload.
+_STRING = rb'"(?:[^"\\]++|\\.)*+"'
+_RUN = re.compile(rb'(?:[^"\[\]{}]++|' + _STRING + rb')*+')
+_SCALAR = re.compile(_STRING + rb'|[^,}\]\s]++')
+_KEY = re.compile(rb'"((?:[^"\\]++|\\.)*+)"\s*+:\s*+')
+_WHITESPACE = re.compile(rb"\s*+")
+
+
+def _nested_pattern(depth):
+    """Regex matching one array/object nested at most `depth` levels deep."""
+    pattern = None
+    for _ in range(depth):
+        inner = rb'[^"\[\]{}]++|' + _STRING + (b"|" + pattern if pattern else b"")
+        pattern = rb"[\[{](?:" + inner + rb")*+[\]}]"
+    return pattern
+
+
+# Skipping happens inside the regex engine, with no Python-level work per token. Possessive
+# quantifiers keep failures linear; values nested deeper fall back to the bracket loop.
+_NESTED_VALUE = re.compile(_nested_pattern(8))
+
+
+def _value_end(buf, pos):
+    """Return the index just past the JSON value starting at `pos`, without decoding it."""
+    if buf[pos:pos + 1] not in (b"[", b"{"):
+        match = _SCALAR.match(buf, pos)
+        if not match:
+            raise ValueError(f"Expected a value at position {pos}")
+        return match.end()
+
+    match = _NESTED_VALUE.match(buf, pos)
+    if match:
+        return match.end()
+
+    # Only nesting is tracked here; skipped values are not otherwise validated
+    depth = 0
+    while True:
+        ch = buf[pos:pos + 1]
+        if ch in (b"[", b"{"):
+            depth += 1
+        elif ch in (b"]", b"}"):
+            depth -= 1
+        else:
+            raise ValueError(f"Unterminated JSON value at position {pos}")
+        pos += 1
+        if depth == 0:
+            return pos
+        pos = _RUN.match(buf, pos).end()
+
+
+def project_json(payload, fields):
+    """
+    Parse only the top-level `fields` of a JSON object, skipping every other value
+    (e.g. the huge `moves` and `game_indices` arrays of a /pokemon response) without
+    decoding it. Stops as soon as all requested fields have been seen.
+
+    `payload` may be bytes (UTF-8) or str. Returns a dict holding the fields present.
+    Raises ValueError on malformed JSON, like json.loads.
+    """
+    buf = payload.encode("utf-8") if isinstance(payload, str) else payload
+    wanted = set(fields)
+    result = {}
+
+    pos = _WHITESPACE.match(buf, 0).end()
+    if buf[pos:pos + 1] != b"{":
+        raise ValueError("Expected a JSON object")
+    pos = _WHITESPACE.match(buf, pos + 1).end()
+    if buf[pos:pos + 1] == b"}":
+        return result
+
+    while wanted:
+        match = _KEY.match(buf, pos)
+        if not match:
+            raise ValueError(f"Expected a key at position {pos}")
+        raw_key = match.group(1)
+        key = json.loads(b'"' + raw_key + b'"') if b"\\" in raw_key else raw_key.decode("utf-8")
+
+        start = match.end()
+        pos = _value_end(buf, start)
+        if key in wanted:
+            result[key] = json.loads(buf[start:pos])
+            wanted.discard(key)
+
+        pos = _WHITESPACE.match(buf, pos).end()
+        separator = buf[pos:pos + 1]
+        if separator == b"}":
+            break
+        if separator != b",":
+            raise ValueError(f"Expected ',' or '}}' at position {pos}")
+        pos = _WHITESPACE.match(buf, pos + 1).end()
+
+    return result
@@ -0,0 +1,91 @@
+from typing import NamedTuple
+
+
+class RawPokemon(NamedTuple):
+    """
+    One Pokémon as produced by the extract stage (merged /pokemon, species and chain data).
+    A NamedTuple: no per-instance __dict__, immutable, and cheap to buffer by the thousand.
+    """
+    id: int
+    name: str
+    types: tuple            # type names
+    abilities: tuple        # ability names
+    stats: tuple            # (stat_name, base_stat) pairs
+    evolution_chain: tuple  # species names, root first
+    is_evolved: bool
+    evolution_edges: tuple = ()  # (parent, child) species name pairs
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "RawPokemon":
+        """Build from the JSON-friendly dict form (see to_dict)."""
+        stats = data.get("stats") or {}
+        return cls(
+            id=data["id"],
+            name=data["name"],
+            types=tuple(data.get("types") or ()),
+            abilities=tuple(data.get("abilities") or ()),
+            stats=tuple(stats.items()) if isinstance(stats, dict) else tuple(map(tuple, stats)),
+            evolution_chain=tuple(data.get("evolution_chain") or ()),
+            is_evolved=bool(data.get("is_evolved")),
+            evolution_edges=tuple(map(tuple, data.get("evolution_edges") or ())),
+        )
+
+    def to_dict(self) -> dict:
+        """JSON-friendly dict with stats as {name: value}, matching the PokeAPI-derived shape."""
+        return {
+            "name": self.name,
+            "id": self.id,
+            "types": list(self.types),
+            "abilities": list(self.abilities),
+            "stats": dict(self.stats),
+            "evolution_chain": list(self.evolution_chain),
+            "is_evolved": self.is_evolved,
+            "evolution_edges": [list(edge) for edge in self.evolution_edges],
+        }
+
+
+class TransformedPokemon(NamedTuple):
+    """
+    One Pokémon ready for load_pokemon(). Field layout mirrors the database rows, so the
+    loader can build executemany() tuples straight from it.
+    """
+    id: int
+    name: str
+    is_evolved: bool
+    types: tuple                       # type names
+    abilities: tuple                   # ability names
+    stats: tuple                       # (stat_name, base_stat) pairs
+    evolution_chain_identifier: str
+    evolution_links: tuple             # (pokemon_name, stage) pairs
+    content_hash: str = ""
+    evolution_edges: tuple = ()        # (parent, child) species name pairs
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "TransformedPokemon":
+        """Build from the nested dict form ({'main': ..., 'stats': [...], ...})."""
+        main = data["main"]
+        return cls(
+            id=main["id"],
+            name=main["name"],
+            is_evolved=bool(main["is_evolved"]),
+            types=tuple(data.get("types") or ()),
+            abilities=tuple(data.get("abilities") or ()),
+            stats=tuple((s["stat_name"], s["base_stat"]) for s in data.get("stats") or ()),
+            evolution_chain_identifier=data.get("evolution_chain_identifier"),
+            evolution_links=tuple((link["name"], link["stage"]) for link in data.get("evolution_links") or ()),
+            content_hash=data.get("content_hash") or "",
+            evolution_edges=tuple(map(tuple, data.get("evolution_edges") or ())),
+        )
+
+    def to_dict(self) -> dict:
+        """Nested dict form, for JSON output and callers that predate the record types."""
+        return {
+            "main": {"id": self.id, "name": self.name, "is_evolved": self.is_evolved},
+            "types": list(self.types),
+            "abilities": list(self.abilities),
+            "stats": [{"stat_name": name, "base_stat": value} for name, value in self.stats],
+            "evolution_chain_identifier": self.evolution_chain_identifier,
+            "evolution_links": [{"name": name, "stage": stage} for name, stage in self.evolution_links],
+            "content_hash": self.content_hash,
+            "evolution_edges": [list(edge) for edge in self.evolution_edges],
+        }
@@ -0,0 +1,155 @@
+import json
+import logging
+from contextlib import contextmanager
+from time import perf_counter, time
+from sqlite3 import Error
+
+from constants import LOG_FORMAT, LOG_LEVEL
+
+logging.basicConfig(level=getattr(logging, LOG_LEVEL), format=LOG_FORMAT)
+
+
+RUN_STAGES = ("extract", "transform", "load")
+
+# Numeric columns compared between two runs by compare_runs()
+RUN_METRICS = (
+    "duration_seconds", "extract_seconds", "transform_seconds", "load_seconds",
+    "http_calls", "cache_hit_rate", "rows_written", "success_count", "failure_count",
+    "pokemon_per_second",
+)
+
+
+class RunMetrics:
+    """Counters and per-stage wall time collected while one ETL run is in progress."""
+
+    def __init__(self):
+        self.stage_seconds = {stage: 0.0 for stage in RUN_STAGES}
+        self.http_calls = 0
+        # Lookup-cache counters stay None (NULL in the ledger) unless the run loads through one
+        self.cache_hits = None
+        self.cache_misses = None
+        self.rows_written = 0
+        self.success_count = 0
+        self.failure_count = 0
+
+    def add_lookups(self, hits, misses):
+        """Add lookup-cache hits and misses, e.g. from a loader connection or a shard."""
+        self.cache_hits = (self.cache_hits or 0) + hits
+        self.cache_misses = (self.cache_misses or 0) + misses
+
+    @contextmanager
+    def stage(self, name):
+        """Add the wall time of the enclosed block to stage `name`."""
+        started = perf_counter()
+        try:
+            yield
+        finally:
+            self.stage_seconds[name] += perf_counter() - started
+
+    def timed_iter(self, iterable, name):
+        """Yield from `iterable`, charging the time spent producing each item to stage `name`."""
+        iterator = iter(iterable)
+        while True:
+            with self.stage(name):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+
+
+def create_run_ledger(conn):
+    """Create the etl_runs table. Returns True on success."""
+    if not conn:
+        logging.error("Cannot create run ledger: Database connection is None.")
+        return False
+
+    try:
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS etl_runs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                strategy TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'running'
+                    CHECK (status IN ('running', 'succeeded', 'failed')),
+                started_at REAL NOT NULL,
+                finished_at REAL,
+                config TEXT NOT NULL,
+                extract_seconds REAL,
+                transform_seconds REAL,
+                load_seconds REAL,
+                http_calls INTEGER,
+                cache_hits INTEGER,
+                cache_misses INTEGER,
+                rows_written INTEGER,
+                success_count INTEGER,
+                failure_count INTEGER,
+                error TEXT
+            )
+        """)
+        conn.commit()
+        logging.info("Table 'etl_runs' created or already exists.")
+        return True
+    except Error as e:
+        logging.error(f"Failed to create run ledger: {e}")
+        conn.rollback()
+        return False
+
+
+def start_run(conn, strategy, config):
+    """Record the start of a run with its configuration (a JSON-serialisable dict). Returns the run id."""
+    try:
+        cursor = conn.execute(
+            "INSERT INTO etl_runs (strategy, started_at, config) VALUES (?, ?, ?)",
+            (strategy, time(), json.dumps(config, sort_keys=True))
+        )
+        conn.commit()
+        logging.info(f"ETL run {cursor.lastrowid} started (strategy: {strategy})")
+        return cursor.lastrowid
+    except Error as e:
+        logging.error(f"Failed to record ETL run start: {e}")
+        conn.rollback()
+        return None
+
+
+def finish_run(conn, run_id, metrics: RunMetrics, succeeded, error=None):
+    """Store the final metrics and status of run `run_id`. Returns True on success."""
+    if run_id is None:
+        return False
+    try:
+        conn.execute(
+            """
+            UPDATE etl_runs SET
+                status = ?, finished_at = ?,
+                extract_seconds = ?, transform_seconds = ?, load_seconds = ?,
+                http_calls = ?, cache_hits = ?, cache_misses = ?, rows_written = ?,
+                success_count = ?, failure_count = ?, error = ?
+            WHERE id = ?
+            """,
+            (
+                "succeeded" if succeeded else "failed", time(),
+                *(round(metrics.stage_seconds[stage], 6) for stage in RUN_STAGES),
+                metrics.http_calls, metrics.cache_hits, metrics.cache_misses, metrics.rows_written,
+                metrics.success_count, metrics.failure_count, error, run_id,
+            )
+        )
+        conn.commit()
+        return True
+    except Error as e:
+        logging.error(f"Failed to record ETL run {run_id}: {e}")
+        conn.rollback()
+        return False
+
+
+def compare_runs(baseline, candidate):
+    """
+    Side-by-side metrics of two runs: {metric: {baseline, candidate, change_pct}}.
+    change_pct is None when either side is missing or the baseline is zero.
+    """
+    comparison = {}
+    for metric in RUN_METRICS:
+        before, after = baseline.get(metric), candidate.get(metric)
+        change = None
+        if before is not None and after is not None and before != 0:
+            change = round((after - before) / before * 100, 2)
+        comparison[metric] = {"baseline": before, "candidate": after, "change_pct": change}
+    return comparison
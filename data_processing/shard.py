@@ -0,0 +1,239 @@
+import logging
+import os
+from time import sleep
+
+from data_processing.aggregates import REBUILD_STATEMENTS
+from data_processing.extract import fetch_pokemon_data
+from data_processing.transform import transform_pokemon_data
+from data_processing.load import create_connection, create_tables, load_pokemon
+from data_processing.throttle import RequestCounter
+from constants import API_DELAY, LOG_FORMAT, LOG_LEVEL
+
+logging.basicConfig(level=getattr(logging, LOG_LEVEL), format=LOG_FORMAT)
+
+
+# Copy order matters: lookup tables and chains before the rows that reference them.
+# Lookup IDs and evolution_chains ids are assigned per database, so junction rows are
+# re-keyed through the lookup name and links through chain_identifier. Pokémon whose content hash is unchanged in the
+# main database are skipped; changed ones are upserted and their junction rows replaced.
+MERGE_STATEMENTS = [
+    ("merge_changed", "DROP TABLE IF EXISTS temp.merge_changed"),
+    ("merge_changed", """
+        CREATE TEMP TABLE merge_changed AS
+        SELECT s.id FROM shard.pokemon s
+        LEFT JOIN main.pokemon m ON m.id = s.id
+        WHERE m.id IS NULL OR m.content_hash IS NOT s.content_hash
+    """),
+    ("types", "INSERT OR IGNORE INTO main.types (name) SELECT name FROM shard.types"),
+    ("abilities", "INSERT OR IGNORE INTO main.abilities (name) SELECT name FROM shard.abilities"),
+    ("stats", "INSERT OR IGNORE INTO main.stats (name) SELECT name FROM shard.stats"),
+    ("evolution_chains", """
+        INSERT OR IGNORE INTO main.evolution_chains (chain_identifier)
+        SELECT chain_identifier FROM shard.evolution_chains ORDER BY id
+    """),
+    ("evolution_links", """
+        DELETE FROM main.evolution_links
+        WHERE chain_id IN (
+            SELECT ec.id FROM main.evolution_chains ec
+            JOIN shard.evolution_chains sc ON sc.chain_identifier = ec.chain_identifier
+        )
+        AND NOT EXISTS (
+            SELECT 1 FROM shard.evolution_links sl
+            JOIN shard.evolution_chains sc ON sc.id = sl.chain_id
+            JOIN main.evolution_chains ec ON ec.chain_identifier = sc.chain_identifier
+            WHERE ec.id = main.evolution_links.chain_id
+              AND sl.pokemon_name = main.evolution_links.pokemon_name
+        )
+    """),
+    ("evolution_links", """
+        INSERT INTO main.evolution_links (chain_id, pokemon_name, stage)
+        SELECT ec.id, sl.pokemon_name, sl.stage
+        FROM shard.evolution_links sl
+        JOIN shard.evolution_chains sc ON sc.id = sl.chain_id
+        JOIN main.evolution_chains ec ON ec.chain_identifier = sc.chain_identifier
+        WHERE true
+        ON CONFLICT (chain_id, pokemon_name) DO UPDATE SET stage = excluded.stage
+    """),
+    ("evolution_edges", """
+        DELETE FROM main.evolution_edges
+        WHERE chain_id IN (
+            SELECT ec.id FROM main.evolution_chains ec
+            JOIN shard.evolution_chains sc ON sc.chain_identifier = ec.chain_identifier
+            WHERE sc.id IN (SELECT chain_id FROM shard.evolution_edges)
+        )
+    """),
+    ("evolution_edges", """
+        INSERT OR IGNORE INTO main.evolution_edges (chain_id, parent_name, child_name)
+        SELECT ec.id, se.parent_name, se.child_name
+        FROM shard.evolution_edges se
+        JOIN shard.evolution_chains sc ON sc.id = se.chain_id
+        JOIN main.evolution_chains ec ON ec.chain_identifier = sc.chain_identifier
+    """),
+    ("evolution_closure", """
+        DELETE FROM main.evolution_closure
+        WHERE chain_id IN (
+            SELECT ec.id FROM main.evolution_chains ec
+            JOIN shard.evolution_chains sc ON sc.chain_identifier = ec.chain_identifier
+        )
+    """),
+    ("evolution_closure", """
+        INSERT OR REPLACE INTO main.evolution_closure (chain_id, ancestor, descendant, depth)
+        SELECT ec.id, sx.ancestor, sx.descendant, sx.depth
+        FROM shard.evolution_closure sx
+        JOIN shard.evolution_chains sc ON sc.id = sx.chain_id
+        JOIN main.evolution_chains ec ON ec.chain_identifier = sc.chain_identifier
+    """),
+    ("pokemon_types", "DELETE FROM main.pokemon_types WHERE pokemon_id IN (SELECT id FROM temp.merge_changed)"),
+    ("pokemon_abilities", "DELETE FROM main.pokemon_abilities WHERE pokemon_id IN (SELECT id FROM temp.merge_changed)"),
+    ("pokemon_stats", "DELETE FROM main.pokemon_stats WHERE pokemon_id IN (SELECT id FROM temp.merge_changed)"),
+    ("pokemon", """
+        INSERT INTO main.pokemon (id, name, is_evolved, content_hash)
+        SELECT id, name, is_evolved, content_hash FROM shard.pokemon
+        WHERE id IN (SELECT id FROM temp.merge_changed)
+        ON CONFLICT (id) DO UPDATE SET
+            name = excluded.name,
+            is_evolved = excluded.is_evolved,
+            content_hash = excluded.content_hash
+    """),
+    ("pokemon_docs", """
+        INSERT INTO main.pokemon_docs (pokemon_id, doc)
+        SELECT pokemon_id, doc FROM shard.pokemon_docs
+        WHERE pokemon_id IN (SELECT id FROM temp.merge_changed)
+        ON CONFLICT (pokemon_id) DO UPDATE SET doc = excluded.doc
+    """),
+    ("pokemon_types", """
+        INSERT OR IGNORE INTO main.pokemon_types (pokemon_id, type_id)
+        SELECT sj.pokemon_id, mt.id
+        FROM shard.pokemon_types sj
+        JOIN shard.types st ON st.id = sj.type_id
+        JOIN main.types mt ON mt.name = st.name
+        WHERE sj.pokemon_id IN (SELECT id FROM temp.merge_changed)
+    """),
+    ("pokemon_abilities", """
+        INSERT OR IGNORE INTO main.pokemon_abilities (pokemon_id, ability_id)
+        SELECT sj.pokemon_id, ma.id
+        FROM shard.pokemon_abilities sj
+        JOIN shard.abilities sa ON sa.id = sj.ability_id
+        JOIN main.abilities ma ON ma.name = sa.name
+        WHERE sj.pokemon_id IN (SELECT id FROM temp.merge_changed)
+    """),
+    ("pokemon_stats", """
+        INSERT OR IGNORE INTO main.pokemon_stats (pokemon_id, stat_id, base_stat)
+        SELECT sj.pokemon_id, ms.id, sj.base_stat
+        FROM shard.pokemon_stats sj
+        JOIN shard.stats ss ON ss.id = sj.stat_id
+        JOIN main.stats ms ON ms.name = ss.name
+        WHERE sj.pokemon_id IN (SELECT id FROM temp.merge_changed)
+    """),
+    ("merge_changed", "DROP TABLE temp.merge_changed"),
+    # Bulk-copied rows bypass load_pokemon's incremental updates, so recompute in the same transaction
+    *REBUILD_STATEMENTS,
+]
+
+
+def split_id_range(first_id, last_id, shards):
+    """Split [first_id, last_id] into at most `shards` contiguous, near-equal ID lists."""
+    ids = list(range(first_id, last_id + 1))
+    shards = max(1, min(shards, len(ids)))
+    size, extra = divmod(len(ids), shards)
+    ranges, start = [], 0
+    for i in range(shards):
+        end = start + size + (1 if i < extra else 0)
+        ranges.append(ids[start:end])
+        start = end
+    return ranges
+
+
+def run_shard(shard_index, pokemon_ids, shard_file):
+    """
+    Worker entry point: run Extract → Transform → Load for `pokemon_ids` into a private
+    SQLite file. Returns (shard_file, loaded_ids, failures, counts); each failure is a
+    (pokemon_id, stage, error_class, error, raw) tuple for the parent to dead-letter,
+    since only the parent process writes the ETL state database, and counts is
+    (http_calls, cache_hits, cache_misses) for the parent's run ledger entry.
+    """
+    logging.info(f"[shard {shard_index}] Processing {len(pokemon_ids)} Pokémon into {shard_file}")
+    loaded_ids = []
+    failures = []
+    counter = RequestCounter()
+
+    conn = create_connection(shard_file)
+    if not conn:
+        logging.error(f"[shard {shard_index}] Could not open shard database.")
+        failures = [(i, "load", "ShardError", "Could not open shard database", None) for i in pokemon_ids]
+        return shard_file, [], failures, (0, 0, 0)
+
+    try:
+        # Throwaway file: durability is provided by the final merge, not the shard
+        conn.execute("PRAGMA journal_mode = MEMORY")
+        conn.execute("PRAGMA synchronous = OFF")
+        create_tables(conn)
+
+        for pokemon_id in pokemon_ids:
+            stage = "extract"
+            raw_data = None
+            try:
+                raw_data = fetch_pokemon_data(pokemon_id, counter=counter)
+                if not raw_data:
+                    failures.append((pokemon_id, stage, "ExtractError", "Could not fetch data", None))
+                    continue
+                stage = "transform"
+                transformed_data = transform_pokemon_data(raw_data)
+                if not transformed_data:
+                    failures.append((pokemon_id, stage, "TransformError", "Transformation failed", raw_data))
+                    continue
+                stage = "load"
+                if load_pokemon(conn, transformed_data):
+                    loaded_ids.append(pokemon_id)
+                else:
+                    failures.append((pokemon_id, stage, "LoadError", "load_pokemon() failed", raw_data))
+            except Exception as e:
+                failures.append((pokemon_id, stage, type(e).__name__, str(e), raw_data))
+                logging.error(f"[shard {shard_index}] Unexpected error processing Pokémon ID {pokemon_id}: {e}")
+            finally:
+                # Respect API rate limit
+                sleep(API_DELAY)
+        cache = conn.lookup_cache
+        counts = (counter.count, cache.hits, cache.misses)
+    finally:
+        conn.close()
+
+    logging.info(f"[shard {shard_index}] Done: {len(loaded_ids)} loaded, {len(failures)} failed")
+    return shard_file, loaded_ids, failures, counts
+
+
+def merge_shards(conn, shard_files):
+    """
+    ATTACH each shard file and bulk INSERT ... SELECT its rows into the main database,
+    one transaction per shard. Returns the number of shards merged successfully.
+    """
+    if not conn:
+        logging.error("Cannot merge shards: Database connection is None.")
+        return 0
+
+    merged = 0
+    for shard_file in shard_files:
+        if not os.path.exists(shard_file):
+            logging.warning(f"Shard file missing, skipping: {shard_file}")
+            continue
+
+        try:
+            conn.execute("ATTACH DATABASE ? AS shard", (shard_file,))
+        except Exception as e:
+            logging.error(f"Failed to attach shard {shard_file}: {e}")
+            continue
+
+        try:
+            for table_name, sql in MERGE_STATEMENTS:
+                cursor = conn.execute(sql)
+                logging.debug(f"Merged {cursor.rowcount} row(s) into '{table_name}' from {shard_file}")
+            conn.commit()
+            merged += 1
+            logging.info(f"Merged shard {shard_file}")
+        except Exception as e:
+            logging.error(f"Failed to merge shard {shard_file}: {e}")
+            conn.rollback()
+        finally:
+            conn.execute("DETACH DATABASE shard")
+
+    return merged
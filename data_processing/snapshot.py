@@ -0,0 +1,134 @@
+import fcntl
+import logging
+import os
+import sqlite3
+from contextlib import contextmanager
+
+from constants import LOG_FORMAT, LOG_LEVEL
+from db_profiler import connection_factory
+
+logging.basicConfig(level=getattr(logging, LOG_LEVEL), format=LOG_FORMAT)
+
+
+def _remove_if_exists(path):
+    for suffix in ("", "-journal", "-wal", "-shm"):
+        try:
+            os.remove(path + suffix)
+        except FileNotFoundError:
+            pass
+
+
+class RefreshInProgress(Exception):
+    """Another thread or process is already building and publishing this serving database."""
+
+
+@contextmanager
+def refresh_lock(serving_file, wait=False):
+    """
+    Hold an exclusive flock on `<serving_file>.lock` for one staging build and publish, so
+    concurrent refreshes cannot delete or publish each other's staging file. Raises
+    RefreshInProgress if the lock is taken, unless `wait` is set.
+    """
+    lock_file = open(serving_file + ".lock", "a")
+    try:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX if wait else fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            raise RefreshInProgress(f"A refresh of {serving_file} is already running") from None
+        yield
+    finally:
+        lock_file.close()  # releases the flock
+
+
+def prepare_staging(serving_file, staging_file):
+    """
+    Start a fresh staging database for the next ETL run. If a serving snapshot exists it is
+    copied with the SQLite backup API (consistent even while the API is reading it), so
+    refresh runs build on the current data instead of starting from scratch.
+    """
+    try:
+        _remove_if_exists(staging_file)
+        if not os.path.exists(serving_file):
+            logging.info(f"No serving snapshot at {serving_file}; staging starts empty.")
+            return True
+
+        source = sqlite3.connect(serving_file, factory=connection_factory())
+        target = sqlite3.connect(staging_file, factory=connection_factory())
+        try:
+            source.backup(target)
+        finally:
+            target.close()
+            source.close()
+        logging.info(f"Seeded staging database {staging_file} from {serving_file}")
+        return True
+
+    except (sqlite3.Error, OSError) as e:
+        logging.error(f"Failed to prepare staging database {staging_file}: {e}")
+        return False
+
+
+def verify_database(db_file):
+    """Sanity-check a staged database before it is allowed to become the serving snapshot."""
+    conn = None
+    try:
+        conn = sqlite3.connect(db_file, factory=connection_factory())
+        integrity = conn.execute("PRAGMA integrity_check").fetchone()[0]
+        if integrity != "ok":
+            logging.error(f"Integrity check failed for {db_file}: {integrity}")
+            return False
+
+        violations = conn.execute("PRAGMA foreign_key_check").fetchall()
+        if violations:
+            logging.error(f"{len(violations)} foreign key violation(s) in {db_file}")
+            return False
+
+        count = conn.execute("SELECT COUNT(*) FROM pokemon").fetchone()[0]
+        if count == 0:
+            logging.error(f"Refusing to publish {db_file}: no Pokémon loaded.")
+            return False
+
+        logging.info(f"Verified {db_file}: {count} Pokémon, integrity ok")
+        return True
+
+    except sqlite3.Error as e:
+        logging.error(f"Failed to verify {db_file}: {e}")
+        return False
+    finally:
+        if conn:
+            conn.close()
+
+
+def publish_snapshot(staging_file, serving_file):
+    """
+    Compact the staging database with VACUUM INTO and atomically rename it over the
+    serving file. Readers holding the old file keep a consistent view until they reconnect;
+    new connections see the new snapshot.
+    """
+    next_file = serving_file + ".next"
+    conn = None
+    try:
+        _remove_if_exists(next_file)
+        conn = sqlite3.connect(staging_file, factory=connection_factory())
+        conn.execute("VACUUM INTO ?", (next_file,))
+        conn.close()
+        conn = None
+
+        # Make sure the bytes are on disk before the rename makes them visible
+        fd = os.open(next_file, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+        os.replace(next_file, serving_file)
+        _remove_if_exists(staging_file)
+        logging.info(f"Published new serving snapshot: {serving_file}")
+        return True
+
+    except (sqlite3.Error, OSError) as e:
+        logging.error(f"Failed to publish snapshot {staging_file} -> {serving_file}: {e}")
+        _remove_if_exists(next_file)
+        return False
+    finally:
+        if conn:
+            conn.close()
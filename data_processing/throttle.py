@@ -0,0 +1,194 @@
+import logging
+import random
+import threading
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from time import monotonic, sleep, time
+
+import requests
+
+from constants import (
+    INITIAL_CONCURRENCY,
+    MAX_CONCURRENCY,
+    MAX_RETRIES,
+    RETRY_BASE_DELAY,
+    RETRY_MAX_DELAY,
+    LATENCY_TOLERANCE,
+    REQUEST_TIMEOUT,
+    LOG_FORMAT,
+    LOG_LEVEL,
+)
+
+logging.basicConfig(level=getattr(logging, LOG_LEVEL), format=LOG_FORMAT)
+
+
+# Status codes that mean "slow down / try again later" rather than "this will never work"
+RETRYABLE_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+
+
+class AdaptiveController:
+    """
+    AIMD concurrency limiter for outbound PokeAPI requests.
+
+    The limit grows additively (about +1 per window of healthy responses) and is cut
+    multiplicatively on 429/5xx or when latency rises well above the observed baseline.
+    A Retry-After header pauses every worker until the upstream says it is ready again.
+    """
+
+    def __init__(self, initial=INITIAL_CONCURRENCY, min_limit=1, max_limit=MAX_CONCURRENCY,
+                 decrease_factor=0.5, latency_tolerance=LATENCY_TOLERANCE):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.decrease_factor = decrease_factor
+        self.latency_tolerance = latency_tolerance
+        self.limit = float(max(min_limit, min(initial, max_limit)))
+        self.in_flight = 0
+        self.baseline_latency = None
+        self._pause_until = 0.0
+        self._last_decrease = 0.0
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        """Block until a request slot is free and no Retry-After pause is active."""
+        with self._cond:
+            while True:
+                wait = self._pause_until - monotonic()
+                if wait <= 0 and self.in_flight < int(self.limit):
+                    self.in_flight += 1
+                    return
+                self._cond.wait(timeout=wait if wait > 0 else None)
+
+    def release(self):
+        with self._cond:
+            self.in_flight -= 1
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self):
+        self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    def record_success(self, latency):
+        """Additive increase on healthy responses; gentle decrease if latency is climbing."""
+        with self._cond:
+            if self.baseline_latency is None:
+                self.baseline_latency = latency
+            elif latency > self.baseline_latency * self.latency_tolerance:
+                self._decrease("latency", 0.9)
+                return
+            else:
+                # Slow-moving EWMA so one fast response does not reset the baseline
+                self.baseline_latency = 0.9 * self.baseline_latency + 0.1 * latency
+
+            previous = int(self.limit)
+            self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+            if int(self.limit) > previous:
+                logging.debug(f"Adaptive concurrency increased to {int(self.limit)}")
+                self._cond.notify_all()
+
+    def record_throttle(self, retry_after=None):
+        """Multiplicative decrease on 429/5xx; honour Retry-After for all workers."""
+        with self._cond:
+            if retry_after:
+                self._pause_until = max(self._pause_until, monotonic() + retry_after)
+            self._decrease("throttled", self.decrease_factor)
+
+    def _decrease(self, reason, factor):
+        # A burst of concurrent failures is a single congestion event: decrease at most
+        # once per baseline round-trip.
+        now = monotonic()
+        if now - self._last_decrease < (self.baseline_latency or 0.5):
+            return
+        self._last_decrease = now
+        self.limit = max(self.min_limit, self.limit * factor)
+        logging.info(f"Adaptive concurrency reduced to {int(self.limit)} ({reason})")
+
+
+def parse_retry_after(value):
+    """Parse a Retry-After header (delta-seconds or HTTP-date) into seconds, or None."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time())
+    except (TypeError, ValueError):
+        return None
+
+
+class RequestCounter:
+    """
+    Thread-safe count of the HTTP requests one run sends through get_with_retry(), retries
+    included. Each run passes its own counter down the fetch calls, so overlapping runs and
+    runs fanned out to other processes (which add their counts back) are counted separately.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def increment(self, n=1):
+        with self._lock:
+            self.count += n
+
+
+def backoff_delay(attempt, retry_after=None):
+    """Full-jitter exponential backoff, never shorter than the server's Retry-After."""
+    delay = random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * (2 ** attempt)))
+    if retry_after is not None:
+        delay = max(delay, retry_after)
+    return delay
+
+
+def get_with_retry(url, controller=None, max_retries=MAX_RETRIES, timeout=REQUEST_TIMEOUT, counter=None):
+    """
+    GET a URL with jittered exponential retries on 429/5xx, timeouts and connection errors.
+    Returns the successful response; re-raises the last error once retries are exhausted.
+    Non-retryable HTTP errors (e.g. 404) are raised immediately. Every request sent,
+    retries included, is added to the optional RequestCounter.
+    """
+    attempt = 0
+    while True:
+        retry_after = None
+        try:
+            if counter:
+                counter.increment()
+            if controller:
+                with controller.slot():
+                    # Time only the request itself: waiting for a slot is our own backlog,
+                    # not upstream latency, and must not trigger a latency decrease
+                    started = monotonic()
+                    response = requests.get(url, timeout=timeout)
+                    latency = monotonic() - started
+            else:
+                response = requests.get(url, timeout=timeout)
+
+            if response.status_code in RETRYABLE_STATUS_CODES:
+                retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                if controller:
+                    controller.record_throttle(retry_after)
+                if attempt >= max_retries:
+                    response.raise_for_status()
+                logging.warning(f"HTTP {response.status_code} from {url} (attempt {attempt + 1}/{max_retries + 1})")
+            else:
+                response.raise_for_status()
+                if controller:
+                    controller.record_success(latency)
+                return response
+
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as err:
+            if controller:
+                controller.record_throttle()
+            if attempt >= max_retries:
+                raise
+            logging.warning(f"{type(err).__name__} for {url} (attempt {attempt + 1}/{max_retries + 1})")
+
+        delay = backoff_delay(attempt, retry_after)
+        logging.info(f"Retrying {url} in {delay:.2f}s")
+        sleep(delay)
+        attempt += 1
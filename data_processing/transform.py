@@ -1,87 +1,170 @@
+import hashlib
+import json
 import logging
-from constants import LOG_FORMAT, LOG_LEVEL
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from constants import REPLAY_WORKERS, TRANSFORM_BATCH_SIZE, LOG_FORMAT, LOG_LEVEL
+from data_processing.records import RawPokemon, TransformedPokemon
 
 logging.basicConfig(level=getattr(logging, LOG_LEVEL), format=LOG_FORMAT)
 
 
-def transform_pokemon_data(pokemon_data: dict) -> dict | None:
+def compute_content_hash(transformed: TransformedPokemon) -> str:
     """
-    Transform raw Pokémon API data into a structured format for database loading.
-    Returns dict on success, None on validation/transform error.
+    Stable hash of everything load_pokemon() writes for one Pokémon.
+    List order that carries no meaning (types, abilities, stats) is normalised first,
+    so the hash only changes when the stored data would.
     """
-    if not pokemon_data or not isinstance(pokemon_data, dict):
-        logging.error("transform_pokemon_data: Input 'pokemon_data' is None or not a dictionary.")
-        return None
+    canonical = {
+        "id": transformed.id,
+        "name": transformed.name,
+        "is_evolved": bool(transformed.is_evolved),
+        "types": sorted(transformed.types),
+        "abilities": sorted(transformed.abilities),
+        "stats": sorted(transformed.stats),
+        "evolution_chain_identifier": transformed.evolution_chain_identifier,
+        "evolution_links": list(transformed.evolution_links),
+        "evolution_edges": sorted(transformed.evolution_edges),
+    }
+    payload = json.dumps(canonical, separators=(",", ":"), sort_keys=True)
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
 
-    pokemon_id = pokemon_data.get("id")
-    pokemon_name = pokemon_data.get("name", "Unknown")
 
-    logging.info(f"Transforming data for Pokémon: {pokemon_name} (ID: {pokemon_id})")
+def evolution_stages(names, edges):
+    """
+    Stage (1 = base form) of every name, from its depth in the evolution tree. Branches
+    share a stage: Vaporeon, Jolteon and Flareon are all stage 2 under Eevee. Without
+    edges the flattened order is taken as a linear chain.
+    """
+    if not edges:
+        return {name: i + 1 for i, name in enumerate(names)}
 
-    try:
-        # === 1. Main Pokémon data ===
-        if "id" not in pokemon_data or "name" not in pokemon_data or "is_evolved" not in pokemon_data:
-            logging.error(f"Missing required main fields in Pokémon {pokemon_id}: need 'id', 'name', 'is_evolved'")
-            return None
+    parent_of = {child: parent for parent, child in edges}
+    stages = {}
+    for name in names:
+        stage, node, seen = 1, name, {name}
+        while node in parent_of and parent_of[node] not in seen:
+            node = parent_of[node]
+            seen.add(node)
+            stage += 1
+        stages[name] = stage
+    return stages
 
-        pokemon_main = {
-            "id": pokemon_data["id"],
-            "name": pokemon_data["name"],
-            "is_evolved": bool(pokemon_data["is_evolved"])  # Ensure boolean
-        }
 
-        # === 2. Types & Abilities (must be lists) ===
-        types = pokemon_data.get("types", [])
-        if not isinstance(types, list):
-            logging.warning(f"Types is not a list for Pokémon {pokemon_id}. Converting to list.")
-            types = [types] if types else []
+def _as_tuple(value, field, pokemon_id):
+    """Coerce a types/abilities field to a tuple (a tuple passes through without copying)."""
+    if isinstance(value, tuple):
+        return value
+    if isinstance(value, list):
+        return tuple(value)
+    logging.warning(f"{field} is not a list for Pokémon {pokemon_id}. Converting to list.")
+    return (value,) if value else ()
 
-        abilities = pokemon_data.get("abilities", [])
-        if not isinstance(abilities, list):
-            logging.warning(f"Abilities is not a list for Pokémon {pokemon_id}. Converting to list.")
-            abilities = [abilities] if abilities else []
 
-        # === 3. Stats (must be dict) ===
+def _coerce_raw(pokemon_data: RawPokemon | dict) -> RawPokemon | None:
+    """Validate the input form: a RawPokemon passes through, a dict is converted. None (logged) if invalid."""
+    if isinstance(pokemon_data, dict):
+        if "id" not in pokemon_data or "name" not in pokemon_data or "is_evolved" not in pokemon_data:
+            logging.error(f"Missing required main fields in Pokémon {pokemon_data.get('id')}: need 'id', 'name', 'is_evolved'")
+            return None
         raw_stats = pokemon_data.get("stats")
         if not isinstance(raw_stats, dict):
-            logging.error(f"Stats must be a dictionary for Pokémon {pokemon_id}, got: {type(raw_stats)}")
+            logging.error(f"Stats must be a dictionary for Pokémon {pokemon_data['id']}, got: {type(raw_stats)}")
             return None
+        pokemon_data = RawPokemon(
+            id=pokemon_data["id"],
+            name=pokemon_data["name"],
+            types=pokemon_data.get("types", []),
+            abilities=pokemon_data.get("abilities", []),
+            stats=tuple(raw_stats.items()),
+            evolution_chain=pokemon_data.get("evolution_chain", []),
+            is_evolved=pokemon_data["is_evolved"],
+            evolution_edges=tuple(map(tuple, pokemon_data.get("evolution_edges") or ())),
+        )
+    elif not isinstance(pokemon_data, RawPokemon):
+        logging.error("transform_pokemon_data: Input 'pokemon_data' is None or not a RawPokemon/dictionary.")
+        return None
+    return pokemon_data
+
+
+def _clean_stats(stats):
+    """(name, int) pairs: only numeric values are kept, floats truncated."""
+    return tuple(
+        (name, int(value))
+        for name, value in stats
+        if isinstance(value, (int, float))  # Only valid numbers
+    )
+
+
+def _evolution_links(evolution_chain, raw_edges):
+    """(edges, links) for one chain: string-only edges and (name, stage) links, stage from 1."""
+    evolution_edges = tuple(
+        (parent, child) for parent, child in raw_edges
+        if isinstance(parent, str) and isinstance(child, str)
+    )
+    stages = evolution_stages(evolution_chain, evolution_edges)
+    evolution_links = tuple(
+        (name, stages[name])  # Stage starts at 1
+        for name in evolution_chain
+        if isinstance(name, str)
+    )
+    return evolution_edges, evolution_links
+
+
+def transform_pokemon_data(pokemon_data: RawPokemon | dict) -> TransformedPokemon | None:
+    """
+    Transform a RawPokemon (or the equivalent dict) into a TransformedPokemon for loading.
+    Returns None on validation/transform error.
+    """
+    pokemon_data = _coerce_raw(pokemon_data)
+    if pokemon_data is None:
+        return None
+
+    pokemon_id = pokemon_data.id
+    pokemon_name = pokemon_data.name
+
+    logging.info(f"Transforming data for Pokémon: {pokemon_name} (ID: {pokemon_id})")
+
+    try:
+        # === 1. Types & Abilities (tuples) ===
+        types = _as_tuple(pokemon_data.types, "Types", pokemon_id)
+        abilities = _as_tuple(pokemon_data.abilities, "Abilities", pokemon_id)
 
-        pokemon_stats = [
-            {"stat_name": name, "base_stat": int(value)}
-            for name, value in raw_stats.items()
-            if isinstance(value, (int, float))  # Only valid numbers
-        ]
+        # === 2. Stats: (name, int) pairs, reused as-is when already clean ===
+        stats = pokemon_data.stats
+        if not all(type(value) is int for _, value in stats):
+            stats = _clean_stats(stats)
 
-        if len(pokemon_stats) == 0:
+        if len(stats) == 0:
             logging.warning(f"No valid stats found for Pokémon {pokemon_id}")
 
-        # === 4. Evolution Chain (must be non-empty list) ===
-        evolution_chain = pokemon_data.get("evolution_chain", [])
-        if not evolution_chain or not isinstance(evolution_chain, list) or len(evolution_chain) == 0:
+        # === 3. Evolution Chain (must be non-empty) ===
+        evolution_chain = pokemon_data.evolution_chain
+        if not evolution_chain or not isinstance(evolution_chain, (list, tuple)):
             logging.error(f"Evolution chain is missing or empty for Pokémon {pokemon_id}")
             return None
 
         evolution_chain_identifier = evolution_chain[0]  # First in chain
-        evolution_links = [
-            {"name": name, "stage": i + 1}  # Stage starts at 1
-            for i, name in enumerate(evolution_chain)
-            if isinstance(name, str)
-        ]
+        evolution_edges, evolution_links = _evolution_links(evolution_chain, pokemon_data.evolution_edges)
 
         if len(evolution_links) == 0:
             logging.error(f"No valid names in evolution chain for Pokémon {pokemon_id}")
             return None
 
         # === Build final result ===
-        transformed = {
-            "main": pokemon_main,
-            "types": types,
-            "abilities": abilities,
-            "stats": pokemon_stats,
-            "evolution_chain_identifier": evolution_chain_identifier,
-            "evolution_links": evolution_links
-        }
+        transformed = TransformedPokemon(
+            id=pokemon_id,
+            name=pokemon_name,
+            is_evolved=bool(pokemon_data.is_evolved),  # Ensure boolean
+            types=types,
+            abilities=abilities,
+            stats=stats,
+            evolution_chain_identifier=evolution_chain_identifier,
+            evolution_links=evolution_links,
+            evolution_edges=evolution_edges,
+        )
+        transformed = transformed._replace(content_hash=compute_content_hash(transformed))
 
         logging.info(f"Successfully transformed Pokémon '{pokemon_name}' (ID: {pokemon_id})")
         return transformed
@@ -90,6 +173,129 @@ def transform_pokemon_data(pokemon_data: dict) -> dict | None:
         logging.error(f"Unexpected error transforming Pokémon {pokemon_id}: {e}")
         return None
 
+def transform_batch(records) -> list:
+    """
+    Transform many records in one pass. Returns one TransformedPokemon, or None where
+    transform_pokemon_data would have returned None, per input record, in order.
+
+    A single pass over every stat value first decides whether the batch's stats are already
+    clean ints; only if not are they checked and coerced record by record. Evolution links
+    are derived once per distinct chain (a family's members share theirs), and success is
+    logged once per batch.
+    A malformed record fails on its own, as with transform_pokemon_data.
+    """
+    raws = [_coerce_raw(record) for record in records]
+
+    # === 1. Stats, column-wise ===
+    try:
+        stats_clean = all(type(value) is int for raw in raws if raw is not None for _, value in raw.stats)
+    except (TypeError, ValueError):
+        # A malformed stats entry: leave it to the per-record check below to reject
+        stats_clean = False
+
+    # === 2. Evolution links, once per distinct (chain, edges) ===
+    links_by_chain = {}
+    results = []
+    failed = []
+    no_stats = []
+    for raw in raws:
+        if raw is None:
+            results.append(None)
+            continue
+        try:
+            stats = raw.stats
+            if not stats_clean and not all(type(value) is int for _, value in stats):
+                stats = _clean_stats(stats)
+
+            evolution_chain = raw.evolution_chain
+            if not evolution_chain or not isinstance(evolution_chain, (list, tuple)):
+                failed.append((raw.id, "empty evolution chain"))
+                results.append(None)
+                continue
+
+            key = (tuple(evolution_chain), tuple(raw.evolution_edges))
+            try:
+                links = links_by_chain.get(key)
+            except TypeError:  # unhashable names; derive without the cache
+                key, links = None, None
+            if links is None:
+                links = _evolution_links(evolution_chain, raw.evolution_edges)
+                if key is not None:
+                    links_by_chain[key] = links
+            evolution_edges, evolution_links = links
+            if not evolution_links:
+                failed.append((raw.id, "no valid names in evolution chain"))
+                results.append(None)
+                continue
+
+            if not stats:
+                no_stats.append(raw.id)
+            transformed = TransformedPokemon(
+                id=raw.id,
+                name=raw.name,
+                is_evolved=bool(raw.is_evolved),
+                types=_as_tuple(raw.types, "Types", raw.id),
+                abilities=_as_tuple(raw.abilities, "Abilities", raw.id),
+                stats=stats,
+                evolution_chain_identifier=evolution_chain[0],
+                evolution_links=evolution_links,
+                evolution_edges=evolution_edges,
+            )
+            results.append(transformed._replace(content_hash=compute_content_hash(transformed)))
+        except Exception as e:
+            failed.append((raw.id, str(e)))
+            results.append(None)
+
+    # === 3. One summary per batch ===
+    if no_stats:
+        logging.warning(f"No valid stats found for {len(no_stats)} Pokémon: {no_stats[:20]}")
+    if failed:
+        details = ", ".join(f"{pokemon_id} ({reason})" for pokemon_id, reason in failed[:20])
+        logging.error(f"{len(failed)} Pokémon failed to transform: {details}")
+    transformed_count = sum(result is not None for result in results)
+    logging.info(f"Transformed {transformed_count}/{len(results)} Pokémon in batch "
+                 f"({len(links_by_chain)} distinct evolution chains)")
+    return results
+
+
+def chunked(records, size):
+    """Split any iterable into lists of at most `size` items."""
+    chunk = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def transform_in_processes(records, workers=REPLAY_WORKERS, batch_size=TRANSFORM_BATCH_SIZE,
+                           batch_transform=transform_batch):
+    """
+    Yield the results of `batch_transform` (default transform_batch; it must be a picklable
+    module-level function returning one result per item) for `records` (any iterable), in
+    input order, with batches of `batch_size` spread across `workers` processes. With
+    workers <= 1 no pool is started and batches run in this process.
+
+    At most 2 * workers batches are in flight: `records` is read only as results are
+    consumed, so a large source (e.g. the whole archive) is streamed, not loaded up front.
+    """
+    batches = chunked(records, max(1, batch_size))
+    if workers <= 1:
+        for batch in batches:
+            yield from batch_transform(batch)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque(executor.submit(batch_transform, batch) for batch in islice(batches, 2 * workers))
+        while pending:
+            results = pending.popleft().result()
+            batch = next(batches, None)
+            if batch is not None:
+                pending.append(executor.submit(batch_transform, batch))
+            yield from results
+
+
 if __name__ == "__main__":
     # Example of what the transform function does
     print("--- Testing Transform Function ---")
@@ -109,4 +315,4 @@ if __name__ == "__main__":
     transformed = transform_pokemon_data(pikachu_raw_data)
     
     import json
-    print(json.dumps(transformed, indent=2))
\ No newline at end of file
+    print(json.dumps(transformed.to_dict(), indent=2))
\ No newline at end of file
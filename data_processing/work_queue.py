@@ -0,0 +1,216 @@
+import logging
+from time import time
+from sqlite3 import Error
+
+from constants import QUEUE_LEASE_SECONDS, QUEUE_MAX_ATTEMPTS, LOG_FORMAT, LOG_LEVEL
+
+logging.basicConfig(level=getattr(logging, LOG_LEVEL), format=LOG_FORMAT)
+
+
+# Item lifecycle: pending → leased → done | failed (or back to pending on retry/expiry)
+QUEUE_STATUSES = ("pending", "leased", "done", "failed")
+
+
+def create_work_queue(conn):
+    """Create the durable ETL work-queue table. Returns True on success."""
+    if not conn:
+        logging.error("Cannot create work queue: Database connection is None.")
+        return False
+
+    try:
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS etl_work_queue (
+                pokemon_id INTEGER PRIMARY KEY,
+                status TEXT NOT NULL DEFAULT 'pending'
+                    CHECK (status IN ('pending', 'leased', 'done', 'failed')),
+                worker_id TEXT,
+                lease_expires_at REAL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                last_error TEXT,
+                updated_at REAL NOT NULL
+            )
+        """)
+        conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_etl_work_queue_claim
+            ON etl_work_queue (status, lease_expires_at)
+        """)
+        conn.commit()
+        logging.info("Table 'etl_work_queue' created or already exists.")
+        return True
+    except Error as e:
+        logging.error(f"Failed to create work queue: {e}")
+        conn.rollback()
+        return False
+
+
+def enqueue_ids(conn, pokemon_ids, reset=False):
+    """
+    Add Pokémon IDs to the queue as pending. Idempotent: IDs already queued are left
+    alone unless reset=True, which re-queues done/failed items too.
+    Returns the number of items (re)queued.
+    """
+    now = time()
+    rows = [(pid, now) for pid in pokemon_ids]
+    try:
+        cursor = conn.executemany(
+            "INSERT OR IGNORE INTO etl_work_queue (pokemon_id, status, updated_at) VALUES (?, 'pending', ?)",
+            rows
+        )
+        queued = cursor.rowcount
+        if reset:
+            cursor = conn.executemany(
+                """
+                UPDATE etl_work_queue
+                SET status = 'pending', worker_id = NULL, lease_expires_at = NULL,
+                    attempts = 0, last_error = NULL, updated_at = ?2
+                WHERE pokemon_id = ?1 AND status IN ('done', 'failed')
+                """,
+                rows
+            )
+            queued += cursor.rowcount
+        conn.commit()
+        logging.info(f"Enqueued {queued} Pokémon ID(s).")
+        return queued
+    except Error as e:
+        logging.error(f"Failed to enqueue IDs: {e}")
+        conn.rollback()
+        return 0
+
+
+def claim_batch(conn, worker_id, batch_size, lease_seconds=QUEUE_LEASE_SECONDS):
+    """
+    Atomically lease up to `batch_size` items for `worker_id`. Pending items and items
+    whose lease has expired (crashed worker) are both claimable.
+    Returns the list of claimed Pokémon IDs.
+    """
+    now = time()
+    try:
+        # BEGIN IMMEDIATE takes the write lock up front so two workers can never
+        # select the same rows between the SELECT and the UPDATE.
+        conn.execute("BEGIN IMMEDIATE")
+        rows = conn.execute(
+            """
+            SELECT pokemon_id, status FROM etl_work_queue
+            WHERE status = 'pending' OR (status = 'leased' AND lease_expires_at < ?)
+            ORDER BY pokemon_id
+            LIMIT ?
+            """,
+            (now, batch_size)
+        ).fetchall()
+
+        claimed = [row[0] for row in rows]
+        expired = sum(1 for row in rows if row[1] == "leased")
+        conn.executemany(
+            """
+            UPDATE etl_work_queue
+            SET status = 'leased', worker_id = ?, lease_expires_at = ?,
+                attempts = attempts + 1, updated_at = ?
+            WHERE pokemon_id = ?
+            """,
+            [(worker_id, now + lease_seconds, now, pid) for pid in claimed]
+        )
+        conn.commit()
+    except Error as e:
+        logging.error(f"Worker {worker_id} failed to claim a batch: {e}")
+        conn.rollback()
+        return []
+
+    if expired:
+        logging.warning(f"Worker {worker_id} re-claimed {expired} expired lease(s).")
+    if claimed:
+        logging.info(f"Worker {worker_id} claimed {len(claimed)} item(s): {claimed[0]}..{claimed[-1]}")
+    return claimed
+
+
+def heartbeat(conn, worker_id, lease_seconds=QUEUE_LEASE_SECONDS):
+    """Extend every lease held by `worker_id`. Returns the number of leases renewed."""
+    now = time()
+    try:
+        cursor = conn.execute(
+            """
+            UPDATE etl_work_queue SET lease_expires_at = ?, updated_at = ?
+            WHERE worker_id = ? AND status = 'leased'
+            """,
+            (now + lease_seconds, now, worker_id)
+        )
+        conn.commit()
+        return cursor.rowcount
+    except Error as e:
+        logging.error(f"Worker {worker_id} heartbeat failed: {e}")
+        conn.rollback()
+        return 0
+
+
+def complete_item(conn, worker_id, pokemon_id):
+    """
+    Mark an item done. Only succeeds while `worker_id` still holds the lease, so a worker
+    whose lease expired and was re-claimed cannot overwrite the new owner's state.
+    """
+    try:
+        cursor = conn.execute(
+            """
+            UPDATE etl_work_queue
+            SET status = 'done', lease_expires_at = NULL, last_error = NULL, updated_at = ?
+            WHERE pokemon_id = ? AND worker_id = ? AND status = 'leased'
+            """,
+            (time(), pokemon_id, worker_id)
+        )
+        conn.commit()
+        if cursor.rowcount == 0:
+            logging.warning(f"Worker {worker_id} no longer holds the lease for Pokémon {pokemon_id}.")
+        return cursor.rowcount > 0
+    except Error as e:
+        logging.error(f"Failed to complete Pokémon {pokemon_id}: {e}")
+        conn.rollback()
+        return False
+
+
+def fail_item(conn, worker_id, pokemon_id, error, max_attempts=QUEUE_MAX_ATTEMPTS):
+    """Record a failure: back to pending for another attempt, or 'failed' once exhausted."""
+    try:
+        cursor = conn.execute(
+            """
+            UPDATE etl_work_queue
+            SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END,
+                worker_id = CASE WHEN attempts >= ? THEN worker_id END,
+                lease_expires_at = NULL, last_error = ?, updated_at = ?
+            WHERE pokemon_id = ? AND worker_id = ? AND status = 'leased'
+            """,
+            (max_attempts, max_attempts, str(error), time(), pokemon_id, worker_id)
+        )
+        conn.commit()
+        return cursor.rowcount > 0
+    except Error as e:
+        logging.error(f"Failed to record failure for Pokémon {pokemon_id}: {e}")
+        conn.rollback()
+        return False
+
+
+def release_leases(conn, worker_id):
+    """Return every item leased by `worker_id` to pending (graceful shutdown)."""
+    try:
+        cursor = conn.execute(
+            """
+            UPDATE etl_work_queue
+            SET status = 'pending', worker_id = NULL, lease_expires_at = NULL,
+                attempts = MAX(attempts - 1, 0), updated_at = ?
+            WHERE worker_id = ? AND status = 'leased'
+            """,
+            (time(), worker_id)
+        )
+        conn.commit()
+        if cursor.rowcount:
+            logging.info(f"Worker {worker_id} released {cursor.rowcount} lease(s).")
+        return cursor.rowcount
+    except Error as e:
+        logging.error(f"Worker {worker_id} failed to release leases: {e}")
+        conn.rollback()
+        return 0
+
+
+def queue_summary(conn):
+    """Return {status: count} for every queue status."""
+    summary = {status: 0 for status in QUEUE_STATUSES}
+    for status, count in conn.execute("SELECT status, COUNT(*) FROM etl_work_queue GROUP BY status"):
+        summary[status] = count
+    return summary
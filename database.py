@@ -0,0 +1,107 @@
+import logging
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+from constants import DATABASE_FILE, DB_POOL_SIZE, DB_STATEMENT_CACHE, ETL_STATE_FILE, LOG_FORMAT, LOG_LEVEL
+from db_profiler import connection_factory
+
+logging.basicConfig(level=getattr(logging, LOG_LEVEL), format=LOG_FORMAT)
+
+
+class ConnectionPool:
+    """
+    Small pool of read-only connections to the serving snapshot.
+
+    The snapshot is identified by its inode: when the ETL atomically swaps in a new file,
+    idle connections to the old one are closed and in-flight ones are dropped on release,
+    so the API follows the new snapshot without a restart.
+    """
+
+    def __init__(self, db_file, size=DB_POOL_SIZE):
+        self.db_file = db_file
+        self.size = size
+        self._idle = []
+        self._identity = None
+        self._lock = threading.Lock()
+
+    def _file_identity(self):
+        st = os.stat(self.db_file)
+        return st.st_dev, st.st_ino
+
+    def _open(self):
+        uri = Path(self.db_file).absolute().as_uri() + "?mode=ro"
+        conn = sqlite3.connect(uri, uri=True, check_same_thread=False, factory=connection_factory(),
+                               cached_statements=DB_STATEMENT_CACHE)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def acquire(self):
+        """Return (connection, identity) for the current serving snapshot."""
+        identity = self._file_identity()
+        with self._lock:
+            if identity != self._identity:
+                if self._identity is not None:
+                    logging.info(f"Serving snapshot {self.db_file} changed; recycling {len(self._idle)} connection(s)")
+                for conn in self._idle:
+                    conn.close()
+                self._idle = []
+                self._identity = identity
+            if self._idle:
+                return self._idle.pop(), identity
+        return self._open(), identity
+
+    def release(self, conn, identity):
+        with self._lock:
+            if identity == self._identity and len(self._idle) < self.size:
+                self._idle.append(conn)
+                return
+        conn.close()
+
+    @contextmanager
+    def connection(self):
+        conn, identity = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn, identity)
+
+    def close(self):
+        with self._lock:
+            for conn in self._idle:
+                conn.close()
+            self._idle = []
+            self._identity = None
+
+
+pool = ConnectionPool(DATABASE_FILE)
+
+
+def pooled_connection():
+    """Context manager yielding a read-only connection to the current serving snapshot."""
+    return pool.connection()
+
+
+def get_db():
+    """FastAPI dependency: a pooled read-only connection for the duration of a request."""
+    with pool.connection() as conn:
+        yield conn
+
+
+def get_state_db():
+    """
+    FastAPI dependency: a read-only connection to the ETL state database (run ledger),
+    or None before any ETL run has created it.
+    """
+    if not os.path.exists(ETL_STATE_FILE):
+        yield None
+        return
+    uri = Path(ETL_STATE_FILE).absolute().as_uri() + "?mode=ro"
+    conn = sqlite3.connect(uri, uri=True, check_same_thread=False, factory=connection_factory())
+    conn.row_factory = sqlite3.Row
+    try:
+        yield conn
+    finally:
+        conn.close()
@@ -0,0 +1,202 @@
+import logging
+import re
+import sqlite3
+import threading
+from time import perf_counter
+
+from constants import SQL_PROFILING, SLOW_QUERY_MS, SLOW_QUERY_LOG_FILE, LOG_FORMAT, LOG_LEVEL
+
+logging.basicConfig(level=getattr(logging, LOG_LEVEL), format=LOG_FORMAT)
+
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_sql(sql):
+    """Collapse a statement to its shape: literals become ?, IN lists (?, ...), whitespace one space."""
+    sql = _STRING_LITERAL.sub("?", sql)
+    sql = _NUMBER_LITERAL.sub("?", sql)
+    sql = _PLACEHOLDER_LIST.sub("(?, ...)", sql)
+    return _WHITESPACE.sub(" ", sql).strip()
+
+
+class StatementProfiler:
+    """
+    Process-wide statistics per normalised SQL statement: execution count, total and max
+    time (execute plus fetching) and rows returned. Statements slower than the threshold
+    are also written to the slow-query log.
+    """
+
+    def __init__(self, enabled=SQL_PROFILING, slow_ms=SLOW_QUERY_MS, log_file=SLOW_QUERY_LOG_FILE):
+        self.enabled = enabled
+        self.slow_ms = slow_ms
+        self.log_file = log_file
+        self._stats = {}
+        self._lock = threading.Lock()
+        self._slow_log = None
+
+    def enable(self):
+        """Profile connections opened from now on (already-open connections are unaffected)."""
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def reset(self):
+        with self._lock:
+            self._stats = {}
+
+    def _slow_logger(self):
+        if self._slow_log is None:
+            slow_log = logging.getLogger("slow_queries")
+            if self.log_file:
+                try:
+                    handler = logging.FileHandler(self.log_file)
+                    handler.setFormatter(logging.Formatter(LOG_FORMAT))
+                    slow_log.addHandler(handler)
+                except OSError as e:
+                    logging.error(f"Cannot open slow-query log {self.log_file}: {e}")
+            self._slow_log = slow_log
+        return self._slow_log
+
+    def record(self, sql, elapsed, rows):
+        """Add one finished statement (elapsed in seconds)."""
+        key = normalize_sql(sql)
+        with self._lock:
+            entry = self._stats.get(key)
+            if entry is None:
+                entry = self._stats[key] = [0, 0.0, 0.0, 0]
+            entry[0] += 1
+            entry[1] += elapsed
+            entry[2] = max(entry[2], elapsed)
+            entry[3] += rows
+
+        if elapsed * 1000 >= self.slow_ms:
+            self._slow_logger().warning(f"Slow query ({elapsed * 1000:.1f} ms, {rows} row(s)): {key}")
+
+    def top(self, limit=20, sort_by="total"):
+        """The `limit` heaviest statements by total, max or average time, or by count."""
+        with self._lock:
+            rows = [
+                {
+                    "sql": sql,
+                    "count": count,
+                    "total_ms": round(total * 1000, 3),
+                    "avg_ms": round(total * 1000 / count, 3),
+                    "max_ms": round(longest * 1000, 3),
+                    "rows": fetched,
+                }
+                for sql, (count, total, longest, fetched) in self._stats.items()
+            ]
+        key = {"total": "total_ms", "max": "max_ms", "avg": "avg_ms", "count": "count"}[sort_by]
+        return sorted(rows, key=lambda row: row[key], reverse=True)[:limit]
+
+
+profiler = StatementProfiler()
+
+
+class ProfiledCursor(sqlite3.Cursor):
+    """
+    Cursor that times each statement from execute() until its rows are exhausted (or the
+    next execute()/close()), counting the rows fetched along the way.
+    """
+
+    _sql = None
+    _elapsed = 0.0
+    _rows = 0
+
+    def _finish(self):
+        if self._sql is not None:
+            profiler.record(self._sql, self._elapsed, self._rows)
+            self._sql = None
+
+    def _timed(self, method, *args):
+        start = perf_counter()
+        try:
+            return method(*args)
+        finally:
+            self._elapsed += perf_counter() - start
+
+    def execute(self, sql, parameters=()):
+        self._finish()
+        self._elapsed, self._rows = 0.0, 0
+        result = self._timed(super().execute, sql, parameters)
+        self._sql = sql
+        return result
+
+    def executemany(self, sql, seq_of_parameters):
+        self._finish()
+        self._elapsed, self._rows = 0.0, 0
+        result = self._timed(super().executemany, sql, seq_of_parameters)
+        self._sql = sql
+        return result
+
+    def fetchone(self):
+        row = self._timed(super().fetchone)
+        if row is None:
+            self._finish()
+        else:
+            self._rows += 1
+        return row
+
+    def fetchmany(self, size=None):
+        rows = self._timed(super().fetchmany, self.arraysize if size is None else size)
+        self._rows += len(rows)
+        if not rows:
+            self._finish()
+        return rows
+
+    def fetchall(self):
+        rows = self._timed(super().fetchall)
+        self._rows += len(rows)
+        self._finish()
+        return rows
+
+    def __next__(self):
+        try:
+            row = self._timed(super().__next__)
+        except StopIteration:
+            self._finish()
+            raise
+        self._rows += 1
+        return row
+
+    def close(self):
+        self._finish()
+        super().close()
+
+    def __del__(self):
+        self._finish()
+
+
+class ProfiledConnectionMixin:
+    """Routes every statement, including Connection.execute shortcuts, through ProfiledCursor."""
+
+    def cursor(self, factory=ProfiledCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+_profiled_classes = {}
+
+
+def connection_factory(base=sqlite3.Connection):
+    """
+    The `factory=` to pass to sqlite3.connect(): `base` itself, or a profiled subclass of it
+    while profiling is enabled. Checked when a connection is opened, so disabled profiling
+    costs nothing per statement.
+    """
+    if not profiler.enabled:
+        return base
+    cls = _profiled_classes.get(base)
+    if cls is None:
+        cls = _profiled_classes[base] = type(f"Profiled{base.__name__}", (ProfiledConnectionMixin, base), {})
+    return cls
@@ -1,126 +1,950 @@
-import sqlite3
-from time import sleep
-import logging
-from tqdm import tqdm
-
-from data_processing.extract import fetch_pokemon_data
-from data_processing.transform import transform_pokemon_data
-from data_processing.load import create_connection, create_tables, load_pokemon
-
-from constants import (
-    DATABASE_FILE,
-    POKEMON_TO_FETCH,
-    API_DELAY,
-    LOG_FORMAT,
-    LOG_LEVEL,
-)
-
-
-
-logging.basicConfig(level=getattr(logging, LOG_LEVEL), format=LOG_FORMAT)
-
-
-# --- Configuration ---
-DATABASE_FILE = "db/pokemon_database.db" 
-
-
-def run_etl_pipeline():
-    """Run the full ETL pipeline: Extract → Transform → Load."""
-    
-    conn = None
-    success_count = 0
-    failure_count = 0
-
-    try:
-        # === 1. Database Setup ===
-        logging.info("Starting ETL pipeline setup...")
-        conn = create_connection(DATABASE_FILE)
-        if not conn:
-            raise Exception("Failed to connect to database.")
-
-        if not create_tables(conn):
-            logging.warning("Some tables failed to create. Continuing anyway...")
-
-        logging.info(f"Starting ETL for first {POKEMON_TO_FETCH} Pokémon")
-
-        # === 2. Main ETL Loop with Progress Bar ===
-        # Use tqdm for nice progress bar (fallback to range if not installed)
-        try:
-            pbar = tqdm(range(1, POKEMON_TO_FETCH + 1), desc="Processing Pokémon", unit="poke")
-        except:
-            pbar = range(1, POKEMON_TO_FETCH + 1)
-
-        for i in pbar:
-            pokemon_name = f"ID:{i}"
-
-            try:
-                # --- EXTRACT ---
-                logging.debug(f"Extracting Pokémon ID: {i}")
-                raw_data = fetch_pokemon_data(i)
-
-                if not raw_data:
-                    logging.warning(f"Could not fetch data for ID: {i}")
-                    failure_count += 1
-                    if isinstance(pbar, tqdm):
-                        pbar.set_postfix({"Last": "Not Fetched", "Success": success_count, "Fail": failure_count})
-                    continue
-
-                pokemon_name = raw_data["name"].title()
-
-                # --- TRANSFORM ---
-                transformed_data = transform_pokemon_data(raw_data)
-                if not transformed_data:
-                    logging.warning(f"Transformation failed for {pokemon_name} (ID: {i})")
-                    failure_count += 1
-                    if isinstance(pbar, tqdm):
-                        pbar.set_postfix({"Last": pokemon_name, "Success": success_count, "Fail": failure_count})
-                    continue
-
-                # --- LOAD ---
-                if load_pokemon(conn, transformed_data):
-                    success_count += 1
-                    logging.info(f"Successfully loaded {pokemon_name} (ID: {i})")
-                else:
-                    failure_count += 1
-                    logging.error(f"Failed to load {pokemon_name} (ID: {i})")
-
-                # Update progress bar
-                if isinstance(pbar, tqdm):
-                    pbar.set_postfix({"Last": pokemon_name, "Success": success_count, "Fail": failure_count})
-
-            except Exception as e:
-                failure_count += 1
-                logging.error(f"Unexpected error processing Pokémon ID {i}: {e}")
-                if isinstance(pbar, tqdm):
-                    pbar.set_postfix({"Last": pokemon_name, "Success": success_count, "Fail": failure_count})
-
-            # Respect API rate limit
-            sleep(API_DELAY)
-
-        # === 3. Summary ===
-        total = success_count + failure_count
-        logging.info("=" * 50)
-        logging.info("ETL PIPELINE COMPLETE")
-        logging.info(f"Total Processed : {total}")
-        logging.info(f"Successfully Loaded  : {success_count}")
-        logging.info(f"Failed           : {failure_count}")
-        logging.info("=" * 50)
-
-    except Exception as e:
-        logging.critical(f"CRITICAL ERROR in ETL pipeline: {e}")
-        return False
-    finally:
-        if conn:
-            try:
-                conn.close()
-                logging.info("Database connection closed.")
-            except:
-                logging.error("Failed to close database connection.")
-    
-    return success_count > 0
-
-if __name__ == "__main__":
-    run_etl_pipeline()
-    
-    
-    
\ No newline at end of file
+import sqlite3
+import os
+import argparse
+import tempfile
+import socket
+import threading
+import uuid
+from time import sleep
+import logging
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from tqdm import tqdm
+
+from data_processing.extract import fetch_pokemon_data, fetch_pokemon_bulk
+from data_processing.transform import transform_pokemon_data, transform_in_processes
+from data_processing.load import create_connection, create_tables, load_pokemon, SCHEMA_VERSION
+from data_processing.throttle import AdaptiveController, RequestCounter, backoff_delay
+from data_processing.shard import split_id_range, run_shard, merge_shards
+from data_processing.snapshot import prepare_staging, verify_database, publish_snapshot, refresh_lock, RefreshInProgress
+from data_processing.packed_snapshot import export_packed_snapshot
+from data_processing.archive import create_archive, archive_payload, iter_archived, transform_archived_batch
+from data_processing.run_ledger import RunMetrics, create_run_ledger, start_run, finish_run
+from data_processing.dead_letters import (
+    create_dead_letters,
+    record_dead_letter,
+    resolve_dead_letters,
+    has_dead_letters,
+    dead_letter_payloads,
+)
+from data_processing.work_queue import (
+    create_work_queue,
+    enqueue_ids,
+    claim_batch,
+    heartbeat,
+    complete_item,
+    fail_item,
+    release_leases,
+    queue_summary,
+)
+
+from constants import (
+    DATABASE_FILE,
+    POKEMON_TO_FETCH,
+    EXTRACT_STRATEGY,
+    ADAPTIVE_CONCURRENCY,
+    MAX_CONCURRENCY,
+    SHARD_WORKERS,
+    ARCHIVE_RAW_PAYLOADS,
+    RAW_ARCHIVE_FILE,
+    REPLAY_WORKERS,
+    TRANSFORM_BATCH_SIZE,
+    STAGING_DATABASE_FILE,
+    PACKED_SNAPSHOT_FILE,
+    EXPORT_PACKED_SNAPSHOT,
+    ETL_STATE_FILE,
+    DB_BUSY_TIMEOUT_MS,
+    QUEUE_BATCH_SIZE,
+    QUEUE_LEASE_SECONDS,
+    QUEUE_POLL_INTERVAL,
+    DEAD_LETTER_PAYLOADS,
+    REDRIVE_MAX_ROUNDS,
+    API_DELAY,
+    LOG_FORMAT,
+    LOG_LEVEL,
+)
+
+
+
+logging.basicConfig(level=getattr(logging, LOG_LEVEL), format=LOG_FORMAT)
+
+
+# --- Configuration ---
+DATABASE_FILE = "db/pokemon_database.db" 
+
+
+def _fetch_or_none(pokemon_id, controller=None, counter=None):
+    try:
+        return fetch_pokemon_data(pokemon_id, controller, counter=counter)
+    except Exception as e:
+        logging.error(f"Unexpected error extracting Pokémon ID {pokemon_id}: {e}")
+        return None
+
+
+def extract_stream(strategy=EXTRACT_STRATEGY, adaptive=ADAPTIVE_CONCURRENCY, counter=None):
+    """
+    Yield (pokemon_id, raw_data) pairs for the configured extraction strategy.
+    raw_data is None when a Pokémon could not be fetched. Requests are counted in the
+    optional RequestCounter.
+
+    With adaptive=True, requests run on a thread pool whose effective concurrency is
+    steered by an AdaptiveController (AIMD on 429/5xx and latency) instead of API_DELAY.
+    """
+    if strategy not in ("per_id", "chain"):
+        raise ValueError(f"Unknown extract strategy: {strategy}")
+
+    if adaptive:
+        controller = AdaptiveController()
+        logging.info(f"Adaptive extraction enabled (max concurrency: {controller.max_limit})")
+
+        if strategy == "chain":
+            yield from fetch_pokemon_bulk(POKEMON_TO_FETCH, controller, max_workers=MAX_CONCURRENCY, counter=counter)
+            return
+
+        with ThreadPoolExecutor(max_workers=MAX_CONCURRENCY) as executor:
+            futures = {
+                executor.submit(_fetch_or_none, i, controller, counter): i
+                for i in range(1, POKEMON_TO_FETCH + 1)
+            }
+            for future in as_completed(futures):
+                yield futures[future], future.result()
+        return
+
+    if strategy == "chain":
+        # A chain's members are queued together, so the rate limit is applied per request, not per yield
+        yield from fetch_pokemon_bulk(POKEMON_TO_FETCH, counter=counter, delay=API_DELAY)
+        return
+
+    for i in range(1, POKEMON_TO_FETCH + 1):
+        logging.debug(f"Extracting Pokémon ID: {i}")
+        yield i, _fetch_or_none(i, counter=counter)
+        # Respect API rate limit
+        sleep(API_DELAY)
+
+
+class RunRecord:
+    """
+    One run's entry in the etl_runs ledger of the ETL state database, plus that database's
+    dead-letter table. The entry point doing the work starts it with its strategy and
+    configuration. A blue/green wrapper creates it and passes it to its build, so the final
+    status is recorded only once the staging snapshot has been published or rejected.
+    Bookkeeping never fails the ETL: without a state database every method is a no-op.
+    """
+
+    def __init__(self):
+        self.metrics = RunMetrics()
+        self.loaded_ids = []
+        self.error = None
+        self.conn = None
+        self.run_id = None
+        self._started = False
+        # Passed down every fetch of this run; shards add the counts of their processes
+        self.http = RequestCounter()
+
+    def start(self, state_file, strategy, config):
+        """Open `state_file` and record the start of the run (once; later calls are ignored)."""
+        if self._started:
+            return
+        self._started = True
+        conn = create_connection(state_file)
+        if not conn or not create_run_ledger(conn) or not create_dead_letters(conn):
+            logging.warning(f"ETL state unavailable at {state_file}; run and failures will not be recorded.")
+            if conn:
+                conn.close()
+            return
+        self.conn = conn
+        self.run_id = start_run(conn, strategy, config)
+
+    def dead_letter(self, pokemon_id, stage, error_class, error, raw=None):
+        if self.conn:
+            record_dead_letter(self.conn, pokemon_id, stage, error_class, error,
+                               raw if DEAD_LETTER_PAYLOADS else None)
+
+    def count_lookups(self, conn):
+        """Add the lookup-cache hits and misses of a loader connection to the run's metrics."""
+        cache = getattr(conn, "lookup_cache", None)
+        if cache:
+            self.metrics.add_lookups(cache.hits, cache.misses)
+
+    def resolve(self, pokemon_ids):
+        """Items that failed in an earlier run but loaded now are no longer dead letters."""
+        if self.conn:
+            resolve_dead_letters(self.conn, pokemon_ids)
+
+    def finish(self, succeeded, error=None):
+        """Record the final status and metrics, and close the state database."""
+        if not self.conn:
+            return
+        self.metrics.http_calls = self.http.count
+        finish_run(self.conn, self.run_id, self.metrics, succeeded, self.error or error)
+        self.conn.close()
+        self.conn = None
+
+
+def _begin_run(run, state_file, strategy, config):
+    """Start `run`, or a new RunRecord when None. Returns (run, owned): owners also finish it."""
+    owned = run is None
+    run = run or RunRecord()
+    run.start(state_file, strategy, config)
+    return run, owned
+
+
+def run_etl_pipeline(strategy=EXTRACT_STRATEGY, adaptive=ADAPTIVE_CONCURRENCY, db_file=DATABASE_FILE,
+                     archive=ARCHIVE_RAW_PAYLOADS, archive_file=RAW_ARCHIVE_FILE, state_file=ETL_STATE_FILE,
+                     resolve=True, run=None):
+    """
+    Run the full ETL pipeline: Extract → Transform → Load.
+    With archive=True every extracted payload is also stored in `archive_file`;
+    strategy="replay" re-runs Transform → Load from that archive without the network.
+    Every run is recorded, with per-stage timings and counters, in the etl_runs ledger
+    of `state_file`; Pokémon that fail a stage are parked in its dead_letters table, and
+    earlier dead letters that load now are removed from it. With resolve=False they stay
+    parked, for callers that only commit `db_file` later (see run_blue_green_etl).
+    A caller-owned `run` (RunRecord) is filled in but left for the caller to finish.
+
+    Returns the IDs loaded by this run: empty (falsy) if nothing loaded or the run failed.
+    """
+    if strategy == "replay":
+        return run_replay_pipeline(db_file, archive_file, state_file=state_file, resolve=resolve, run=run)
+
+    conn = None
+    archive_conn = None
+    success_count = 0
+    failure_count = 0
+    rows_before = 0
+    error = None
+
+    run, owned = _begin_run(run, state_file, strategy, {
+        "first_id": 1,
+        "last_id": POKEMON_TO_FETCH,
+        "adaptive": adaptive,
+        "concurrency": MAX_CONCURRENCY if adaptive else 1,
+        "api_delay": None if adaptive else API_DELAY,
+        "batch_size": 1,  # one load transaction per Pokémon
+        "archive": archive,
+    })
+    metrics = run.metrics
+    loaded_ids = run.loaded_ids
+
+    try:
+        # === 1. Database Setup ===
+        logging.info("Starting ETL pipeline setup...")
+        conn = create_connection(db_file)
+        if not conn:
+            raise Exception("Failed to connect to database.")
+
+        if archive:
+            archive_conn = create_connection(archive_file)
+            if not create_archive(archive_conn):
+                raise Exception("Failed to open raw-payload archive.")
+
+        if not create_tables(conn):
+            logging.warning("Some tables failed to create. Continuing anyway...")
+        rows_before = conn.total_changes
+
+        logging.info(f"Starting ETL for first {POKEMON_TO_FETCH} Pokémon (strategy: {strategy})")
+
+        # === 2. Main ETL Loop with Progress Bar ===
+        # Use tqdm for nice progress bar (fallback to plain iterator if not installed)
+        extracted = metrics.timed_iter(extract_stream(strategy, adaptive, run.http), "extract")
+        try:
+            pbar = tqdm(extracted, total=POKEMON_TO_FETCH, desc="Processing Pokémon", unit="poke")
+        except:
+            pbar = extracted
+
+        for i, raw_data in pbar:
+            pokemon_name = f"ID:{i}"
+            stage = "extract"
+
+            try:
+                # --- EXTRACT ---
+                if not raw_data:
+                    logging.warning(f"Could not fetch data for ID: {i}")
+                    failure_count += 1
+                    run.dead_letter(i, stage, "ExtractError", "Could not fetch data")
+                    if isinstance(pbar, tqdm):
+                        pbar.set_postfix({"Last": "Not Fetched", "Success": success_count, "Fail": failure_count})
+                    continue
+
+                pokemon_name = raw_data.name.title()
+                if archive_conn:
+                    archive_payload(archive_conn, raw_data)
+
+                # --- TRANSFORM ---
+                stage = "transform"
+                with metrics.stage("transform"):
+                    transformed_data = transform_pokemon_data(raw_data)
+                if not transformed_data:
+                    logging.warning(f"Transformation failed for {pokemon_name} (ID: {i})")
+                    failure_count += 1
+                    run.dead_letter(i, stage, "TransformError", "Transformation failed", raw_data)
+                    if isinstance(pbar, tqdm):
+                        pbar.set_postfix({"Last": pokemon_name, "Success": success_count, "Fail": failure_count})
+                    continue
+
+                # --- LOAD ---
+                stage = "load"
+                with metrics.stage("load"):
+                    loaded = load_pokemon(conn, transformed_data)
+                if loaded:
+                    success_count += 1
+                    loaded_ids.append(i)
+                    logging.info(f"Successfully loaded {pokemon_name} (ID: {i})")
+                else:
+                    failure_count += 1
+                    logging.error(f"Failed to load {pokemon_name} (ID: {i})")
+                    run.dead_letter(i, stage, "LoadError", "load_pokemon() failed", raw_data)
+
+                # Update progress bar
+                if isinstance(pbar, tqdm):
+                    pbar.set_postfix({"Last": pokemon_name, "Success": success_count, "Fail": failure_count})
+
+            except Exception as e:
+                failure_count += 1
+                logging.error(f"Unexpected error processing Pokémon ID {i}: {e}")
+                run.dead_letter(i, stage, type(e).__name__, str(e), raw_data)
+                if isinstance(pbar, tqdm):
+                    pbar.set_postfix({"Last": pokemon_name, "Success": success_count, "Fail": failure_count})
+
+        # === 3. Summary ===
+        total = success_count + failure_count
+        logging.info("=" * 50)
+        logging.info("ETL PIPELINE COMPLETE")
+        logging.info(f"Total Processed : {total}")
+        logging.info(f"Successfully Loaded  : {success_count}")
+        logging.info(f"Failed           : {failure_count}")
+        logging.info("=" * 50)
+
+    except Exception as e:
+        logging.critical(f"CRITICAL ERROR in ETL pipeline: {e}")
+        error = run.error = f"{type(e).__name__}: {e}"
+        return []
+    finally:
+        metrics.success_count = success_count
+        metrics.failure_count = failure_count
+        if conn:
+            metrics.rows_written = conn.total_changes - rows_before
+            run.count_lookups(conn)
+        if resolve:
+            run.resolve(loaded_ids)
+        if owned:
+            run.finish(error is None and success_count > 0)
+        if archive_conn:
+            archive_conn.close()
+        if conn:
+            try:
+                conn.close()
+                logging.info("Database connection closed.")
+            except:
+                logging.error("Failed to close database connection.")
+
+    return loaded_ids
+
+
+def run_replay_pipeline(db_file=DATABASE_FILE, archive_file=RAW_ARCHIVE_FILE, workers=REPLAY_WORKERS,
+                        state_file=ETL_STATE_FILE, resolve=True, run=None):
+    """
+    Re-run Transform → Load from the raw-payload archive, without any API calls.
+    Decoding and transforming run in batches of TRANSFORM_BATCH_SIZE across `workers`
+    processes (see transform_in_processes; no pool with a single worker); loading stays in this process because SQLite allows a
+    single writer. Recorded in the run ledger like run_etl_pipeline (strategy "replay");
+    Pokémon that fail to transform or load are dead-lettered.
+    Returns the IDs loaded (empty if none or on failure).
+    """
+    run, owned = _begin_run(run, state_file, "replay", {
+        "archive_file": archive_file,
+        "workers": workers,
+        "batch_size": TRANSFORM_BATCH_SIZE,
+    })
+    metrics = run.metrics
+    loaded_ids = run.loaded_ids
+    conn = None
+    archive_conn = None
+    failure_count = 0
+    rows_before = 0
+
+    try:
+        if not os.path.exists(archive_file):
+            raise FileNotFoundError(f"No raw-payload archive at {archive_file}; run the ETL with --archive first.")
+
+        archive_conn = create_connection(archive_file)
+        conn = create_connection(db_file)
+        if not archive_conn or not conn:
+            raise Exception("Failed to connect to database.")
+        if not create_tables(conn):
+            logging.warning("Some tables failed to create. Continuing anyway...")
+        rows_before = conn.total_changes
+
+        total = archive_conn.execute("SELECT COUNT(*) FROM raw_payloads").fetchone()[0]
+        logging.info(f"Replaying {total} archived payload(s) from {archive_file} with {workers} worker(s)")
+
+        results = transform_in_processes(iter_archived(archive_conn), workers, TRANSFORM_BATCH_SIZE,
+                                         batch_transform=transform_archived_batch)
+        # Decoding + transforming is charged to "transform" as this process waits for it
+        results = metrics.timed_iter(results, "transform")
+
+        for pokemon_id, transformed_data in tqdm(results, total=total, desc="Replaying archive", unit="poke"):
+            if not transformed_data:
+                failure_count += 1
+                logging.error(f"Replay failed for Pokémon ID {pokemon_id}")
+                run.dead_letter(pokemon_id, "transform", "TransformError", "Archived payload did not transform")
+                continue
+            with metrics.stage("load"):
+                loaded = load_pokemon(conn, transformed_data)
+            if loaded:
+                loaded_ids.append(pokemon_id)
+            else:
+                failure_count += 1
+                logging.error(f"Replay failed for Pokémon ID {pokemon_id}")
+                run.dead_letter(pokemon_id, "load", "LoadError", "load_pokemon() failed")
+
+    except Exception as e:
+        logging.critical(f"CRITICAL ERROR in archive replay: {e}")
+        run.error = f"{type(e).__name__}: {e}"
+        return []
+    finally:
+        metrics.success_count = len(loaded_ids)
+        metrics.failure_count = failure_count
+        if conn:
+            metrics.rows_written = conn.total_changes - rows_before
+            run.count_lookups(conn)
+        if resolve:
+            run.resolve(loaded_ids)
+        if owned:
+            run.finish(run.error is None and bool(loaded_ids))
+        if archive_conn:
+            archive_conn.close()
+        if conn:
+            conn.close()
+
+    logging.info(f"Archive replay complete: {len(loaded_ids)} loaded, {failure_count} failed")
+    return loaded_ids
+
+def run_sharded_etl(workers=SHARD_WORKERS, db_file=DATABASE_FILE, state_file=ETL_STATE_FILE, run=None):
+    """
+    Split the ID range across `workers` processes, each loading into its own temporary
+    SQLite file, then ATTACH and merge every shard into `db_file`.
+    Recorded in the run ledger with strategy "sharded"; the shards' failures are dead-lettered.
+    """
+    shard_ids = split_id_range(1, POKEMON_TO_FETCH, workers)
+    logging.info(f"Starting sharded ETL: {POKEMON_TO_FETCH} Pokémon across {len(shard_ids)} worker(s)")
+
+    run, owned = _begin_run(run, state_file, "sharded", {
+        "first_id": 1,
+        "last_id": POKEMON_TO_FETCH,
+        "workers": len(shard_ids),
+    })
+    metrics = run.metrics
+    success_count = 0
+    failure_count = 0
+    conn = None
+
+    with tempfile.TemporaryDirectory(prefix="poke_shards_") as shard_dir:
+        shard_files = [os.path.join(shard_dir, f"shard_{i}.db") for i in range(len(shard_ids))]
+
+        try:
+            # Shards extract, transform and load in their own processes; only their wall time is seen here
+            with metrics.stage("extract"), ProcessPoolExecutor(max_workers=len(shard_ids)) as executor:
+                futures = [
+                    executor.submit(run_shard, i, ids, shard_file)
+                    for i, (ids, shard_file) in enumerate(zip(shard_ids, shard_files))
+                ]
+                shard_loaded = []
+                for future in as_completed(futures):
+                    _, loaded, failures, (http_calls, cache_hits, cache_misses) = future.result()
+                    run.http.increment(http_calls)
+                    metrics.add_lookups(cache_hits, cache_misses)
+                    shard_loaded.extend(loaded)
+                    success_count += len(loaded)
+                    failure_count += len(failures)
+                    for failure in failures:
+                        run.dead_letter(*failure)
+
+            conn = create_connection(db_file)
+            if not conn:
+                raise Exception("Failed to connect to database.")
+            if not create_tables(conn):
+                logging.warning("Some tables failed to create. Continuing anyway...")
+            rows_before = conn.total_changes
+
+            with metrics.stage("load"):
+                merged = merge_shards(conn, shard_files)
+            metrics.rows_written = conn.total_changes - rows_before
+            if merged < len(shard_files):
+                raise Exception(f"Only {merged}/{len(shard_files)} shards merged.")
+            run.loaded_ids.extend(shard_loaded)
+
+        except Exception as e:
+            logging.critical(f"CRITICAL ERROR in sharded ETL: {e}")
+            run.error = f"{type(e).__name__}: {e}"
+            return False
+        finally:
+            metrics.success_count = success_count
+            metrics.failure_count = failure_count
+            if owned:
+                # In place the merge is already committed; blue/green resolves after publish
+                run.resolve(run.loaded_ids)
+                run.finish(run.error is None and success_count > 0)
+            if conn:
+                conn.close()
+
+    logging.info("=" * 50)
+    logging.info("SHARDED ETL COMPLETE")
+    logging.info(f"Successfully Loaded  : {success_count}")
+    logging.info(f"Failed           : {failure_count}")
+    logging.info("=" * 50)
+    return success_count > 0
+
+
+def _keep_leases(state_file, worker_id, stop):
+    """
+    Renew every lease `worker_id` holds each third of QUEUE_LEASE_SECONDS until `stop` is set.
+    Runs on its own thread and connection, so an item stuck in fetch retries or a long
+    Retry-After keeps its lease instead of being claimed and processed again by another worker.
+    """
+    conn = create_connection(state_file)
+    if not conn:
+        logging.error(f"Worker {worker_id} cannot renew its leases: no ETL state database.")
+        return
+    try:
+        conn.execute(f"PRAGMA busy_timeout = {int(DB_BUSY_TIMEOUT_MS)}")
+        while not stop.wait(QUEUE_LEASE_SECONDS / 3):
+            heartbeat(conn, worker_id, QUEUE_LEASE_SECONDS)
+    finally:
+        conn.close()
+
+
+def run_queue_worker(worker_id=None, db_file=DATABASE_FILE, state_file=ETL_STATE_FILE,
+                     batch_size=QUEUE_BATCH_SIZE, seed=True, reset_queue=False):
+    """
+    Cooperative ETL worker: repeatedly lease a batch of IDs from the shared work queue,
+    process them, and mark each done or failed. Any number of workers (on any host that
+    shares the volume) can run this concurrently; leases of crashed workers expire and
+    are picked up by the others. Each worker records its own run (strategy "worker") and
+    dead-letters its failures like the single-process pipeline.
+
+    Seeding only adds IDs that are not queued yet, so once a refresh has drained the
+    queue, later workers find nothing to do. reset_queue=True starts a new refresh by
+    re-queuing done and failed items (items still leased are left to their owners).
+    """
+    worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+    run, _ = _begin_run(None, state_file, "worker", {
+        "worker_id": worker_id,
+        "first_id": 1,
+        "last_id": POKEMON_TO_FETCH,
+        "batch_size": batch_size,
+        "api_delay": API_DELAY,
+        "reset_queue": reset_queue,
+    })
+    metrics = run.metrics
+    state_conn = None
+    conn = None
+    success_count = 0
+    failure_count = 0
+    rows_before = 0
+    lease_keeper = None
+    stop_lease_keeper = threading.Event()
+
+    try:
+        state_conn = create_connection(state_file)
+        conn = create_connection(db_file)
+        if not state_conn or not conn:
+            raise Exception("Failed to connect to database.")
+        for c in (state_conn, conn):
+            c.execute(f"PRAGMA busy_timeout = {int(DB_BUSY_TIMEOUT_MS)}")
+
+        if not create_work_queue(state_conn):
+            raise Exception("Failed to create work queue.")
+        if not create_tables(conn):
+            logging.warning("Some tables failed to create. Continuing anyway...")
+        rows_before = conn.total_changes
+        if seed:
+            enqueue_ids(state_conn, range(1, POKEMON_TO_FETCH + 1), reset=reset_queue)
+
+        logging.info(f"Queue worker {worker_id} started")
+        lease_keeper = threading.Thread(target=_keep_leases, args=(state_file, worker_id, stop_lease_keeper),
+                                        name=f"lease-keeper-{worker_id}", daemon=True)
+        lease_keeper.start()
+
+        while True:
+            batch = claim_batch(state_conn, worker_id, batch_size, QUEUE_LEASE_SECONDS)
+            if not batch:
+                summary = queue_summary(state_conn)
+                if summary["pending"] == 0 and summary["leased"] == 0:
+                    if success_count + failure_count == 0 and summary["done"] + summary["failed"]:
+                        logging.warning("Work queue already drained by an earlier refresh; "
+                                        "start a new one with --reset-queue.")
+                    break
+                # Other workers still hold leases; wait in case one of them crashes
+                sleep(QUEUE_POLL_INTERVAL)
+                continue
+
+            for pokemon_id in batch:
+                stage = "extract"
+                raw_data = None
+                try:
+                    with metrics.stage("extract"):
+                        raw_data = fetch_pokemon_data(pokemon_id, counter=run.http)
+                    if not raw_data:
+                        raise Exception("extract failed")
+                    stage = "transform"
+                    with metrics.stage("transform"):
+                        transformed_data = transform_pokemon_data(raw_data)
+                    if not transformed_data:
+                        raise Exception("transform failed")
+                    stage = "load"
+                    with metrics.stage("load"):
+                        loaded = load_pokemon(conn, transformed_data)
+                    if not loaded:
+                        raise Exception("load failed")
+                    complete_item(state_conn, worker_id, pokemon_id)
+                    run.loaded_ids.append(pokemon_id)
+                    success_count += 1
+                except Exception as e:
+                    logging.error(f"Worker {worker_id} failed Pokémon ID {pokemon_id}: {e}")
+                    fail_item(state_conn, worker_id, pokemon_id, e)
+                    run.dead_letter(pokemon_id, stage, type(e).__name__, str(e), raw_data)
+                    failure_count += 1
+
+                # Respect API rate limit
+                sleep(API_DELAY)
+
+    except Exception as e:
+        logging.critical(f"CRITICAL ERROR in queue worker {worker_id}: {e}")
+        run.error = f"{type(e).__name__}: {e}"
+        return False
+    finally:
+        stop_lease_keeper.set()
+        if lease_keeper:
+            lease_keeper.join()
+        if state_conn:
+            # Hand back anything still leased (e.g. on KeyboardInterrupt)
+            release_leases(state_conn, worker_id)
+            state_conn.close()
+        metrics.success_count = success_count
+        metrics.failure_count = failure_count
+        if conn:
+            metrics.rows_written = conn.total_changes - rows_before
+            run.count_lookups(conn)
+            conn.close()
+        # Workers load in place, so whatever they loaded is no longer a dead letter
+        run.resolve(run.loaded_ids)
+        # A worker that found nothing left to claim still did its job
+        run.finish(run.error is None)
+
+    logging.info(f"Queue worker {worker_id} finished: {success_count} loaded, {failure_count} failed")
+    return True
+
+
+def _redrive_item(pokemon_id, raw_data, controller=None, counter=None):
+    """
+    Worker half of a re-drive: fetch one dead-lettered Pokémon (unless its payload was
+    parked) and transform it. Returns (pokemon_id, raw_data, transformed, failure) where
+    failure is None or (stage, error_class, error).
+    """
+    stage = "extract"
+    try:
+        if raw_data is None:
+            raw_data = fetch_pokemon_data(pokemon_id, controller, counter=counter)
+            if not raw_data:
+                return pokemon_id, None, None, (stage, "ExtractError", "Could not fetch data")
+        stage = "transform"
+        transformed_data = transform_pokemon_data(raw_data)
+        if not transformed_data:
+            return pokemon_id, raw_data, None, (stage, "TransformError", "Transformation failed")
+        return pokemon_id, raw_data, transformed_data, None
+    except Exception as e:
+        return pokemon_id, raw_data, None, (stage, type(e).__name__, str(e))
+
+
+def run_redrive(db_file=DATABASE_FILE, state_file=ETL_STATE_FILE, workers=MAX_CONCURRENCY,
+                rounds=REDRIVE_MAX_ROUNDS, resolve=True, run=None):
+    """
+    Reprocess only the Pokémon parked in the dead-letter table. Items are fetched and
+    transformed on a thread pool (adaptively throttled; parked payloads skip the API) and
+    loaded on this thread; what still fails is retried for up to `rounds` passes with
+    jittered backoff in between. With resolve=False the recovered items stay parked, for
+    callers that only commit them later (see run_blue_green_redrive).
+
+    Returns {"redriven", "resolved", "remaining", "resolved_ids"}, or None on a fatal error.
+    """
+    if not os.path.exists(state_file):
+        logging.info(f"No ETL state at {state_file}; nothing to re-drive.")
+        return {"redriven": 0, "resolved": 0, "remaining": 0, "resolved_ids": []}
+
+    conn = None
+    rows_before = 0
+    pending = {}
+
+    run, owned = _begin_run(run, state_file, "redrive", {
+        "workers": workers,
+        "rounds": rounds,
+        "resolve": resolve,
+    })
+    if not run.conn:
+        return None
+    metrics = run.metrics
+    resolved_ids = run.loaded_ids
+
+    try:
+        pending = dead_letter_payloads(run.conn)
+        redriven = len(pending)
+        if not pending:
+            logging.info("Dead-letter table is empty; nothing to re-drive.")
+            return {"redriven": 0, "resolved": 0, "remaining": 0, "resolved_ids": []}
+
+        conn = create_connection(db_file)
+        if not conn:
+            raise Exception("Failed to connect to database.")
+        if not create_tables(conn):
+            logging.warning("Some tables failed to create. Continuing anyway...")
+        rows_before = conn.total_changes
+
+        logging.info(f"Re-driving {redriven} dead-lettered Pokémon with {workers} worker(s)")
+        controller = AdaptiveController(max_limit=max(1, workers))
+
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            for attempt in range(rounds):
+                if attempt:
+                    # Give a struggling upstream room before the next pass
+                    sleep(backoff_delay(attempt))
+                    logging.info(f"Re-drive pass {attempt + 1}: {len(pending)} Pokémon still failing")
+
+                futures = [executor.submit(_redrive_item, pid, raw, controller, run.http) for pid, raw in pending.items()]
+                for future in as_completed(futures):
+                    pokemon_id, raw_data, transformed_data, failure = future.result()
+                    if failure is None:
+                        with metrics.stage("load"):
+                            if load_pokemon(conn, transformed_data):
+                                resolved_ids.append(pokemon_id)
+                                pending.pop(pokemon_id)
+                                continue
+                        failure = ("load", "LoadError", "load_pokemon() failed")
+                    stage, error_class, message = failure
+                    if raw_data is not None:
+                        pending[pokemon_id] = raw_data
+                    run.dead_letter(pokemon_id, stage, error_class, message, raw_data)
+
+                if not pending:
+                    break
+
+        if resolve:
+            run.resolve(resolved_ids)
+
+    except Exception as e:
+        logging.critical(f"CRITICAL ERROR in dead-letter re-drive: {e}")
+        run.error = f"{type(e).__name__}: {e}"
+        return None
+    finally:
+        metrics.success_count = len(resolved_ids)
+        metrics.failure_count = len(pending)
+        if conn:
+            metrics.rows_written = conn.total_changes - rows_before
+            run.count_lookups(conn)
+            conn.close()
+        if owned:
+            run.finish(run.error is None)
+
+    logging.info(f"Re-drive complete: {len(resolved_ids)} recovered, {len(pending)} still dead-lettered")
+    return {
+        "redriven": redriven,
+        "resolved": len(resolved_ids),
+        "remaining": len(pending),
+        "resolved_ids": sorted(resolved_ids),
+    }
+
+
+def run_blue_green(build, serving_file=DATABASE_FILE, staging_file=STAGING_DATABASE_FILE,
+                   packed_file=PACKED_SNAPSHOT_FILE, run=None, wait=False):
+    """
+    Blue/green refresh: run `build(db_file)` against a staging copy of the serving database,
+    verify it, then atomically swap it in. The API never sees a half-refreshed dataset.
+    With EXPORT_PACKED_SNAPSHOT the published data is also written to `packed_file`, the
+    memory-mapped image shared by API workers.
+
+    Only one refresh of `serving_file` runs at a time: if another holds its lock this raises
+    RefreshInProgress, or waits for it with `wait`.
+
+    `run` is the RunRecord the build records into. Its final status is written here, once
+    the snapshot is published or rejected, and the Pokémon it loaded leave the dead-letter
+    table only if the snapshot was published.
+    """
+    with refresh_lock(serving_file, wait):
+        logging.info(f"Blue/green ETL: building into {staging_file}")
+        error = None
+        if not prepare_staging(serving_file, staging_file):
+            error = "Staging preparation failed"
+        elif not build(staging_file):
+            error = "Staging build failed"
+        elif not verify_database(staging_file):
+            error = "Staging verification failed"
+        elif not publish_snapshot(staging_file, serving_file):
+            error = "Publishing the staging snapshot failed"
+
+        if error:
+            logging.error(f"{error}; serving snapshot left unchanged.")
+        if run:
+            if error is None:
+                run.resolve(run.loaded_ids)
+            run.finish(error is None, error)
+        if error:
+            return False
+
+        # Best effort: without a matching image the API simply reads SQLite
+        if EXPORT_PACKED_SNAPSHOT:
+            export_packed_snapshot(serving_file, packed_file)
+        return True
+
+
+def run_blue_green_etl(strategy=EXTRACT_STRATEGY, adaptive=ADAPTIVE_CONCURRENCY, archive=ARCHIVE_RAW_PAYLOADS,
+                       serving_file=DATABASE_FILE, staging_file=STAGING_DATABASE_FILE,
+                       packed_file=PACKED_SNAPSHOT_FILE, state_file=ETL_STATE_FILE):
+    """
+    Run the standard ETL pipeline through the blue/green staging swap. Dead letters it
+    recovers leave the dead-letter table only once the new snapshot is published.
+    """
+    run = RunRecord()
+    build = lambda db_file: run_etl_pipeline(strategy, adaptive, db_file=db_file, archive=archive,
+                                             state_file=state_file, resolve=False, run=run)
+    return run_blue_green(build, serving_file, staging_file, packed_file, run)
+
+
+def run_blue_green_sharded(workers=SHARD_WORKERS, serving_file=DATABASE_FILE, staging_file=STAGING_DATABASE_FILE,
+                           packed_file=PACKED_SNAPSHOT_FILE, state_file=ETL_STATE_FILE):
+    """Run the sharded ETL through the blue/green staging swap."""
+    run = RunRecord()
+    build = lambda db_file: run_sharded_etl(workers, db_file=db_file, state_file=state_file, run=run)
+    return run_blue_green(build, serving_file, staging_file, packed_file, run)
+
+
+def _has_dead_letters(state_file):
+    if not os.path.exists(state_file):
+        return False
+    conn = create_connection(state_file)
+    if not conn:
+        return False
+    try:
+        return has_dead_letters(conn)
+    finally:
+        conn.close()
+
+
+def run_blue_green_redrive(state_file=ETL_STATE_FILE, workers=MAX_CONCURRENCY, rounds=REDRIVE_MAX_ROUNDS,
+                           serving_file=DATABASE_FILE, staging_file=STAGING_DATABASE_FILE,
+                           packed_file=PACKED_SNAPSHOT_FILE):
+    """
+    Re-drive dead letters into a staging copy and swap it in. Recovered items leave the
+    dead-letter table only once the new snapshot is published. With nothing parked, no
+    staging copy is built or published.
+    """
+    if not _has_dead_letters(state_file):
+        logging.info("Dead-letter table is empty; nothing to re-drive.")
+        return {"redriven": 0, "resolved": 0, "remaining": 0, "resolved_ids": []}
+
+    run = RunRecord()
+    result = {}
+
+    def build(db_file):
+        summary = run_redrive(db_file, state_file, workers, rounds, resolve=False, run=run)
+        if summary is None:
+            return False
+        result.update(summary)
+        return True
+
+    if not run_blue_green(build, serving_file, staging_file, packed_file, run):
+        return None
+    return result
+
+
+def migrate_database(db_file=DATABASE_FILE):
+    """
+    Bring `db_file` to the current schema without running the ETL: create_tables() migrates
+    older layouts in place and backfills derived tables (documents, closure, aggregates).
+    """
+    conn = create_connection(db_file)
+    if not conn:
+        return False
+    try:
+        return create_tables(conn)
+    finally:
+        conn.close()
+
+
+def ensure_schema(serving_file=DATABASE_FILE, staging_file=STAGING_DATABASE_FILE, packed_file=PACKED_SNAPSHOT_FILE):
+    """
+    Migrate the serving database if it predates SCHEMA_VERSION (e.g. the bundled v1 file),
+    through the blue/green swap. Returns False only if an older schema could not be migrated.
+    """
+    if not os.path.exists(serving_file):
+        return True
+    conn = create_connection(serving_file)
+    if not conn:
+        return False
+    try:
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+    finally:
+        conn.close()
+    if version >= SCHEMA_VERSION:
+        return True
+    logging.info(f"{serving_file} is at schema v{version}; migrating to v{SCHEMA_VERSION}")
+    # Several API workers may start together: wait for whichever migrates first
+    return run_blue_green(migrate_database, serving_file, staging_file, packed_file, wait=True)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Pokémon ETL pipeline")
+    parser.add_argument("--strategy", choices=["per_id", "chain", "replay"], default=EXTRACT_STRATEGY,
+                        help="Extraction strategy ('replay' reloads from the raw-payload archive)")
+    parser.add_argument("--archive", action="store_true", default=ARCHIVE_RAW_PAYLOADS,
+                        help="Store every extracted payload in RAW_ARCHIVE_FILE for later replay")
+    parser.add_argument("--adaptive", action="store_true", default=ADAPTIVE_CONCURRENCY,
+                        help="Use adaptive concurrency instead of a fixed API_DELAY")
+    parser.add_argument("--shards", type=int, default=0,
+                        help="Run a multi-process sharded ETL with this many workers")
+    parser.add_argument("--worker", action="store_true",
+                        help="Run as a cooperative worker against the shared work queue (requires --in-place)")
+    parser.add_argument("--reset-queue", action="store_true",
+                        help="With --worker: re-queue done/failed items to start a new refresh")
+    parser.add_argument("--in-place", action="store_true",
+                        help="Write straight into DATABASE_FILE instead of a staging file + atomic swap")
+    parser.add_argument("--redrive", action="store_true",
+                        help="Reprocess only the Pokémon parked in the dead-letter table")
+    parser.add_argument("--migrate", action="store_true",
+                        help="Upgrade DATABASE_FILE to the current schema (and backfill) without fetching")
+    args = parser.parse_args(argv)
+    # Workers on several hosts share no single staging build to verify and publish, so they
+    # write straight into DATABASE_FILE; make the caller opt out of blue/green explicitly.
+    if args.worker and not args.in_place:
+        parser.error("--worker writes straight into DATABASE_FILE; pass --in-place to confirm")
+    if args.reset_queue and not args.worker:
+        parser.error("--reset-queue only applies to --worker")
+    return args
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    try:
+        if args.worker:
+            run_queue_worker(reset_queue=args.reset_queue)
+        elif args.migrate:
+            if args.in_place:
+                migrate_database()
+            else:
+                run_blue_green(migrate_database)
+        elif args.redrive:
+            if args.in_place:
+                run_redrive()
+            else:
+                run_blue_green_redrive()
+        elif args.in_place:
+            if args.shards > 0:
+                loaded = run_sharded_etl(workers=args.shards)
+            else:
+                loaded = run_etl_pipeline(args.strategy, args.adaptive, archive=args.archive)
+            if loaded and EXPORT_PACKED_SNAPSHOT:
+                export_packed_snapshot(DATABASE_FILE)
+        elif args.shards > 0:
+            run_blue_green_sharded(args.shards)
+        else:
+            run_blue_green_etl(args.strategy, args.adaptive, args.archive)
+    except RefreshInProgress as e:
+        logging.error(f"{e}; try again once it has finished.")
@@ -0,0 +1,41 @@
+import secrets
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from typing import Literal, Optional
+from db_profiler import profiler
+from schemas import QueryProfile, QueryReport
+from constants import PROFILE_TOP_DEFAULT, ADMIN_TOKEN
+
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """
+    The admin endpoints only exist while SQL_PROFILING is on, and when ADMIN_TOKEN is set
+    they also require it in the X-Admin-Token header.
+    """
+    if not profiler.enabled:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if ADMIN_TOKEN and not (x_admin_token and secrets.compare_digest(x_admin_token, ADMIN_TOKEN)):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+
+router = APIRouter(prefix="/admin", tags=["admin"], dependencies=[Depends(require_admin)])
+
+
+@router.get("/queries", response_model=QueryReport)
+def get_query_profile(
+    limit: int = Query(PROFILE_TOP_DEFAULT, ge=1, le=500),
+    sort_by: Literal["total", "max", "avg", "count"] = Query("total")
+):
+    """
+    Heaviest SQL statements seen by this process since start-up (or the last reset).
+    """
+    return QueryReport(
+        enabled=profiler.enabled,
+        slow_query_ms=profiler.slow_ms,
+        queries=[QueryProfile(**row) for row in profiler.top(limit, sort_by)],
+    )
+
+
+@router.delete("/queries", status_code=204)
+def reset_query_profile():
+    """Clear the collected statistics."""
+    profiler.reset()
@@ -1,114 +1,119 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
-from typing import List, Optional
+from fastapi.responses import Response
+from typing import List, Literal, Optional
+import json
 import sqlite3
 from database import get_db
-from schemas import PokemonOut, PokemonStat, EvolutionLink
+from crud import etl as pokemon_repo
+from schemas import (
+    PokemonOut, PokemonStat, EvolutionLink, EvolutionRelative, FamilyMember, EvolutionFamily,
+    BatchRequest, BatchItem,
+)
+from constants import BATCH_MAX_ITEMS
 
 router = APIRouter(prefix="/pokemon", tags=["pokemon"])
 
+
+def check_sort_by(sort_by):
+    """Reject an unknown sort field with a 422 before any query runs."""
+    if sort_by not in pokemon_repo.SORT_KEYS:
+        raise HTTPException(status_code=422, detail=f"sort_by must be one of: {', '.join(pokemon_repo.SORT_KEYS)}")
+
+
 def fetch_pokemon_from_db(conn, pokemon_id):
-    """Helper function to fetch and construct a single Pokemon object."""
-    
-    # 1. Fetch main data
-    main_cursor = conn.execute("SELECT * FROM pokemon WHERE id = ?", (pokemon_id,))
-    pokemon = main_cursor.fetchone()
-    if not pokemon:
+    """Build a PokemonOut from the normalised tables (snapshots without documents)."""
+    record = pokemon_repo.get_record(conn, pokemon_id)
+    if not record:
         return None
-
-    # 2. Fetch types
-    types_cursor = conn.execute(
-        "SELECT type_name FROM pokemon_types WHERE pokemon_id = ?", (pokemon_id,)
-    )
-    types = [row['type_name'] for row in types_cursor.fetchall()]
-    
-    # 3. Fetch abilities
-    abilities_cursor = conn.execute(
-        "SELECT ability_name FROM pokemon_abilities WHERE pokemon_id = ?", (pokemon_id,)
-    )
-    abilities = [row['ability_name'] for row in abilities_cursor.fetchall()]
-    
-    # 4. Fetch stats
-    stats_cursor = conn.execute(
-        "SELECT stat_name, base_stat FROM pokemon_stats WHERE pokemon_id = ?", (pokemon_id,)
+    return PokemonOut(
+        id=record.id,
+        name=record.name,
+        is_evolved=record.is_evolved,
+        types=list(record.types),
+        abilities=list(record.abilities),
+        stats=[PokemonStat(stat_name=name, base_stat=value) for name, value in record.stats],
+        evolution_chain=[EvolutionLink(name=name, stage=stage) for name, stage in record.evolution_chain]
     )
-    stats = [PokemonStat(stat_name=row['stat_name'], base_stat=row['base_stat']) for row in stats_cursor.fetchall()]
-    
-    # 5. Fetch evolution chain
-    # This is a bit more complex, we need to find the chain, then get all links
-    evo_cursor = conn.execute(
-        """
-        SELECT el.pokemon_name, el.stage
-        FROM evolution_links el
-        JOIN evolution_chains ec ON el.chain_id = ec.id
-        WHERE ec.chain_identifier = (
-            SELECT chain_identifier FROM evolution_chains ec2
-            JOIN evolution_links el2 ON ec2.id = el2.chain_id
-            WHERE el2.pokemon_name = ?
-        )
-        ORDER BY el.stage
-        """, (pokemon['name'],)
-    )
-    evolutions = [EvolutionLink(name=row['pokemon_name'], stage=row['stage']) for row in evo_cursor.fetchall()]
-
-    # Construct the final Pydantic object
-    pokemon_out = PokemonOut(
-        id=pokemon['id'],
-        name=pokemon['name'],
-        is_evolved=bool(pokemon['is_evolved']),
-        types=types,
-        abilities=abilities,
-        stats=stats,
-        evolution_chain=evolutions
-    )
-    return pokemon_out
 
 
 @router.get("/", response_model=List[PokemonOut])
 def get_all_pokemon(
     search: Optional[str] = Query(None, description="Search by name"),
     type: Optional[str] = Query(None, description="Filter by type"),
+    sort_by: str = Query("id", description="id, name or a stat name, e.g. speed"),
+    order: Literal["asc", "desc"] = Query("asc"),
+    limit: Optional[int] = Query(None, ge=1, description="Return at most this many Pokémon"),
+    db: sqlite3.Connection = Depends(get_db)
+):
+    """
+    Get a list of all Pokémon, with optional search and type filtering, sorted by
+    id, name or any stat (e.g. sort_by=speed&order=desc&limit=20).
+    """
+    check_sort_by(sort_by)
+    try:
+        # Serve the documents pre-rendered by the ETL, concatenated into one JSON array
+        docs = pokemon_repo.list_docs(db, search, type, sort_by, order, limit)
+        return Response(content="[" + ",".join(docs) + "]", media_type="application/json")
+    except sqlite3.Error as e:
+        raise HTTPException(status_code=500, detail=f"Database query error: {e}")
+
+def batch_lookup(db, ids, names):
+    """
+    Resolve many IDs and names with one set-based query. Returns a JSON array (as a string)
+    with one {query, found, pokemon} item per requested key: IDs first, then names, each
+    in request order.
+    """
+    if len(ids) + len(names) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=422, detail=f"At most {BATCH_MAX_ITEMS} IDs and names per batch")
+    names = [name.lower() for name in names]
+
+    by_id, by_name = {}, {}
+    for pokemon_id, name, doc in pokemon_repo.batch_rows(db, ids, names):
+        if doc is None:
+            # Snapshot built before documents were materialised
+            doc = fetch_pokemon_from_db(db, pokemon_id).model_dump_json()
+        by_id[pokemon_id] = by_name[name] = doc
+
+    items = []
+    for query, doc in [(pid, by_id.get(pid)) for pid in ids] + [(name, by_name.get(name)) for name in names]:
+        if doc is None:
+            items.append(f'{{"query":{json.dumps(query)},"found":false,"pokemon":null}}')
+        else:
+            items.append(f'{{"query":{json.dumps(query)},"found":true,"pokemon":{doc}}}')
+    return "[" + ",".join(items) + "]"
+
+
+@router.get("/batch", response_model=List[BatchItem])
+def get_pokemon_batch(
+    ids: Optional[str] = Query(None, description="Comma-separated Pokémon IDs, e.g. 1,4,7"),
+    names: Optional[str] = Query(None, description="Comma-separated Pokémon names"),
     db: sqlite3.Connection = Depends(get_db)
 ):
     """
-    Get a list of all Pokémon, with optional search and type filtering.
+    Fetch many Pokémon in one round trip. Results follow request order (IDs, then names);
+    keys that match nothing come back with found = false.
     """
-    query = "SELECT id FROM pokemon"
-    params = []
-    
-    if search or type:
-        query += " WHERE 1=1" # Start where clause
-    
-    if search:
-        query += " AND name LIKE ?"
-        params.append(f"%{search.lower()}%")
-        
-    if type:
-        # Join with pokemon_types to filter by type
-        query += """
-            AND id IN (
-                SELECT pokemon_id FROM pokemon_types WHERE type_name = ?
-            )
-        """
-        params.append(type.lower())
-        
-    query += " ORDER BY id"
-    
     try:
-        id_cursor = db.execute(query, tuple(params))
-        pokemon_ids = [row['id'] for row in id_cursor.fetchall()]
-        
-        # Now fetch the full data for each matched ID
-        pokemon_list = []
-        for pid in pokemon_ids:
-            pokemon_data = fetch_pokemon_from_db(db, pid)
-            if pokemon_data:
-                pokemon_list.append(pokemon_data)
-                
-        return pokemon_list
-        
+        id_list = [int(part) for part in (ids or "").split(",") if part.strip()]
+    except ValueError:
+        raise HTTPException(status_code=422, detail="ids must be a comma-separated list of integers")
+    name_list = [part.strip() for part in (names or "").split(",") if part.strip()]
+
+    try:
+        return Response(content=batch_lookup(db, id_list, name_list), media_type="application/json")
     except sqlite3.Error as e:
         raise HTTPException(status_code=500, detail=f"Database query error: {e}")
 
+
+@router.post("/batch", response_model=List[BatchItem])
+def post_pokemon_batch(request: BatchRequest, db: sqlite3.Connection = Depends(get_db)):
+    """Same as GET /pokemon/batch, for key sets too large for a query string."""
+    try:
+        return Response(content=batch_lookup(db, request.ids, request.names), media_type="application/json")
+    except sqlite3.Error as e:
+        raise HTTPException(status_code=500, detail=f"Database query error: {e}")
+
+
 @router.get("/{pokemon_id}", response_model=PokemonOut)
 def get_pokemon_by_id(
     pokemon_id: int,
@@ -123,9 +128,57 @@ app.js
     Get a single Pokémon by its ID.
     """
     try:
+        doc = pokemon_repo.get_doc(db, pokemon_id)
+        if doc:
+            return Response(content=doc, media_type="application/json")
+
+        # Snapshot built before documents were materialised
         pokemon = fetch_pokemon_from_db(db, pokemon_id)
         if not pokemon:
             raise HTTPException(status_code=404, detail="Pokemon not found")
         return pokemon
     except sqlite3.Error as e:
         raise HTTPException(status_code=500, detail=f"Database query error: {e}")
+
+
+def _require_pokemon(db, pokemon_id):
+    if not pokemon_repo.exists(db, pokemon_id):
+        raise HTTPException(status_code=404, detail="Pokemon not found")
+
+
+@router.get("/{pokemon_id}/ancestors", response_model=List[EvolutionRelative])
+def get_pokemon_ancestors(pokemon_id: int, db: sqlite3.Connection = Depends(get_db)):
+    """Everything this Pokémon evolves from, nearest first."""
+    try:
+        rows = pokemon_repo.ancestors(db, pokemon_id)
+        if not rows:
+            _require_pokemon(db, pokemon_id)
+        return [EvolutionRelative(name=row.name, depth=row.depth) for row in rows]
+    except sqlite3.Error as e:
+        raise HTTPException(status_code=500, detail=f"Database query error: {e}")
+
+
+@router.get("/{pokemon_id}/descendants", response_model=List[EvolutionRelative])
+def get_pokemon_descendants(pokemon_id: int, db: sqlite3.Connection = Depends(get_db)):
+    """Everything this Pokémon can evolve into, across all branches, nearest first."""
+    try:
+        rows = pokemon_repo.descendants(db, pokemon_id)
+        if not rows:
+            _require_pokemon(db, pokemon_id)
+        return [EvolutionRelative(name=row.name, depth=row.depth) for row in rows]
+    except sqlite3.Error as e:
+        raise HTTPException(status_code=500, detail=f"Database query error: {e}")
+
+
+@router.get("/{pokemon_id}/family", response_model=EvolutionFamily)
+def get_pokemon_family(pokemon_id: int, db: sqlite3.Connection = Depends(get_db)):
+    """The whole evolution tree this Pokémon belongs to, with each member's parent."""
+    try:
+        rows = pokemon_repo.family(db, pokemon_id)
+        if not rows:
+            _require_pokemon(db, pokemon_id)
+            raise HTTPException(status_code=404, detail="No evolution data for this Pokemon")
+        members = [FamilyMember(name=row.name, stage=row.depth + 1, parent=row.parent) for row in rows]
+        return EvolutionFamily(root=members[0].name, members=members)
+    except sqlite3.Error as e:
+        raise HTTPException(status_code=500, detail=f"Database query error: {e}")
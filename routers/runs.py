@@ -0,0 +1,89 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from typing import List, Literal, Optional
+import sqlite3
+from database import get_state_db
+from crud import etl as pokemon_repo
+from data_processing.run_ledger import compare_runs
+from data_processing.dead_letters import DEAD_LETTER_STAGES
+from schemas import EtlRun, RunComparison, DeadLetter
+
+router = APIRouter(prefix="/etl", tags=["etl"])
+
+
+@router.get("/runs", response_model=List[EtlRun])
+def get_runs(
+    limit: int = Query(20, ge=1, le=500),
+    strategy: Optional[str] = Query(None, description="Only runs of this extract strategy"),
+    db: Optional[sqlite3.Connection] = Depends(get_state_db)
+):
+    """Past ETL runs, most recent first, with per-stage timings and throughput."""
+    if db is None:
+        return []
+    try:
+        return pokemon_repo.list_runs(db, limit, strategy)
+    except sqlite3.OperationalError:
+        # State database exists but no run has been recorded yet
+        return []
+
+
+@router.get("/runs/compare", response_model=RunComparison)
+def get_run_comparison(
+    baseline: Optional[int] = Query(None, description="Run id; defaults to the run before the candidate"),
+    candidate: Optional[int] = Query(None, description="Run id; defaults to the latest finished run"),
+    db: Optional[sqlite3.Connection] = Depends(get_state_db)
+):
+    """Compare two runs metric by metric, e.g. to spot a throughput regression."""
+    if db is None:
+        raise HTTPException(status_code=404, detail="No ETL runs recorded")
+    try:
+        if candidate is None:
+            finished = [run for run in pokemon_repo.list_runs(db, 50) if run["finished_at"]]
+            if not finished:
+                raise HTTPException(status_code=404, detail="No finished ETL runs recorded")
+            candidate = finished[0]["id"]
+        candidate_run = pokemon_repo.get_run(db, candidate)
+        if candidate_run is None:
+            raise HTTPException(status_code=404, detail=f"Run {candidate} not found")
+
+        if baseline is None:
+            earlier = [run for run in pokemon_repo.list_runs(db, 50, candidate_run["strategy"])
+                       if run["id"] < candidate and run["finished_at"]]
+            if not earlier:
+                raise HTTPException(status_code=404, detail=f"No earlier run to compare run {candidate} with")
+            baseline = earlier[0]["id"]
+        baseline_run = pokemon_repo.get_run(db, baseline)
+        if baseline_run is None:
+            raise HTTPException(status_code=404, detail=f"Run {baseline} not found")
+    except sqlite3.Error as e:
+        raise HTTPException(status_code=500, detail=f"Database query error: {e}")
+
+    return RunComparison(baseline=baseline_run, candidate=candidate_run,
+                         metrics=compare_runs(baseline_run, candidate_run))
+
+
+@router.get("/runs/{run_id}", response_model=EtlRun)
+def get_run_by_id(run_id: int, db: Optional[sqlite3.Connection] = Depends(get_state_db)):
+    """One ETL run."""
+    try:
+        run = pokemon_repo.get_run(db, run_id) if db is not None else None
+    except sqlite3.OperationalError:
+        run = None
+    if run is None:
+        raise HTTPException(status_code=404, detail="Run not found")
+    return run
+
+
+@router.get("/dead-letters", response_model=List[DeadLetter])
+def get_dead_letters(
+    stage: Optional[Literal[DEAD_LETTER_STAGES]] = Query(None, description="Only items that failed at this stage"),
+    limit: int = Query(100, ge=1, le=5000),
+    db: Optional[sqlite3.Connection] = Depends(get_state_db)
+):
+    """Pokémon parked after failing an ETL stage, oldest failure first."""
+    if db is None:
+        return []
+    try:
+        return pokemon_repo.list_dead_letters(db, stage, limit)
+    except sqlite3.OperationalError:
+        # State database exists but nothing has been dead-lettered yet
+        return []
@@ -0,0 +1,67 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from typing import List, Literal, Optional
+import sqlite3
+from database import get_db
+from schemas import SimilarPokemon, SimilarResult
+from stat_matrix import get_stat_matrix
+from constants import SIMILAR_DEFAULT_K, SIMILAR_MAX_K, BATCH_MAX_ITEMS
+
+router = APIRouter(prefix="/pokemon", tags=["similarity"])
+
+
+def _to_models(neighbours):
+    return [SimilarPokemon(id=pid, name=name, score=score) for pid, name, score in neighbours]
+
+
+@router.get("/similar", response_model=List[SimilarResult])
+def get_similar_batch(
+    ids: str = Query(..., description="Comma-separated Pokémon IDs, e.g. 1,4,7"),
+    k: int = Query(SIMILAR_DEFAULT_K, ge=1, le=SIMILAR_MAX_K),
+    metric: Literal["cosine", "euclidean"] = Query("cosine"),
+    type: Optional[List[str]] = Query(None, description="Only return Pokémon of these types"),
+    db: sqlite3.Connection = Depends(get_db)
+):
+    """
+    Batch mode: nearest stat spreads for many Pokémon in one request, in request order.
+    Unknown IDs come back with similar = null. At most BATCH_MAX_ITEMS IDs per request,
+    since each one adds a row to the query × dex similarity matrix.
+    """
+    try:
+        pokemon_ids = [int(part) for part in ids.split(",") if part.strip()]
+    except ValueError:
+        raise HTTPException(status_code=422, detail="ids must be a comma-separated list of integers")
+    if len(pokemon_ids) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=422, detail=f"At most {BATCH_MAX_ITEMS} IDs per batch")
+
+    try:
+        matrix = get_stat_matrix(db)
+    except sqlite3.Error as e:
+        raise HTTPException(status_code=500, detail=f"Database query error: {e}")
+
+    types = [t.lower() for t in type] if type else None
+    results = matrix.similar(pokemon_ids, k, metric, types)
+    return [
+        SimilarResult(id=pid, similar=None if neighbours is None else _to_models(neighbours))
+        for pid, neighbours in zip(pokemon_ids, results)
+    ]
+
+
+@router.get("/{pokemon_id}/similar", response_model=List[SimilarPokemon])
+def get_similar(
+    pokemon_id: int,
+    k: int = Query(SIMILAR_DEFAULT_K, ge=1, le=SIMILAR_MAX_K),
+    metric: Literal["cosine", "euclidean"] = Query("cosine"),
+    type: Optional[List[str]] = Query(None, description="Only return Pokémon of these types"),
+    db: sqlite3.Connection = Depends(get_db)
+):
+    """Pokémon whose base-stat spread is most like this one's, closest first."""
+    try:
+        matrix = get_stat_matrix(db)
+    except sqlite3.Error as e:
+        raise HTTPException(status_code=500, detail=f"Database query error: {e}")
+
+    types = [t.lower() for t in type] if type else None
+    neighbours = matrix.similar([pokemon_id], k, metric, types)[0]
+    if neighbours is None:
+        raise HTTPException(status_code=404, detail="Pokemon not found")
+    return _to_models(neighbours)
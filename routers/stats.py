@@ -0,0 +1,57 @@
+from fastapi import APIRouter, Depends, HTTPException
+from typing import List
+import sqlite3
+from database import get_db
+from crud import etl as pokemon_repo
+from schemas import StatSummary, TypeStats, StatsOverview
+
+router = APIRouter(prefix="/stats", tags=["stats"])
+
+# Both endpoints read only the aggregate tables maintained by load_pokemon(), so their
+# cost grows with the number of types and stats, not with the number of Pokémon.
+
+
+def _summary(stat):
+    return StatSummary(
+        stat_name=stat.stat_name,
+        average=round(stat.total / stat.count, 2),
+        min=stat.min,
+        max=stat.max,
+    )
+
+
+@router.get("/types", response_model=List[TypeStats])
+def get_type_stats(db: sqlite3.Connection = Depends(get_db)):
+    """Per-type Pokémon counts, evolved/unevolved split and stat averages, min and max."""
+    try:
+        aggregates = pokemon_repo.type_aggregates(db)
+    except sqlite3.Error as e:
+        raise HTTPException(status_code=500, detail=f"Database query error: {e}")
+
+    return [
+        TypeStats(
+            type=entry.type_name,
+            pokemon_count=entry.pokemon_count,
+            evolved_count=entry.evolved_count,
+            unevolved_count=entry.pokemon_count - entry.evolved_count,
+            stats=[_summary(stat) for stat in entry.stats],
+        )
+        for entry in aggregates
+    ]
+
+
+@router.get("/overview", response_model=StatsOverview)
+def get_overview(db: sqlite3.Connection = Depends(get_db)):
+    """Totals across all Pokémon: counts, evolved/unevolved split and per-stat summaries."""
+    try:
+        totals = pokemon_repo.overview(db)
+    except sqlite3.Error as e:
+        raise HTTPException(status_code=500, detail=f"Database query error: {e}")
+
+    return StatsOverview(
+        pokemon_count=totals.pokemon_count,
+        evolved_count=totals.evolved_count,
+        unevolved_count=totals.pokemon_count - totals.evolved_count,
+        type_count=totals.type_count,
+        stats=[_summary(stat) for stat in totals.stats],
+    )
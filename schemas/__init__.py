@@ -0,0 +1,14 @@
+from schemas.etl import (
+    PokemonOut,
+    PokemonStat,
+    EvolutionLink,
+    EvolutionRelative,
+    FamilyMember,
+    EvolutionFamily,
+    BatchRequest,
+    BatchItem,
+)
+from schemas.similarity import SimilarPokemon, SimilarResult
+from schemas.stats import StatSummary, TypeStats, StatsOverview
+from schemas.admin import QueryProfile, QueryReport
+from schemas.runs import EtlRun, MetricChange, RunComparison, DeadLetter, RedriveResult
@@ -0,0 +1,18 @@
+from typing import List
+
+from pydantic import BaseModel
+
+
+class QueryProfile(BaseModel):
+    sql: str        # normalised statement text
+    count: int
+    total_ms: float
+    avg_ms: float
+    max_ms: float
+    rows: int       # rows returned across all executions
+
+
+class QueryReport(BaseModel):
+    enabled: bool
+    slow_query_ms: float
+    queries: List[QueryProfile]
@@ -0,0 +1,50 @@
+from typing import List, Optional, Union
+
+from pydantic import BaseModel
+
+
+class PokemonStat(BaseModel):
+    stat_name: str
+    base_stat: int
+
+
+class EvolutionLink(BaseModel):
+    name: str
+    stage: int
+
+
+class PokemonOut(BaseModel):
+    id: int
+    name: str
+    is_evolved: bool
+    types: List[str]
+    abilities: List[str]
+    stats: List[PokemonStat]
+    evolution_chain: List[EvolutionLink]
+
+
+class EvolutionRelative(BaseModel):
+    name: str
+    depth: int  # evolution steps away (1 = direct parent/child)
+
+
+class FamilyMember(BaseModel):
+    name: str
+    stage: int
+    parent: Optional[str] = None
+
+
+class EvolutionFamily(BaseModel):
+    root: str
+    members: List[FamilyMember]
+
+
+class BatchRequest(BaseModel):
+    ids: List[int] = []
+    names: List[str] = []
+
+
+class BatchItem(BaseModel):
+    query: Union[int, str]  # the requested ID or name, echoed back
+    found: bool
+    pokemon: Optional[PokemonOut] = None
@@ -0,0 +1,55 @@
+from typing import Dict, List, Optional
+
+from pydantic import BaseModel
+
+
+class EtlRun(BaseModel):
+    id: int
+    strategy: str
+    status: str  # running | succeeded | failed
+    started_at: float
+    finished_at: Optional[float] = None
+    duration_seconds: Optional[float] = None
+    config: dict
+    extract_seconds: Optional[float] = None
+    transform_seconds: Optional[float] = None
+    load_seconds: Optional[float] = None
+    http_calls: Optional[int] = None
+    cache_hits: Optional[int] = None
+    cache_misses: Optional[int] = None
+    cache_hit_rate: Optional[float] = None
+    rows_written: Optional[int] = None
+    success_count: Optional[int] = None
+    failure_count: Optional[int] = None
+    pokemon_per_second: Optional[float] = None
+    error: Optional[str] = None
+
+
+class MetricChange(BaseModel):
+    baseline: Optional[float] = None
+    candidate: Optional[float] = None
+    change_pct: Optional[float] = None  # (candidate - baseline) / baseline × 100
+
+
+class DeadLetter(BaseModel):
+    pokemon_id: int
+    stage: str  # extract | transform | load
+    error_class: str
+    error: Optional[str] = None
+    attempts: int
+    has_payload: bool
+    first_failed_at: float
+    last_failed_at: float
+
+
+class RedriveResult(BaseModel):
+    redriven: int
+    resolved: int
+    remaining: int
+    resolved_ids: List[int]
+
+
+class RunComparison(BaseModel):
+    baseline: EtlRun
+    candidate: EtlRun
+    metrics: Dict[str, MetricChange]
@@ -0,0 +1,14 @@
+from typing import List, Optional
+
+from pydantic import BaseModel
+
+
+class SimilarPokemon(BaseModel):
+    id: int
+    name: str
+    score: float  # cosine similarity, or Euclidean distance in z-score units
+
+
+class SimilarResult(BaseModel):
+    id: int
+    similar: Optional[List[SimilarPokemon]] = None  # None when the ID is unknown
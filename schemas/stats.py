@@ -0,0 +1,26 @@
+from typing import List
+
+from pydantic import BaseModel
+
+
+class StatSummary(BaseModel):
+    stat_name: str
+    average: float
+    min: int
+    max: int
+
+
+class TypeStats(BaseModel):
+    type: str
+    pokemon_count: int
+    evolved_count: int
+    unevolved_count: int
+    stats: List[StatSummary]
+
+
+class StatsOverview(BaseModel):
+    pokemon_count: int
+    evolved_count: int
+    unevolved_count: int
+    type_count: int
+    stats: List[StatSummary]
@@ -0,0 +1,159 @@
+import logging
+import os
+import threading
+
+import numpy as np
+
+from data_processing.packed_snapshot import current_snapshot
+from constants import STAT_NAMES, LOG_FORMAT, LOG_LEVEL
+
+logging.basicConfig(level=getattr(logging, LOG_LEVEL), format=LOG_FORMAT)
+
+
+METRICS = ("cosine", "euclidean")
+
+
+class StatMatrix:
+    """
+    N×6 matrix of base stats for every Pokémon in a snapshot, z-scored per stat so that
+    HP and Speed weigh the same, with a boolean N×T type matrix for filtering.
+    Similarity queries are a single matrix product plus argpartition.
+    """
+
+    def __init__(self, ids, names, stats, type_names, type_matrix):
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self.names = list(names)
+        self.row_of = {int(pid): i for i, pid in enumerate(self.ids)}
+        self.type_index = {name: i for i, name in enumerate(type_names)}
+        self.type_matrix = type_matrix
+
+        stats = np.asarray(stats, dtype=np.float64).reshape(len(self.ids), len(STAT_NAMES))
+        mean, std = np.zeros(len(STAT_NAMES)), np.ones(len(STAT_NAMES))
+        if len(stats):
+            # Missing stats take the column mean, i.e. a neutral z-score of 0
+            known = ~np.isnan(stats)
+            mean = np.where(known, stats, 0.0).sum(axis=0) / np.maximum(known.sum(axis=0), 1)
+            stats = np.where(known, stats, mean)
+            std = stats.std(axis=0)
+        self.zscores = ((stats - mean) / np.where(std > 0, std, 1.0)).astype(np.float32)
+
+        norms = np.linalg.norm(self.zscores, axis=1, keepdims=True)
+        self.unit = self.zscores / np.where(norms > 0, norms, 1.0)
+        self.squared_norms = np.einsum("ij,ij->i", self.zscores, self.zscores)
+
+    @classmethod
+    def from_connection(cls, conn):
+        """Build the matrix from the pokemon / pokemon_stats / pokemon_types tables."""
+        pokemon = conn.execute("SELECT id, name FROM pokemon ORDER BY id").fetchall()
+        ids = [row[0] for row in pokemon]
+        row_of = {pid: i for i, pid in enumerate(ids)}
+
+        stat_column = {name: i for i, name in enumerate(STAT_NAMES)}
+        stats = np.full((len(ids), len(STAT_NAMES)), np.nan)
+        for pokemon_id, stat_name, base_stat in conn.execute("""
+            SELECT ps.pokemon_id, s.name, ps.base_stat
+            FROM pokemon_stats ps JOIN stats s ON s.id = ps.stat_id
+        """):
+            if pokemon_id in row_of and stat_name in stat_column:
+                stats[row_of[pokemon_id], stat_column[stat_name]] = base_stat
+
+        type_names = [row[0] for row in conn.execute("SELECT name FROM types ORDER BY id")]
+        type_column = {name: i for i, name in enumerate(type_names)}
+        type_matrix = np.zeros((len(ids), len(type_names)), dtype=bool)
+        for pokemon_id, type_name in conn.execute("""
+            SELECT pt.pokemon_id, t.name FROM pokemon_types pt JOIN types t ON t.id = pt.type_id
+        """):
+            if pokemon_id in row_of:
+                type_matrix[row_of[pokemon_id], type_column[type_name]] = True
+
+        logging.info(f"Built stat matrix: {len(ids)} Pokémon × {len(STAT_NAMES)} stats, {len(type_names)} types")
+        return cls(ids, [row[1] for row in pokemon], stats, type_names, type_matrix)
+
+    @classmethod
+    def from_packed(cls, packed):
+        """Build the matrix from a mapped PackedSnapshot, without touching SQLite."""
+        stats = np.where(packed.stats >= 0, packed.stats, np.nan)
+        bits = np.uint64(1) << np.arange(len(packed.type_names), dtype=np.uint64)
+        type_matrix = (packed.types[:, None] & bits) != 0
+        logging.info(f"Built stat matrix from packed snapshot: {packed.count} Pokémon")
+        return cls(packed.ids, packed.names(), stats, packed.type_names, type_matrix)
+
+    def type_mask(self, types):
+        """Boolean mask of Pokémon having any of `types` (None = everyone)."""
+        if not types:
+            return None
+        columns = [self.type_index[t] for t in types if t in self.type_index]
+        if not columns:
+            return np.zeros(len(self.ids), dtype=bool)
+        return self.type_matrix[:, columns].any(axis=1)
+
+    def similar(self, pokemon_ids, k, metric="cosine", types=None):
+        """
+        k nearest neighbours for each of `pokemon_ids`, computed for all queries at once.
+        Returns one list of (id, name, score) per query ID, best first, or None for unknown IDs.
+        Score is cosine similarity (higher is closer) or Euclidean distance in z-score units.
+        """
+        if metric not in METRICS:
+            raise ValueError(f"Unknown metric: {metric}")
+
+        rows = [self.row_of.get(pid) for pid in pokemon_ids]
+        known = [r for r in rows if r is not None]
+        results = {}
+        if known and len(self.ids) > 1:
+            query_rows = np.asarray(known)
+            if metric == "cosine":
+                # Negate so that smaller is better for both metrics
+                cost = -(self.unit[query_rows] @ self.unit.T)
+            else:
+                cost = (self.squared_norms[query_rows, None] + self.squared_norms[None, :]
+                        - 2.0 * (self.zscores[query_rows] @ self.zscores.T))
+                np.maximum(cost, 0.0, out=cost)
+
+            mask = self.type_mask(types)
+            if mask is not None:
+                cost[:, ~mask] = np.inf
+            cost[np.arange(len(query_rows)), query_rows] = np.inf  # never return the query itself
+
+            kk = min(k, len(self.ids) - 1)
+            top = np.argpartition(cost, kk - 1, axis=1)[:, :kk] if kk > 0 else np.empty((len(query_rows), 0), int)
+            for i, row in enumerate(known):
+                candidates = top[i][np.argsort(cost[i, top[i]], kind="stable")]
+                results[row] = [
+                    (int(self.ids[c]), self.names[c],
+                     float(-cost[i, c]) if metric == "cosine" else float(np.sqrt(cost[i, c])))
+                    for c in candidates if np.isfinite(cost[i, c])
+                ]
+
+        return [None if r is None else results.get(r, []) for r in rows]
+
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def _snapshot_key(conn):
+    """Identity of the database file behind `conn`; changes when the ETL swaps or rewrites it."""
+    path = next((row[2] for row in conn.execute("PRAGMA database_list") if row[1] == "main"), "")
+    if not path:
+        return None, None
+    st = os.stat(path)
+    return path, (st.st_dev, st.st_ino, st.st_mtime_ns, st.st_size)
+
+
+def get_stat_matrix(conn):
+    """
+    Return the StatMatrix for the snapshot behind `conn`, building it on first use and
+    again whenever the ETL publishes a new snapshot.
+    """
+    path, identity = _snapshot_key(conn)
+    with _cache_lock:
+        cached = _cache.get(path)
+        if cached and identity is not None and cached[0] == identity:
+            return cached[1]
+
+    packed = current_snapshot(conn)
+    matrix = StatMatrix.from_packed(packed) if packed else StatMatrix.from_connection(conn)
+    if path:
+        with _cache_lock:
+            _cache[path] = (identity, matrix)
+    return matrix
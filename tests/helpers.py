@@ -0,0 +1,49 @@
+"""Fixtures shared by the test modules: record factories and a temporary database served to the API."""
+import sqlite3
+
+from data_processing.load import create_connection, create_tables, load_pokemon
+
+
+def transformed(pid, name, chain):
+    """A transformed grass/poison Pokémon in `chain` with hp = 40 + pid, as load_pokemon() takes it."""
+    return {
+        "main": {"id": pid, "name": name, "is_evolved": chain[0] != name},
+        "types": ["grass", "poison"],
+        "abilities": ["overgrow"],
+        "stats": [{"stat_name": "hp", "base_stat": 40 + pid}],
+        "evolution_chain_identifier": chain[0],
+        "evolution_links": [{"name": n, "stage": i + 1} for i, n in enumerate(chain)],
+        "evolution_edges": list(zip(chain, chain[1:]))
+    }
+
+
+def create_test_database(db_file, records):
+    """Create the schema in `db_file` and load `records` into it."""
+    conn = create_connection(db_file)
+    create_tables(conn)
+    for record in records:
+        load_pokemon(conn, record)
+    conn.close()
+
+
+def serve_database(db_file):
+    """
+    Point the API's get_db at `db_file`, with a fresh connection per request, and return a
+    TestClient. Clear app.dependency_overrides in tearDown.
+    """
+    # Imported here so modules that only need the record factories don't load the app
+    from fastapi.testclient import TestClient
+
+    from app import app
+    from database import get_db
+
+    def override_db():
+        conn = sqlite3.connect(db_file, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    app.dependency_overrides[get_db] = override_db
+    return TestClient(app)
@@ -0,0 +1,56 @@
+import sqlite3
+import unittest
+
+from data_processing.archive import (
+    create_archive,
+    archive_payload,
+    iter_archived,
+    decode_payload,
+    transform_archived,
+    transform_archived_batch,
+)
+from data_processing.records import RawPokemon
+
+
+class TestArchive(unittest.TestCase):
+
+    def setUp(self):
+        self.conn = sqlite3.connect(":memory:")
+        create_archive(self.conn)
+        self.raw = RawPokemon(
+            id=25, name="pikachu", types=("electric",), abilities=("static",),
+            stats=(("hp", 35), ("speed", 90)), evolution_chain=("pichu", "pikachu", "raichu"), is_evolved=True
+        )
+
+    def tearDown(self):
+        self.conn.close()
+
+    def test_round_trip(self):
+        self.assertTrue(archive_payload(self.conn, self.raw))
+        self.assertTrue(archive_payload(self.conn, self.raw))  # re-archiving replaces
+
+        rows = list(iter_archived(self.conn))
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0][0], 25)
+        self.assertEqual(decode_payload(rows[0][1]), self.raw)
+
+    def test_transform_archived(self):
+        archive_payload(self.conn, self.raw)
+        pokemon_id, transformed = transform_archived(next(iter_archived(self.conn)))
+        self.assertEqual(pokemon_id, 25)
+        self.assertEqual(transformed.evolution_chain_identifier, "pichu")
+
+    def test_corrupt_payload(self):
+        self.assertEqual(transform_archived((7, b"not zlib")), (7, None))
+
+    def test_transform_archived_batch(self):
+        archive_payload(self.conn, self.raw)
+        items = [(7, b"not zlib"), *iter_archived(self.conn)]
+        results = transform_archived_batch(items)
+        self.assertEqual([pokemon_id for pokemon_id, _ in results], [7, 25])
+        self.assertIsNone(results[0][1])
+        self.assertEqual(results[1][1].evolution_chain_identifier, "pichu")
+
+
+if __name__ == "__main__":
+    unittest.main()
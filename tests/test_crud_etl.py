@@ -0,0 +1,110 @@
+import sqlite3
+import unittest
+
+from fastapi.testclient import TestClient
+
+from app import app
+from crud import etl as pokemon_repo
+from constants import DB_STATEMENT_CACHE
+from database import get_db, get_state_db
+from data_processing.load import create_tables, load_pokemon
+from data_processing.run_ledger import RunMetrics, create_run_ledger, start_run, finish_run
+from data_processing.dead_letters import create_dead_letters, record_dead_letter
+from tests.helpers import transformed
+
+
+class RecordingConnection(sqlite3.Connection):
+    """Remembers the SQL text of every statement run through execute()."""
+
+    def execute(self, sql, parameters=()):
+        self.executed.add(sql)
+        return super().execute(sql, parameters)
+
+
+class TestPokemonRepository(unittest.TestCase):
+
+    def setUp(self):
+        self.conn = sqlite3.connect(":memory:", factory=RecordingConnection)
+        self.conn.executed = set()
+        create_tables(self.conn)
+        for pid, name in [(1, "bulbasaur"), (2, "ivysaur"), (3, "venusaur")]:
+            load_pokemon(self.conn, transformed(pid, name, ["bulbasaur", "ivysaur", "venusaur"]))
+        self.conn.executed.clear()
+
+    def tearDown(self):
+        app.dependency_overrides.clear()
+        self.conn.close()
+
+    def test_statement_set_fits_cache(self):
+        self.assertLessEqual(len(pokemon_repo.STATEMENTS), DB_STATEMENT_CACHE // 2)
+
+    def test_filter_combinations_share_one_statement(self):
+        db = self.conn
+        self.assertEqual(pokemon_repo.filter_names(db), ["bulbasaur", "ivysaur", "venusaur"])
+        self.assertEqual(pokemon_repo.filter_names(db, is_evolved=True), ["ivysaur", "venusaur"])
+        self.assertEqual(pokemon_repo.filter_names(db, hp_min=42, type_name="Grass"), ["ivysaur", "venusaur"])
+        self.assertEqual(pokemon_repo.filter_names(db, is_evolved=False, limit=1), ["bulbasaur"])
+        self.assertEqual(pokemon_repo.filter_names(db, type_name="fire"), [])
+        self.assertEqual(db.executed, {pokemon_repo.STATEMENTS[("filter_names", "id", "asc")]})
+
+        self.assertEqual(pokemon_repo.filter_names(db, sort_by="hp", order="desc", limit=2), ["venusaur", "ivysaur"])
+        self.assertEqual(pokemon_repo.filter_names(db, sort_by="attack", order="desc"), [])
+        self.assertEqual(len(db.executed), 2)
+        with self.assertRaises(ValueError):
+            pokemon_repo.filter_names(db, sort_by="weight")
+
+    def test_stat_sort_walks_an_index(self):
+        params = {"sort_stat": "speed", "search": None, "type": None, "limit": 5,
+                  "is_evolved": None, "hp_min": None, "attack_min": None}
+        for query in ("list_docs", "filter_names"):
+            for order in ("asc", "desc"):
+                with self.subTest(query=query, order=order):
+                    sql = pokemon_repo.STATEMENTS[(query, "stat", order)]
+                    plan = " ".join(row[-1] for row in self.conn.execute(f"EXPLAIN QUERY PLAN {sql}", params))
+                    self.assertIn("idx_pokemon_stats_stat", plan)
+                    self.assertNotIn("TEMP B-TREE", plan)
+
+    def test_records_and_relatives(self):
+        record = pokemon_repo.get_record(self.conn, 2)
+        self.assertEqual((record.name, record.is_evolved, record.stats), ("ivysaur", True, (("hp", 42),)))
+        self.assertEqual(record.evolution_chain, (("bulbasaur", 1), ("ivysaur", 2), ("venusaur", 3)))
+        self.assertIsNone(pokemon_repo.get_record(self.conn, 99))
+
+        self.assertEqual(pokemon_repo.ancestors(self.conn, 3), [("ivysaur", 1), ("bulbasaur", 2)])
+        self.assertEqual([row.name for row in pokemon_repo.descendants(self.conn, 1)], ["ivysaur", "venusaur"])
+        self.assertEqual(pokemon_repo.family(self.conn, 2)[-1], ("venusaur", 2, "ivysaur"))
+        self.assertEqual(pokemon_repo.list_docs(self.conn, search="VENU", limit=5)[0][:8], '{"id":3,')
+
+    def test_stats_and_etl_routes_use_repository_statements(self):
+        db = sqlite3.connect(":memory:", factory=RecordingConnection, check_same_thread=False)
+        db.executed = set()
+        create_tables(db)
+        load_pokemon(db, transformed(1, "bulbasaur", ["bulbasaur"]))
+        state = sqlite3.connect(":memory:", factory=RecordingConnection, check_same_thread=False)
+        state.executed = set()
+        create_run_ledger(state)
+        create_dead_letters(state)
+        run_id = start_run(state, "per_id", {"last_id": 1})
+        finish_run(state, run_id, RunMetrics(), True)
+        record_dead_letter(state, 2, "extract", "ExtractError")
+        db.executed.clear()
+        state.executed.clear()
+
+        app.dependency_overrides[get_db] = lambda: db
+        app.dependency_overrides[get_state_db] = lambda: state
+        client = TestClient(app)
+        self.assertEqual(client.get("/stats/types").json()[0]["stats"][0]["max"], 41)
+        self.assertEqual(client.get("/stats/overview").json()["type_count"], 2)
+        self.assertEqual([run["id"] for run in client.get("/etl/runs").json()], [run_id])
+        self.assertEqual(client.get(f"/etl/runs/{run_id}").json()["status"], "succeeded")
+        self.assertEqual(client.get("/etl/dead-letters").json()[0]["pokemon_id"], 2)
+
+        statements = set(pokemon_repo.STATEMENTS.values())
+        self.assertTrue(db.executed and db.executed <= statements)
+        self.assertTrue(state.executed and state.executed <= statements)
+        db.close()
+        state.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,47 @@
+import os
+import tempfile
+import unittest
+from database import ConnectionPool
+from data_processing.snapshot import publish_snapshot
+from tests.test_snapshot import make_db
+
+
+class TestConnectionPool(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.serving = os.path.join(self.tmp.name, "serving.db")
+        make_db(self.serving, ["bulbasaur"])
+        self.pool = ConnectionPool(self.serving, size=2)
+
+    def tearDown(self):
+        self.pool.close()
+        self.tmp.cleanup()
+
+    def count(self):
+        with self.pool.connection() as conn:
+            return conn.execute("SELECT COUNT(*) FROM pokemon").fetchone()[0]
+
+    def test_connections_are_reused(self):
+        with self.pool.connection() as first:
+            pass
+        with self.pool.connection() as second:
+            self.assertIs(first, second)
+
+    def test_connections_are_read_only(self):
+        with self.pool.connection() as conn:
+            with self.assertRaises(Exception):
+                conn.execute("DELETE FROM pokemon")
+
+    def test_pool_follows_swapped_snapshot(self):
+        self.assertEqual(self.count(), 1)
+
+        staging = os.path.join(self.tmp.name, "staging.db")
+        make_db(staging, ["bulbasaur", "ivysaur", "venusaur"])
+        publish_snapshot(staging, self.serving)
+
+        self.assertEqual(self.count(), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
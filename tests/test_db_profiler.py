@@ -0,0 +1,81 @@
+import sqlite3
+import unittest
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+
+import db_profiler
+from app import app
+from db_profiler import StatementProfiler, connection_factory, normalize_sql
+
+
+class TestDbProfiler(unittest.TestCase):
+
+    def setUp(self):
+        self.profiler = StatementProfiler(enabled=True, slow_ms=10_000, log_file=None)
+        patcher = patch.object(db_profiler, "profiler", self.profiler)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_normalize_sql(self):
+        self.assertEqual(
+            normalize_sql("SELECT *\n  FROM pokemon WHERE id IN (?, ?,?) AND name = 'x' LIMIT 5"),
+            "SELECT * FROM pokemon WHERE id IN (?, ...) AND name = ? LIMIT ?"
+        )
+
+    def test_connection_factory_is_plain_when_disabled(self):
+        self.profiler.disable()
+        self.assertIs(connection_factory(), sqlite3.Connection)
+
+    def test_records_count_time_and_rows(self):
+        conn = sqlite3.connect(":memory:", factory=connection_factory())
+        conn.execute("CREATE TABLE t (x INTEGER)")
+        conn.executemany("INSERT INTO t VALUES (?)", [(i,) for i in range(5)])
+        for limit in (2, 3):
+            self.assertEqual(len(conn.execute(f"SELECT x FROM t LIMIT {limit}").fetchall()), limit)
+        self.assertEqual(sum(1 for _ in conn.execute("SELECT x FROM t")), 5)
+        conn.close()
+
+        stats = {row["sql"]: row for row in self.profiler.top(10)}
+        self.assertEqual((stats["SELECT x FROM t LIMIT ?"]["count"], stats["SELECT x FROM t LIMIT ?"]["rows"]), (2, 5))
+        self.assertEqual(stats["SELECT x FROM t"]["rows"], 5)
+        self.assertEqual(stats["INSERT INTO t VALUES (?)"]["count"], 1)
+        self.assertGreaterEqual(stats["SELECT x FROM t"]["max_ms"], 0)
+
+    def test_slow_statements_are_logged(self):
+        self.profiler.slow_ms = 0
+        conn = sqlite3.connect(":memory:", factory=connection_factory())
+        with self.assertLogs("slow_queries", level="WARNING") as logs:
+            conn.execute("SELECT 1").fetchall()
+        conn.close()
+        self.assertIn("SELECT ?", logs.output[0])
+
+    def test_admin_endpoint(self):
+        self.profiler.record("SELECT * FROM pokemon WHERE id = 1", 0.002, 1)
+        self.profiler.record("SELECT * FROM pokemon WHERE id = 2", 0.004, 1)
+        client = TestClient(app)
+        with patch("routers.admin.profiler", self.profiler):
+            report = client.get("/admin/queries", params={"sort_by": "max"}).json()
+            self.assertTrue(report["enabled"])
+            self.assertEqual(report["queries"][0]["sql"], "SELECT * FROM pokemon WHERE id = ?")
+            self.assertEqual((report["queries"][0]["count"], report["queries"][0]["max_ms"]), (2, 4.0))
+
+            self.assertEqual(client.delete("/admin/queries").status_code, 204)
+            self.assertEqual(client.get("/admin/queries").json()["queries"], [])
+
+    def test_admin_endpoint_requires_profiling_and_token(self):
+        client = TestClient(app)
+        self.profiler.disable()
+        with patch("routers.admin.profiler", self.profiler):
+            self.assertEqual(client.get("/admin/queries").status_code, 404)
+            self.assertEqual(client.delete("/admin/queries").status_code, 404)
+
+            self.profiler.enable()
+            with patch("routers.admin.ADMIN_TOKEN", "s3cret"):
+                self.assertEqual(client.delete("/admin/queries").status_code, 403)
+                self.assertEqual(client.get("/admin/queries", headers={"X-Admin-Token": "wrong"}).status_code, 403)
+                self.assertEqual(client.get("/admin/queries", headers={"X-Admin-Token": "s3cret"}).status_code, 200)
+
+
+if __name__ == "__main__":
+    unittest.main()
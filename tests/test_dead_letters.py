@@ -0,0 +1,165 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+
+from app import app
+from database import get_state_db
+from data_processing.records import RawPokemon
+from data_processing.transform import transform_pokemon_data
+from crud.etl import list_dead_letters
+from data_processing.dead_letters import (
+    create_dead_letters, record_dead_letter, resolve_dead_letters, dead_letter_payloads,
+)
+from data_processing.snapshot import RefreshInProgress
+from main import run_etl_pipeline, run_redrive, run_blue_green_etl, run_blue_green_redrive
+
+
+def raw(i):
+    return RawPokemon(
+        id=i, name=f"poke{i}", is_evolved=False, types=("normal",),
+        abilities=(), stats=(("hp", 10 * i),), evolution_chain=(f"poke{i}",)
+    )
+
+
+class TestDeadLetters(unittest.TestCase):
+
+    def setUp(self):
+        self.conn = sqlite3.connect(":memory:", check_same_thread=False)
+        self.assertTrue(create_dead_letters(self.conn))
+
+    def tearDown(self):
+        app.dependency_overrides.clear()
+        self.conn.close()
+
+    def test_record_upserts_attempts_and_keeps_payload(self):
+        record_dead_letter(self.conn, 7, "transform", "TransformError", "bad", raw(7))
+        record_dead_letter(self.conn, 7, "extract", "ExtractError", "timeout")
+        record_dead_letter(self.conn, 9, "extract", "ExtractError")
+
+        items = {item["pokemon_id"]: item for item in list_dead_letters(self.conn)}
+        self.assertEqual((items[7]["attempts"], items[7]["stage"], items[7]["has_payload"]), (2, "extract", 1))
+        self.assertEqual(dead_letter_payloads(self.conn), {7: raw(7), 9: None})
+        self.assertEqual([item["pokemon_id"] for item in list_dead_letters(self.conn, stage="extract")], [7, 9])
+
+        self.assertEqual(resolve_dead_letters(self.conn, [7, 8]), 1)
+        self.assertEqual(list(dead_letter_payloads(self.conn)), [9])
+
+    def test_dead_letters_endpoint(self):
+        record_dead_letter(self.conn, 3, "load", "LoadError", "locked", raw(3))
+        app.dependency_overrides[get_state_db] = lambda: self.conn
+        client = TestClient(app)
+
+        items = client.get("/etl/dead-letters").json()
+        self.assertEqual([(item["pokemon_id"], item["has_payload"]) for item in items], [(3, True)])
+        self.assertEqual(client.get("/etl/dead-letters", params={"stage": "extract"}).json(), [])
+        self.assertEqual(client.get("/etl/dead-letters", params={"stage": "bogus"}).status_code, 422)
+
+    @patch("main.POKEMON_TO_FETCH", 4)
+    @patch("main.sleep")
+    @patch("main.transform_pokemon_data")
+    @patch("main.fetch_pokemon_data")
+    def test_failures_are_parked_then_redriven(self, mock_fetch, mock_transform, mock_sleep):
+        outage = {2}
+        mock_fetch.side_effect = lambda i, controller=None, counter=None: None if i in outage else raw(i)
+        mock_transform.side_effect = lambda r: None if r.id == 3 else transform_pokemon_data(r)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            db_file = os.path.join(tmp, "pokemon.db")
+            state_file = os.path.join(tmp, "state.db")
+            self.assertTrue(run_etl_pipeline(db_file=db_file, state_file=state_file))
+
+            state = sqlite3.connect(state_file)
+            parked = {item["pokemon_id"]: item for item in list_dead_letters(state)}
+            self.assertEqual(sorted(parked), [2, 3])
+            self.assertEqual((parked[2]["stage"], parked[2]["has_payload"]), ("extract", 0))
+            self.assertEqual((parked[3]["stage"], parked[3]["has_payload"]), ("transform", 1))
+
+            # Upstream recovered: only the parked IDs are reprocessed, and 3 reuses its payload
+            outage.clear()
+            mock_transform.side_effect = transform_pokemon_data
+            mock_fetch.reset_mock()
+            summary = run_redrive(db_file, state_file, workers=2)
+
+            self.assertEqual(summary, {"redriven": 2, "resolved": 2, "remaining": 0, "resolved_ids": [2, 3]})
+            self.assertEqual([call.args[0] for call in mock_fetch.call_args_list], [2])
+            self.assertEqual(list_dead_letters(state), [])
+            self.assertEqual(state.execute("SELECT strategy, success_count FROM etl_runs ORDER BY id").fetchall(),
+                             [("per_id", 2), ("redrive", 2)])
+            state.close()
+
+            conn = sqlite3.connect(db_file)
+            self.assertEqual([row[0] for row in conn.execute("SELECT id FROM pokemon ORDER BY id")], [1, 2, 3, 4])
+            conn.close()
+
+    @patch("main.POKEMON_TO_FETCH", 2)
+    @patch("main.EXPORT_PACKED_SNAPSHOT", False)
+    @patch("main.sleep")
+    @patch("main.fetch_pokemon_data")
+    def test_blue_green_resolves_only_after_publish(self, mock_fetch, mock_sleep):
+        outage = {2}
+        mock_fetch.side_effect = lambda i, controller=None, counter=None: None if i in outage else raw(i)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            paths = {
+                "serving_file": os.path.join(tmp, "pokemon.db"),
+                "staging_file": os.path.join(tmp, "pokemon.staging.db"),
+                "state_file": os.path.join(tmp, "state.db"),
+            }
+            self.assertTrue(run_blue_green_etl(**paths))
+            state = sqlite3.connect(paths["state_file"])
+            self.assertEqual([item["pokemon_id"] for item in list_dead_letters(state)], [2])
+
+            # ID 2 loads into staging, but the staging file is rejected: it stays parked
+            outage.clear()
+            with patch("main.verify_database", return_value=False):
+                self.assertFalse(run_blue_green_etl(**paths))
+            self.assertEqual([item["pokemon_id"] for item in list_dead_letters(state)], [2])
+
+            self.assertTrue(run_blue_green_etl(**paths))
+            self.assertEqual(list_dead_letters(state), [])
+            state.close()
+
+    @patch("main.sleep")
+    @patch("main.fetch_pokemon_data", return_value=None)
+    def test_redrive_retries_with_backoff_then_gives_up(self, mock_fetch, mock_sleep):
+        with tempfile.TemporaryDirectory() as tmp:
+            state_file = os.path.join(tmp, "state.db")
+            state = sqlite3.connect(state_file)
+            create_dead_letters(state)
+            record_dead_letter(state, 5, "extract", "ExtractError")
+
+            summary = run_redrive(os.path.join(tmp, "pokemon.db"), state_file, workers=1, rounds=3)
+
+            self.assertEqual(summary["remaining"], 1)
+            self.assertEqual(mock_fetch.call_count, 3)
+            self.assertEqual(mock_sleep.call_count, 2)  # backoff between passes only
+            self.assertEqual(list_dead_letters(state)[0]["attempts"], 4)
+            state.close()
+
+    def test_blue_green_redrive_skips_publish_when_nothing_parked(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            state_file = os.path.join(tmp, "state.db")
+            state = sqlite3.connect(state_file)
+            create_dead_letters(state)
+            state.close()
+            with patch("main.prepare_staging") as prepare:
+                summary = run_blue_green_redrive(state_file, serving_file=os.path.join(tmp, "pokemon.db"),
+                                                 staging_file=os.path.join(tmp, "staging.db"))
+            self.assertEqual(summary["redriven"], 0)
+            prepare.assert_not_called()
+
+    def test_refresh_endpoints_conflict_while_one_is_running(self):
+        client = TestClient(app)
+        busy = RefreshInProgress("A refresh of db/pokemon_database.db is already running")
+        with patch("app.run_blue_green_etl", side_effect=busy), \
+                patch("app.run_blue_green_redrive", side_effect=busy):
+            self.assertEqual(client.post("/etl/run-pipeline").status_code, 409)
+            self.assertEqual(client.post("/etl/dead-letters/redrive").status_code, 409)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+
+from app import app
+from tests.helpers import transformed, create_test_database, serve_database
+
+
+class TestEtlRouter(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_file = os.path.join(self.tmp.name, "pokemon.db")
+        create_test_database(self.db_file, [
+            transformed(pid, name, ["bulbasaur", "ivysaur"]) for pid, name in [(1, "bulbasaur"), (2, "ivysaur")]
+        ])
+        self.client = serve_database(self.db_file)
+
+    def tearDown(self):
+        app.dependency_overrides.clear()
+        self.tmp.cleanup()
+
+    def test_get_pokemon_serves_document(self):
+        response = self.client.get("/pokemon/2")
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual(body["name"], "ivysaur")
+        self.assertEqual(body["evolution_chain"], [{"name": "bulbasaur", "stage": 1}, {"name": "ivysaur", "stage": 2}])
+
+    def test_startup_refuses_unmigrated_database(self):
+        with patch("app.ensure_schema", return_value=False), self.assertRaises(RuntimeError):
+            with TestClient(app):
+                pass
+        with patch("app.ensure_schema", return_value=True) as ensure_schema, TestClient(app) as client:
+            self.assertEqual(client.get("/pokemon/2").status_code, 200)
+        ensure_schema.assert_called_once()
+
+    def test_get_pokemon_not_found(self):
+        self.assertEqual(self.client.get("/pokemon/99").status_code, 404)
+
+    def test_list_concatenates_documents(self):
+        response = self.client.get("/pokemon/", params={"search": "saur"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([p["id"] for p in response.json()], [1, 2])
+        self.assertEqual(self.client.get("/pokemon/", params={"search": "ivy"}).json()[0]["name"], "ivysaur")
+
+    def test_list_and_filter_sort_by_stat(self):
+        top = self.client.get("/pokemon/", params={"sort_by": "hp", "order": "desc", "limit": 1}).json()
+        self.assertEqual([p["name"] for p in top], ["ivysaur"])
+        self.assertEqual(self.client.get("/pokemon/", params={"sort_by": "weight"}).status_code, 422)
+
+        names = self.client.get("/pokemon/filter", params={"type_name": "grass", "sort_by": "hp", "order": "desc"})
+        self.assertEqual(names.json(), ["ivysaur", "bulbasaur"])
+        self.assertEqual(self.client.get("/pokemon").json(), ["bulbasaur", "ivysaur"])
+
+    def test_batch_lookup_keeps_request_order(self):
+        response = self.client.get("/pokemon/batch", params={"ids": "2,99,1", "names": "Bulbasaur,missingno"})
+        self.assertEqual(response.status_code, 200)
+        items = response.json()
+        self.assertEqual([(i["query"], i["found"]) for i in items],
+                         [(2, True), (99, False), (1, True), ("bulbasaur", True), ("missingno", False)])
+        self.assertEqual(items[0]["pokemon"]["name"], "ivysaur")
+        self.assertIsNone(items[1]["pokemon"])
+
+        posted = self.client.post("/pokemon/batch", json={"ids": [1], "names": ["ivysaur"]}).json()
+        self.assertEqual([i["pokemon"]["id"] for i in posted], [1, 2])
+        self.assertEqual(self.client.get("/pokemon/batch", params={"ids": "1,x"}).status_code, 422)
+
+    def test_evolution_graph_endpoints(self):
+        self.assertEqual(self.client.get("/pokemon/2/ancestors").json(), [{"name": "bulbasaur", "depth": 1}])
+        self.assertEqual(self.client.get("/pokemon/1/descendants").json(), [{"name": "ivysaur", "depth": 1}])
+
+        family = self.client.get("/pokemon/2/family").json()
+        self.assertEqual(family["root"], "bulbasaur")
+        self.assertEqual(family["members"], [
+            {"name": "bulbasaur", "stage": 1, "parent": None},
+            {"name": "ivysaur", "stage": 2, "parent": "bulbasaur"},
+        ])
+        self.assertEqual(self.client.get("/pokemon/99/family").status_code, 404)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,9 @@
+import json
 import unittest
 from unittest.mock import patch, Mock
-from data_processing.extract import fetch_pokemon_data
+from data_processing.extract import fetch_pokemon_data, fetch_pokemon_bulk
+from data_processing.records import RawPokemon
+from data_processing.throttle import RequestCounter
 
 
 class TestExtract(unittest.TestCase):
@@ -32,22 +35,23 @@ class TestExtract(unittest.TestCase):
         }
 
         mock_get.side_effect = [
-            Mock(status_code=200, json=lambda: pokemon_resp),
-            Mock(status_code=200, json=lambda: species_resp),
+            Mock(status_code=200, content=json.dumps(pokemon_resp).encode()),
+            Mock(status_code=200, content=json.dumps(species_resp).encode()),
             Mock(status_code=200, json=lambda: evo_resp),
         ]
 
         result = fetch_pokemon_data(25)
 
-        expected = {
-            "id": 25,
-            "name": "pikachu",
-            "types": ["electric"],
-            "abilities": ["static"],
-            "stats": {"hp": 35},
-            "evolution_chain": ["pichu", "pikachu", "raichu"],
-            "is_evolved": True
-        }
+        expected = RawPokemon(
+            id=25,
+            name="pikachu",
+            types=("electric",),
+            abilities=("static",),
+            stats=(("hp", 35),),
+            evolution_chain=("pichu", "pikachu", "raichu"),
+            is_evolved=True,
+            evolution_edges=(("pichu", "pikachu"), ("pikachu", "raichu"))
+        )
         self.assertEqual(result, expected)
 
     @patch("data_processing.extract.requests.get")
@@ -60,6 +64,53 @@ class TestExtract(unittest.TestCase):
 
         self.assertIsNone(fetch_pokemon_data(99999))
 
+    @patch("data_processing.extract.requests.get")
+    def test_fetch_bulk_one_call_per_chain(self, mock_get):
+        base = "https://pokeapi.co/api/v2"
+
+        def node(name, sid, evolves_to=()):
+            return {"species": {"name": name, "url": f"{base}/pokemon-species/{sid}/"},
+                    "evolves_to": list(evolves_to)}
+
+        def pokemon(pid, name):
+            return {"id": pid, "name": name, "types": [{"type": {"name": "grass"}}],
+                    "abilities": [], "stats": [{"stat": {"name": "hp"}, "base_stat": 45}]}
+
+        responses = {
+            f"{base}/pokemon/?limit=3&offset=0": {"next": None, "results": [
+                {"name": n, "url": f"{base}/pokemon/{i}/"}
+                for i, n in [(1, "bulbasaur"), (2, "ivysaur"), (3, "venusaur")]
+            ]},
+            f"{base}/evolution-chain/?limit=1000&offset=0": {"next": None, "results": [
+                {"url": f"{base}/evolution-chain/1/"}, {"url": f"{base}/evolution-chain/2/"}
+            ]},
+            f"{base}/evolution-chain/1/": {"chain": node("bulbasaur", 1, [
+                node("ivysaur", 2, [node("venusaur", 3)])
+            ])},
+            f"{base}/pokemon/1/": pokemon(1, "bulbasaur"),
+            f"{base}/pokemon/2/": pokemon(2, "ivysaur"),
+            f"{base}/pokemon/3/": pokemon(3, "venusaur"),
+        }
+        mock_get.side_effect = lambda url, timeout=None: Mock(json=lambda: responses[url], content=json.dumps(responses[url]).encode())
+
+        counter = RequestCounter()
+        results = list(fetch_pokemon_bulk(3, counter=counter))
+
+        self.assertEqual([pid for pid, _ in results], [1, 2, 3])
+        self.assertEqual(results[2][1].evolution_chain, ("bulbasaur", "ivysaur", "venusaur"))
+        self.assertTrue(results[2][1].is_evolved)
+        # 2 list pages + 1 chain + 3 members; chain 2 is never fetched
+        self.assertEqual(mock_get.call_count, 6)
+        self.assertEqual(counter.count, 6)
+
+        # Without a controller the rate-limit delay precedes every chain and member request
+        events = []
+        get = mock_get.side_effect
+        mock_get.side_effect = lambda url, timeout=None: events.append(url.split("/")[-2]) or get(url, timeout)
+        with patch("data_processing.extract.sleep", side_effect=lambda seconds: events.append(seconds)):
+            list(fetch_pokemon_bulk(3, delay=0.5))
+        self.assertEqual(events[2:], [0.5, "1", 0.5, "1", 0.5, "2", 0.5, "3"])
+
     def test_invalid_id(self):
         self.assertIsNone(fetch_pokemon_data(-1))
         self.assertIsNone(fetch_pokemon_data("abc"))
@@ -1,7 +1,10 @@
+import json
 import unittest
 from unittest.mock import MagicMock, patch
 import sqlite3
-from data_processing.load import create_connection, create_tables, load_pokemon
+from data_processing.aggregates import rebuild_aggregates
+from data_processing import load as load_module
+from data_processing.load import create_connection, create_tables, load_pokemon, SCHEMA_VERSION
 
 
 class TestLoad(unittest.TestCase):
@@ -25,9 +28,10 @@ class TestLoad(unittest.TestCase):
             "SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%';"
         ).fetchall()
         expected = {
-            "pokemon", "types", "abilities", "stats",
+            "pokemon", "pokemon_docs", "types", "abilities", "stats",
             "pokemon_types", "pokemon_abilities", "pokemon_stats",
-            "evolution_chains", "evolution_links"
+            "evolution_chains", "evolution_links", "evolution_edges", "evolution_closure",
+            "overall_aggregates", "type_aggregates", "stat_aggregates", "type_stat_aggregates"
         }
         self.assertSetEqual({t[0] for t in tables}, expected)
 
@@ -55,10 +59,16 @@ class TestLoad(unittest.TestCase):
         cur.execute("SELECT * FROM pokemon WHERE id=25")
         self.assertEqual(cur.fetchone()[1], "pikachu")
 
-        cur.execute("SELECT type_name FROM pokemon_types WHERE pokemon_id=25")
+        cur.execute("""
+            SELECT t.name FROM pokemon_types pt JOIN types t ON t.id = pt.type_id
+            WHERE pt.pokemon_id=25
+        """)
         self.assertEqual(cur.fetchone()[0], "electric")
 
-        cur.execute("SELECT base_stat FROM pokemon_stats WHERE pokemon_id=25 AND stat_name='hp'")
+        cur.execute("""
+            SELECT ps.base_stat FROM pokemon_stats ps JOIN stats s ON s.id = ps.stat_id
+            WHERE ps.pokemon_id=25 AND s.name='hp'
+        """)
         self.assertEqual(cur.fetchone()[0], 35)
 
         cur.execute("""
@@ -81,6 +91,214 @@ class TestLoad(unittest.TestCase):
         self.assertTrue(load_pokemon(self.conn, transformed))
         self.assertTrue(load_pokemon(self.conn, transformed))
 
+    def test_unchanged_reload_writes_nothing(self):
+        create_tables(self.conn)
+        transformed = {
+            "main": {"id": 25, "name": "pikachu", "is_evolved": True},
+            "types": ["electric"], "abilities": ["static"],
+            "stats": [{"stat_name": "hp", "base_stat": 35}],
+            "evolution_chain_identifier": "pichu",
+            "evolution_links": [{"name": "pichu", "stage": 1}, {"name": "pikachu", "stage": 2}]
+        }
+        self.assertTrue(load_pokemon(self.conn, transformed))
+        before = self.conn.total_changes
+        self.assertTrue(load_pokemon(self.conn, transformed))
+        self.assertEqual(self.conn.total_changes, before)
+
+    def test_changed_reload_updates_rows(self):
+        create_tables(self.conn)
+        transformed = {
+            "main": {"id": 25, "name": "pikachu", "is_evolved": True},
+            "types": ["electric"], "abilities": ["static", "lightning-rod"],
+            "stats": [{"stat_name": "hp", "base_stat": 35}, {"stat_name": "speed", "base_stat": 90}],
+            "evolution_chain_identifier": "pichu",
+            "evolution_links": [{"name": "pichu", "stage": 1}, {"name": "pikachu", "stage": 2}]
+        }
+        self.assertTrue(load_pokemon(self.conn, transformed))
+
+        transformed["types"] = ["electric", "fairy"]
+        transformed["abilities"] = ["static"]
+        transformed["stats"] = [{"stat_name": "hp", "base_stat": 40}, {"stat_name": "speed", "base_stat": 90}]
+        self.assertTrue(load_pokemon(self.conn, transformed))
+
+        cur = self.conn.cursor()
+        types = {r[0] for r in cur.execute(
+            "SELECT t.name FROM pokemon_types pt JOIN types t ON t.id = pt.type_id WHERE pt.pokemon_id=25")}
+        self.assertEqual(types, {"electric", "fairy"})
+        abilities = [r[0] for r in cur.execute(
+            "SELECT a.name FROM pokemon_abilities pa JOIN abilities a ON a.id = pa.ability_id WHERE pa.pokemon_id=25")]
+        self.assertEqual(abilities, ["static"])
+        stats = dict(cur.execute(
+            "SELECT s.name, ps.base_stat FROM pokemon_stats ps JOIN stats s ON s.id = ps.stat_id WHERE ps.pokemon_id=25"))
+        self.assertEqual(stats, {"hp": 40, "speed": 90})
+
+        doc = json.loads(cur.execute("SELECT doc FROM pokemon_docs WHERE pokemon_id=25").fetchone()[0])
+        self.assertEqual(doc["types"], ["electric", "fairy"])
+        self.assertEqual(doc["stats"][0], {"stat_name": "hp", "base_stat": 40})
+        self.assertEqual(doc["evolution_chain"], [{"name": "pichu", "stage": 1}, {"name": "pikachu", "stage": 2}])
+
+    def test_incremental_aggregates_match_rebuild(self):
+        create_tables(self.conn)
+
+        def record(pid, name, evolved, types, hp, speed):
+            return {
+                "main": {"id": pid, "name": name, "is_evolved": evolved},
+                "types": types, "abilities": [],
+                "stats": [{"stat_name": "hp", "base_stat": hp}, {"stat_name": "speed", "base_stat": speed}],
+                "evolution_chain_identifier": name, "evolution_links": [{"name": name, "stage": 1}],
+            }
+
+        load_pokemon(self.conn, record(1, "a", False, ["grass", "poison"], 45, 45))
+        load_pokemon(self.conn, record(2, "b", True, ["grass"], 80, 60))
+        load_pokemon(self.conn, record(3, "c", False, ["fire"], 39, 65))
+        # Drop b's maximum hp and move c to another type: bounds and counts must follow
+        load_pokemon(self.conn, record(2, "b", True, ["grass"], 60, 60))
+        load_pokemon(self.conn, record(3, "c", True, ["water"], 44, 43))
+
+        tables = ["overall_aggregates", "type_aggregates", "stat_aggregates", "type_stat_aggregates"]
+        incremental = {t: sorted(self.conn.execute(f"SELECT * FROM {t}").fetchall()) for t in tables}
+        rebuild_aggregates(self.conn.cursor())
+        rebuilt = {t: sorted(self.conn.execute(f"SELECT * FROM {t}").fetchall()) for t in tables}
+        self.assertEqual(incremental, rebuilt)
+
+        grass_hp = self.conn.execute("""
+            SELECT a.pokemon_count, a.total, a.min_stat, a.max_stat FROM type_stat_aggregates a
+            JOIN types t ON t.id = a.type_id JOIN stats s ON s.id = a.stat_id
+            WHERE t.name = 'grass' AND s.name = 'hp'
+        """).fetchone()
+        self.assertEqual(grass_hp, (2, 105, 45, 60))
+        self.assertIsNone(self.conn.execute(
+            "SELECT 1 FROM type_aggregates WHERE type_id = (SELECT id FROM types WHERE name = 'fire')").fetchone())
+
+    def test_evolution_closure_for_branching_chain(self):
+        create_tables(self.conn)
+        edges = [("eevee", "vaporeon"), ("eevee", "jolteon"), ("vaporeon", "mega-vaporeon")]
+        transformed = {
+            "main": {"id": 134, "name": "vaporeon", "is_evolved": True},
+            "types": ["water"], "abilities": [], "stats": [],
+            "evolution_chain_identifier": "eevee",
+            "evolution_links": [{"name": "eevee", "stage": 1}, {"name": "vaporeon", "stage": 2},
+                                {"name": "jolteon", "stage": 2}, {"name": "mega-vaporeon", "stage": 3}],
+            "evolution_edges": edges,
+        }
+        self.assertTrue(load_pokemon(self.conn, transformed))
+
+        descendants = self.conn.execute(
+            "SELECT descendant, depth FROM evolution_closure WHERE ancestor = 'eevee' AND depth > 0 ORDER BY depth, descendant"
+        ).fetchall()
+        self.assertEqual(descendants, [("jolteon", 1), ("vaporeon", 1), ("mega-vaporeon", 2)])
+        ancestors = self.conn.execute(
+            "SELECT ancestor, depth FROM evolution_closure WHERE descendant = 'mega-vaporeon' AND depth > 0 ORDER BY depth"
+        ).fetchall()
+        self.assertEqual(ancestors, [("vaporeon", 1), ("eevee", 2)])
+
+        # Dropping an edge on reload removes it from the closure as well
+        transformed["evolution_edges"] = edges[:2]
+        transformed["evolution_links"] = transformed["evolution_links"][:3]
+        self.assertTrue(load_pokemon(self.conn, transformed))
+        self.assertEqual(self.conn.execute(
+            "SELECT COUNT(*) FROM evolution_closure WHERE descendant = 'mega-vaporeon'"
+        ).fetchone()[0], 0)
+
+    def test_evolution_closure_rebuilt_only_when_chain_changes(self):
+        create_tables(self.conn)
+        edges = [("bulbasaur", "ivysaur"), ("ivysaur", "venusaur")]
+        links = [{"name": "bulbasaur", "stage": 1}, {"name": "ivysaur", "stage": 2}, {"name": "venusaur", "stage": 3}]
+        family = [
+            {"main": {"id": pid, "name": name, "is_evolved": pid > 1}, "types": ["grass"], "abilities": [], "stats": [],
+             "evolution_chain_identifier": "bulbasaur", "evolution_links": links, "evolution_edges": edges}
+            for pid, name in [(1, "bulbasaur"), (2, "ivysaur"), (3, "venusaur")]
+        ]
+
+        with patch("data_processing.load.rebuild_evolution_closure",
+                   wraps=load_module.rebuild_evolution_closure) as rebuild:
+            for member in family:
+                self.assertTrue(load_pokemon(self.conn, member))
+            self.assertEqual(rebuild.call_count, 1)  # siblings carry the same chain
+
+            family[0]["evolution_edges"] = edges[:1]
+            family[0]["evolution_links"] = links[:2]
+            self.assertTrue(load_pokemon(self.conn, family[0]))
+            self.assertEqual(rebuild.call_count, 2)
+        self.assertEqual(self.conn.execute(
+            "SELECT COUNT(*) FROM evolution_closure WHERE descendant = 'venusaur'"
+        ).fetchone()[0], 0)
+
+    def test_create_tables_backfills_linear_chains(self):
+        create_tables(self.conn)
+        self.conn.execute("INSERT INTO evolution_chains (id, chain_identifier) VALUES (1, 'bulbasaur'), (2, 'eevee')")
+        self.conn.executemany("INSERT INTO evolution_links VALUES (?, ?, ?)", [
+            (1, "bulbasaur", 1), (1, "ivysaur", 2), (1, "venusaur", 3),
+            (2, "eevee", 1), (2, "vaporeon", 2), (2, "jolteon", 2),
+        ])
+        self.conn.commit()
+
+        self.assertTrue(create_tables(self.conn))
+        edges = self.conn.execute("SELECT chain_id, parent_name, child_name FROM evolution_edges ORDER BY child_name").fetchall()
+        # Branching chains cannot be recovered from (possibly bogus) stages; they wait for the next ETL run
+        self.assertEqual(edges, [(1, "bulbasaur", "ivysaur"), (1, "ivysaur", "venusaur")])
+        self.assertEqual(self.conn.execute(
+            "SELECT depth FROM evolution_closure WHERE ancestor = 'bulbasaur' AND descendant = 'venusaur'"
+        ).fetchone()[0], 2)
+
+    def test_create_tables_migrates_legacy_schema(self):
+        self.conn.execute("CREATE TABLE pokemon (id INTEGER PRIMARY KEY, name TEXT UNIQUE NOT NULL, is_evolved BOOLEAN NOT NULL)")
+        self.assertTrue(create_tables(self.conn))
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(pokemon)")}
+        self.assertIn("content_hash", columns)
+
+    def test_create_tables_migrates_text_keys(self):
+        self.conn.executescript("""
+            CREATE TABLE pokemon (id INTEGER PRIMARY KEY, name TEXT UNIQUE NOT NULL, is_evolved BOOLEAN NOT NULL);
+            CREATE TABLE types (name TEXT PRIMARY KEY);
+            CREATE TABLE abilities (name TEXT PRIMARY KEY);
+            CREATE TABLE stats (name TEXT PRIMARY KEY);
+            CREATE TABLE pokemon_types (pokemon_id INTEGER, type_name TEXT, PRIMARY KEY (pokemon_id, type_name));
+            CREATE TABLE pokemon_abilities (pokemon_id INTEGER, ability_name TEXT, PRIMARY KEY (pokemon_id, ability_name));
+            CREATE TABLE pokemon_stats (pokemon_id INTEGER, stat_name TEXT, base_stat INTEGER NOT NULL,
+                                        PRIMARY KEY (pokemon_id, stat_name));
+            INSERT INTO pokemon VALUES (1, 'bulbasaur', 0);
+            INSERT INTO types VALUES ('grass'), ('poison');
+            INSERT INTO abilities VALUES ('overgrow');
+            INSERT INTO stats VALUES ('hp');
+            INSERT INTO pokemon_types VALUES (1, 'grass'), (1, 'poison');
+            INSERT INTO pokemon_abilities VALUES (1, 'overgrow');
+            INSERT INTO pokemon_stats VALUES (1, 'hp', 45);
+        """)
+
+        self.assertTrue(create_tables(self.conn))
+
+        self.assertEqual(self.conn.execute("PRAGMA user_version").fetchone()[0], SCHEMA_VERSION)
+        types = {r[0] for r in self.conn.execute(
+            "SELECT t.name FROM pokemon_types pt JOIN types t ON t.id = pt.type_id WHERE pt.pokemon_id = 1")}
+        self.assertEqual(types, {"grass", "poison"})
+        self.assertEqual(self.conn.execute(
+            "SELECT ps.base_stat FROM pokemon_stats ps JOIN stats s ON s.id = ps.stat_id WHERE s.name = 'hp'"
+        ).fetchone()[0], 45)
+        self.assertEqual(self.conn.execute("PRAGMA foreign_key_check").fetchall(), [])
+
+        # Rows loaded before pokemon_docs existed get their document backfilled
+        doc = json.loads(self.conn.execute("SELECT doc FROM pokemon_docs WHERE pokemon_id = 1").fetchone()[0])
+        self.assertEqual(doc["name"], "bulbasaur")
+        self.assertEqual(sorted(doc["types"]), ["grass", "poison"])
+        self.assertEqual(doc["stats"], [{"stat_name": "hp", "base_stat": 45}])
+
+    def test_lookup_ids_are_cached_per_connection(self):
+        conn = create_connection(":memory:")
+        create_tables(conn)
+        for pid, name in [(1, "bulbasaur"), (2, "ivysaur")]:
+            load_pokemon(conn, {
+                "main": {"id": pid, "name": name, "is_evolved": pid > 1},
+                "types": ["grass", "poison"], "abilities": ["overgrow"],
+                "stats": [{"stat_name": "hp", "base_stat": 45 + pid}],
+                "evolution_chain_identifier": "bulbasaur",
+                "evolution_links": [{"name": "bulbasaur", "stage": 1}, {"name": "ivysaur", "stage": 2}]
+            })
+        # Four names looked up once, then served from the cache for the second Pokémon
+        self.assertEqual(conn.lookup_cache.misses, 4)
+        self.assertEqual(conn.lookup_cache.hits, 4)
+        conn.close()
+
     def test_load_missing_main(self):
         self.assertFalse(load_pokemon(self.conn, {}))
 
@@ -1,8 +1,22 @@
 # tests/test_main.py
 
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
 import unittest
-from unittest.mock import patch, MagicMock
-from main import run_etl_pipeline
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch, MagicMock, ANY
+from data_processing.records import RawPokemon
+from data_processing.archive import create_archive
+from data_processing.load import create_connection, create_tables
+from data_processing.work_queue import claim_batch
+from constants import API_DELAY
+from main import (
+    run_etl_pipeline, run_queue_worker, run_sharded_etl, run_blue_green_etl,
+    ensure_schema, parse_args,
+)
 
 
 class TestMain(unittest.TestCase):
@@ -24,17 +38,17 @@ class TestMain(unittest.TestCase):
         mock_create_tables.return_value = True
 
         mock_fetch.side_effect = [
-            {"id": 1, "name": "bulbasaur", "is_evolved": False,
-             "types": [], "abilities": [], "stats": {}, "evolution_chain": ["bulbasaur"]},
-            {"id": 2, "name": "ivysaur", "is_evolved": True,
-             "types": [], "abilities": [], "stats": {}, "evolution_chain": ["bulbasaur", "ivysaur"]}
+            RawPokemon(id=1, name="bulbasaur", is_evolved=False,
+                       types=(), abilities=(), stats=(), evolution_chain=("bulbasaur",)),
+            RawPokemon(id=2, name="ivysaur", is_evolved=True,
+                       types=(), abilities=(), stats=(), evolution_chain=("bulbasaur", "ivysaur"))
         ]
 
         mock_transform.side_effect = lambda d: {
-            "main": {"id": d["id"], "name": d["name"], "is_evolved": d["is_evolved"]},
+            "main": {"id": d.id, "name": d.name, "is_evolved": d.is_evolved},
             "types": [], "abilities": [], "stats": [],
-            "evolution_chain_identifier": d["evolution_chain"][0],
-            "evolution_links": [{"name": n, "stage": i + 1} for i, n in enumerate(d["evolution_chain"])]
+            "evolution_chain_identifier": d.evolution_chain[0],
+            "evolution_links": [{"name": n, "stage": i + 1} for i, n in enumerate(d.evolution_chain)]
         }
 
         mock_load.return_value = True
@@ -47,6 +61,261 @@ class TestMain(unittest.TestCase):
         self.assertEqual(mock_transform.call_count, 2)
         self.assertEqual(mock_load.call_count, 2)
 
+    @patch("main.POKEMON_TO_FETCH", 2)
+    @patch("main.sleep")
+    @patch("main.load_pokemon")
+    @patch("main.fetch_pokemon_data")
+    @patch("main.fetch_pokemon_bulk")
+    @patch("main.create_tables")
+    @patch("main.create_connection")
+    def test_pipeline_chain_strategy(
+        self, mock_create_conn, mock_create_tables,
+        mock_bulk, mock_fetch, mock_load, mock_sleep
+    ):
+        mock_create_conn.return_value = MagicMock()
+        mock_bulk.return_value = iter([
+            (1, RawPokemon(id=1, name="bulbasaur", is_evolved=False,
+                           types=(), abilities=(), stats=(), evolution_chain=("bulbasaur",))),
+            (2, None),
+        ])
+        mock_load.return_value = True
+
+        self.assertTrue(run_etl_pipeline(strategy="chain"))
+        mock_bulk.assert_called_once_with(2, counter=ANY, delay=API_DELAY)
+        mock_fetch.assert_not_called()
+        self.assertEqual(mock_load.call_count, 1)
+
+    @patch("main.POKEMON_TO_FETCH", 3)
+    @patch("main.sleep")
+    @patch("main.load_pokemon")
+    @patch("main.fetch_pokemon_data")
+    @patch("main.create_tables")
+    @patch("main.create_connection")
+    def test_pipeline_adaptive_skips_fixed_delay(
+        self, mock_create_conn, mock_create_tables, mock_fetch, mock_load, mock_sleep
+    ):
+        mock_create_conn.return_value = MagicMock()
+        mock_fetch.side_effect = lambda i, controller, counter=None: RawPokemon(
+            id=i, name=f"poke{i}", is_evolved=False,
+            types=(), abilities=(), stats=(("hp", 1),), evolution_chain=(f"poke{i}",)
+        )
+        mock_load.return_value = True
+
+        self.assertTrue(run_etl_pipeline(adaptive=True))
+        self.assertEqual(mock_load.call_count, 3)
+        mock_sleep.assert_not_called()
+
+    @patch("main.POKEMON_TO_FETCH", 4)
+    @patch("main.sleep")
+    @patch("main.fetch_pokemon_data")
+    def test_queue_worker_drains_queue(self, mock_fetch, mock_sleep):
+        mock_fetch.side_effect = lambda i, counter=None: None if i == 3 else RawPokemon(
+            id=i, name=f"poke{i}", is_evolved=False, types=("normal",),
+            abilities=(), stats=(("hp", 10),), evolution_chain=(f"poke{i}",)
+        )
+        with tempfile.TemporaryDirectory() as tmp:
+            db_file = os.path.join(tmp, "pokemon.db")
+            state_file = os.path.join(tmp, "state.db")
+
+            self.assertTrue(run_queue_worker("w1", db_file, state_file, batch_size=2))
+
+            state = sqlite3.connect(state_file)
+            statuses = dict(state.execute("SELECT pokemon_id, status FROM etl_work_queue"))
+            state.close()
+            # ID 3 is retried until QUEUE_MAX_ATTEMPTS, then parked as failed
+            self.assertEqual(statuses, {1: "done", 2: "done", 3: "failed", 4: "done"})
+
+    @patch("main.POKEMON_TO_FETCH", 1)
+    @patch("main.QUEUE_LEASE_SECONDS", 0.3)
+    @patch("main.sleep")
+    @patch("main.fetch_pokemon_data")
+    def test_queue_worker_keeps_lease_through_slow_item(self, mock_fetch, mock_sleep):
+        with tempfile.TemporaryDirectory() as tmp:
+            state_file = os.path.join(tmp, "state.db")
+
+            stolen = []
+
+            def slow_fetch(i, counter=None):
+                if mock_fetch.call_count == 1:
+                    time.sleep(0.8)  # e.g. retries with backoff: well past the lease
+                    other = create_connection(state_file)
+                    stolen.extend(claim_batch(other, "w2", 1, 0.3))
+                    other.close()
+                return RawPokemon(id=i, name=f"poke{i}", is_evolved=False, types=("normal",),
+                                  abilities=(), stats=(("hp", 10),), evolution_chain=(f"poke{i}",))
+
+            mock_fetch.side_effect = slow_fetch
+            self.assertTrue(run_queue_worker("w1", os.path.join(tmp, "pokemon.db"), state_file, batch_size=1))
+            self.assertEqual(stolen, [])  # the lease was renewed while the item was in flight
+            self.assertEqual(mock_fetch.call_count, 1)
+
+    @patch("main.POKEMON_TO_FETCH", 3)
+    @patch("main.sleep")
+    @patch("main.load_pokemon", return_value=True)
+    @patch("main.fetch_pokemon_data")
+    def test_queue_worker_second_refresh_needs_reset(self, mock_fetch, mock_load, mock_sleep):
+        mock_fetch.side_effect = lambda i, counter=None: RawPokemon(
+            id=i, name=f"poke{i}", is_evolved=False, types=("normal",),
+            abilities=(), stats=(("hp", 10),), evolution_chain=(f"poke{i}",)
+        )
+        loaded = lambda: sorted(call.args[1].id for call in mock_load.call_args_list)
+        with tempfile.TemporaryDirectory() as tmp:
+            db_file = os.path.join(tmp, "pokemon.db")
+            state_file = os.path.join(tmp, "state.db")
+
+            self.assertTrue(run_queue_worker("w1", db_file, state_file))
+            self.assertEqual(loaded(), [1, 2, 3])
+
+            # Same state file, no reset: the queue is already drained
+            mock_load.reset_mock()
+            self.assertTrue(run_queue_worker("w2", db_file, state_file))
+            self.assertEqual(loaded(), [])
+
+            mock_load.reset_mock()
+            self.assertTrue(run_queue_worker("w3", db_file, state_file, reset_queue=True))
+            self.assertEqual(loaded(), [1, 2, 3])
+
+    @patch("main.POKEMON_TO_FETCH", 3)
+    @patch("main.sleep")
+    @patch("main.fetch_pokemon_data")
+    def test_archive_then_replay_without_network(self, mock_fetch, mock_sleep):
+        mock_fetch.side_effect = lambda i, controller=None, counter=None: RawPokemon(
+            id=i, name=f"poke{i}", is_evolved=False, types=("normal",),
+            abilities=(), stats=(("hp", 10 * i),), evolution_chain=(f"poke{i}",)
+        )
+        with tempfile.TemporaryDirectory() as tmp:
+            archive_file = os.path.join(tmp, "archive.db")
+            state_file = os.path.join(tmp, "state.db")
+            self.assertTrue(run_etl_pipeline(db_file=os.path.join(tmp, "a.db"), archive=True,
+                                             archive_file=archive_file, state_file=state_file))
+
+            ledger = sqlite3.connect(state_file)
+            run = ledger.execute(
+                "SELECT status, success_count, failure_count, rows_written, config FROM etl_runs"
+            ).fetchone()
+            ledger.close()
+            self.assertEqual(run[:3], ("succeeded", 3, 0))
+            self.assertGreater(run[3], 0)
+            self.assertIn('"last_id": 3', run[4])
+
+            mock_fetch.reset_mock()
+            replay_db = os.path.join(tmp, "b.db")
+            self.assertTrue(run_etl_pipeline(strategy="replay", db_file=replay_db, archive_file=archive_file,
+                                             state_file=state_file))
+            mock_fetch.assert_not_called()
+
+            conn = sqlite3.connect(replay_db)
+            rows = conn.execute("""
+                SELECT p.name, ps.base_stat FROM pokemon p
+                JOIN pokemon_stats ps ON ps.pokemon_id = p.id ORDER BY p.id
+            """).fetchall()
+            conn.close()
+            self.assertEqual(rows, [("poke1", 10), ("poke2", 20), ("poke3", 30)])
+
+    def test_worker_must_opt_out_of_blue_green(self):
+        with patch("sys.stderr"), self.assertRaises(SystemExit):
+            parse_args(["--worker"])
+        with patch("sys.stderr"), self.assertRaises(SystemExit):
+            parse_args(["--reset-queue"])
+        args = parse_args(["--worker", "--in-place", "--reset-queue"])
+        self.assertTrue(args.worker and args.in_place and args.reset_queue)
+
+    @patch("main.POKEMON_TO_FETCH", 2)
+    @patch("main.sleep")
+    @patch("main.fetch_pokemon_data")
+    def test_every_entry_point_is_recorded(self, mock_fetch, mock_sleep):
+        mock_fetch.side_effect = lambda i, controller=None, counter=None: None if i == 2 else RawPokemon(
+            id=i, name=f"poke{i}", is_evolved=False, types=("normal",),
+            abilities=(), stats=(("hp", 10),), evolution_chain=(f"poke{i}",)
+        )
+        # Shards run in child processes and hand their failures back to be dead-lettered
+        fake_shard = lambda index, ids, shard_file: (
+            shard_file, [i for i in ids if i != 1],
+            [(1, "extract", "ExtractError", "Could not fetch data", None)] if 1 in ids else [],
+            (3 * len(ids), 2, 1),
+        )
+
+        with tempfile.TemporaryDirectory() as tmp:
+            state_file = os.path.join(tmp, "state.db")
+            archive_file = os.path.join(tmp, "archive.db")
+            archive = create_connection(archive_file)
+            create_archive(archive)
+            archive.execute("INSERT INTO raw_payloads (pokemon_id, payload, fetched_at) VALUES (9, x'00', 0)")
+            archive.commit()
+            archive.close()
+
+            self.assertFalse(run_etl_pipeline(strategy="replay", db_file=os.path.join(tmp, "a.db"),
+                                              archive_file=archive_file, state_file=state_file))
+            self.assertTrue(run_queue_worker("w1", os.path.join(tmp, "b.db"), state_file))
+            parked = lambda: sqlite3.connect(state_file).execute(
+                "SELECT pokemon_id, stage FROM dead_letters ORDER BY pokemon_id").fetchall()
+            self.assertEqual(parked(), [(2, "extract"), (9, "transform")])
+            with patch("main.run_shard", fake_shard), patch("main.ProcessPoolExecutor", ThreadPoolExecutor), \
+                    patch("main.merge_shards", side_effect=lambda conn, files: len(files)):
+                self.assertTrue(run_sharded_etl(2, os.path.join(tmp, "c.db"), state_file))
+
+            state = sqlite3.connect(state_file)
+            runs = state.execute("SELECT strategy, status, success_count, failure_count FROM etl_runs ORDER BY id")
+            self.assertEqual(runs.fetchall(), [("replay", "failed", 0, 1), ("worker", "succeeded", 1, 3),
+                                               ("sharded", "succeeded", 1, 1)])
+            # Every path fills in the lookup-cache counters; shards report theirs (and their HTTP calls) back
+            counters = state.execute("SELECT http_calls, cache_hits, cache_misses FROM etl_runs ORDER BY id")
+            self.assertEqual(counters.fetchall(), [(0, 0, 0), (0, 0, 2), (6, 4, 2)])
+            state.close()
+            # Every path parks its failures; the sharded run loaded ID 2 in place, so it is resolved
+            self.assertEqual(parked(), [(1, "extract"), (9, "transform")])
+
+    @patch("main.POKEMON_TO_FETCH", 2)
+    @patch("main.EXPORT_PACKED_SNAPSHOT", False)
+    @patch("main.sleep")
+    @patch("main.fetch_pokemon_data")
+    def test_blue_green_status_recorded_after_publish(self, mock_fetch, mock_sleep):
+        mock_fetch.side_effect = lambda i, controller=None, counter=None: RawPokemon(
+            id=i, name=f"poke{i}", is_evolved=False, types=("normal",),
+            abilities=(), stats=(("hp", 10),), evolution_chain=(f"poke{i}",)
+        )
+        with tempfile.TemporaryDirectory() as tmp:
+            paths = {
+                "serving_file": os.path.join(tmp, "pokemon.db"),
+                "staging_file": os.path.join(tmp, "pokemon.staging.db"),
+                "state_file": os.path.join(tmp, "state.db"),
+            }
+            with patch("main.verify_database", return_value=False):
+                self.assertFalse(run_blue_green_etl(**paths))
+            self.assertTrue(run_blue_green_etl(**paths))
+
+            state = sqlite3.connect(paths["state_file"])
+            runs = state.execute("SELECT status, success_count, error FROM etl_runs ORDER BY id").fetchall()
+            state.close()
+            self.assertEqual(runs, [("failed", 2, "Staging verification failed"), ("succeeded", 2, None)])
+
+    @patch("main.EXPORT_PACKED_SNAPSHOT", False)
+    def test_ensure_schema_upgrades_bundled_database(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            serving = os.path.join(tmp, "pokemon.db")
+            staging = os.path.join(tmp, "staging.db")
+            shutil.copyfile(os.path.join(os.path.dirname(__file__), "..", "db", "pokemon_database.db"), serving)
+
+            self.assertTrue(ensure_schema(serving, staging))
+            inode = os.stat(serving).st_ino
+            self.assertTrue(ensure_schema(serving, staging))
+            self.assertEqual(os.stat(serving).st_ino, inode)  # already current: not republished
+
+            conn = sqlite3.connect(serving)
+            pokemon = conn.execute("SELECT COUNT(*) FROM pokemon").fetchone()[0]
+            self.assertGreater(pokemon, 0)
+            self.assertEqual(conn.execute("PRAGMA user_version").fetchone()[0], 3)
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM pokemon_docs").fetchone()[0], pokemon)
+            self.assertEqual(conn.execute("SELECT pokemon_count FROM overall_aggregates").fetchone()[0], pokemon)
+            self.assertGreater(conn.execute("SELECT COUNT(*) FROM evolution_closure").fetchone()[0], 0)
+            conn.close()
+
+    def test_replay_requires_archive(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            self.assertFalse(run_etl_pipeline(strategy="replay", db_file=os.path.join(tmp, "a.db"),
+                                              archive_file=os.path.join(tmp, "missing.db"),
+                                              state_file=os.path.join(tmp, "state.db")))
+
     @patch("main.create_connection")
     def test_pipeline_db_failure(self, mock_conn):
         mock_conn.return_value = None
@@ -0,0 +1,99 @@
+import json
+import os
+import sqlite3
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+
+from app import app
+from database import get_db
+from data_processing.load import create_connection, load_pokemon
+from data_processing.packed_snapshot import PackedSnapshot, export_packed_snapshot, current_snapshot
+from main import run_blue_green
+from stat_matrix import StatMatrix
+from tests.helpers import transformed, create_test_database
+
+
+class TestPackedSnapshot(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_file = os.path.join(self.tmp.name, "pokemon.db")
+        self.packed_file = os.path.join(self.tmp.name, "pokemon.bin")
+        create_test_database(self.db_file, [
+            transformed(pid, name, ["bulbasaur", "ivysaur"] if pid < 4 else [name])
+            for pid, name in [(1, "bulbasaur"), (2, "ivysaur"), (4, "charmander")]
+        ])
+        self.conn = sqlite3.connect(self.db_file, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+
+    def tearDown(self):
+        app.dependency_overrides.clear()
+        self.conn.close()
+        self.tmp.cleanup()
+
+    def test_export_round_trip_without_copies(self):
+        self.assertTrue(export_packed_snapshot(self.db_file, self.packed_file))
+        packed = PackedSnapshot(self.packed_file)
+
+        self.assertEqual(packed.ids.tolist(), [1, 2, 4])
+        self.assertFalse(packed.ids.flags.owndata)  # a view onto the mapping
+        self.assertEqual(packed.stats[:, 0].tolist(), [41, 42, 44])
+        self.assertEqual(packed.stats[0, 1], -1)  # attack missing
+        self.assertEqual(packed.names(), ["bulbasaur", "ivysaur", "charmander"])
+        self.assertEqual(packed.row_of_name("charmander"), 2)
+        self.assertIsNone(packed.row_of_name("pikachu"))
+        self.assertIsNone(packed.row_of(3))
+        self.assertEqual((packed.is_evolved(1), packed.type_set(1)), (True, ["grass", "poison"]))
+
+        doc = self.conn.execute("SELECT doc FROM pokemon_docs WHERE pokemon_id = 2").fetchone()[0]
+        self.assertEqual(packed.doc(packed.row_of(2)), doc)
+
+    def test_current_snapshot_follows_source_and_new_versions(self):
+        with patch("data_processing.packed_snapshot.PACKED_SNAPSHOT_FILE", self.packed_file):
+            self.assertIsNone(current_snapshot(self.conn))  # nothing exported yet
+            export_packed_snapshot(self.db_file)
+            first = current_snapshot(self.conn)
+            self.assertIs(current_snapshot(self.conn), first)
+            self.assertIsNone(current_snapshot(sqlite3.connect(":memory:")))
+
+            # The ETL rewrites the database: the old image no longer matches until re-exported
+            writer = create_connection(self.db_file)
+            load_pokemon(writer, transformed(5, "charmeleon", ["charmander", "charmeleon"]))
+            writer.close()
+            self.assertIsNone(current_snapshot(self.conn))
+            export_packed_snapshot(self.db_file)
+            self.assertEqual(current_snapshot(self.conn).ids.tolist(), [1, 2, 4, 5])
+
+    def test_api_serves_from_packed_snapshot(self):
+        export_packed_snapshot(self.db_file, self.packed_file)
+        app.dependency_overrides[get_db] = lambda: self.conn
+        client = TestClient(app)
+
+        with patch("data_processing.packed_snapshot.PACKED_SNAPSHOT_FILE", self.packed_file), \
+                patch.object(PackedSnapshot, "doc", autospec=True, side_effect=PackedSnapshot.doc) as packed_doc:
+            self.assertEqual(client.get("/pokemon/4").json()["name"], "charmander")
+            self.assertEqual(client.get("/pokemon").json(), ["bulbasaur", "ivysaur", "charmander"])
+            batch = client.get("/pokemon/batch", params={"ids": "4,9", "names": "ivysaur"}).json()
+            self.assertEqual([item["found"] for item in batch], [True, False, True])
+            self.assertEqual(packed_doc.call_count, 3)
+
+            packed = current_snapshot(self.conn)
+            from_packed = StatMatrix.from_packed(packed).similar([1], 2)
+            self.assertEqual(from_packed, StatMatrix.from_connection(self.conn).similar([1], 2))
+
+    def test_blue_green_publish_exports_image(self):
+        staging = os.path.join(self.tmp.name, "staging.db")
+        self.assertTrue(run_blue_green(lambda db_file: True, self.db_file, staging, self.packed_file))
+
+        packed = PackedSnapshot(self.packed_file)
+        self.assertEqual(packed.count, 3)
+        self.assertEqual(json.loads(packed.doc(0))["name"], "bulbasaur")
+        with patch("data_processing.packed_snapshot.PACKED_SNAPSHOT_FILE", self.packed_file):
+            self.assertIsNotNone(current_snapshot(self.conn))
+
+
+if __name__ == "__main__":
+    unittest.main()
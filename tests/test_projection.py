@@ -0,0 +1,37 @@
+import json
+import unittest
+
+from data_processing.projection import project_json
+
+
+class TestProjection(unittest.TestCase):
+
+    def setUp(self):
+        self.payload = {
+            "abilities": [{"ability": {"name": "static"}}],
+            "game_indices": [{"game_index": i, "version": {"name": "red"}} for i in range(5)],
+            "id": 25,
+            "moves": [{"move": {"name": "tricky ]} \" [{ name"}, "details": [[], {}, None, 1.5]}],
+            "name": "pikachu",
+            "sprites": {"front": None, "other": {"art": {"url": "x"}}},
+            "types": [{"type": {"name": "electric"}}],
+        }
+
+    def test_projects_requested_fields(self):
+        text = json.dumps(self.payload)
+        result = project_json(text.encode(), ["id", "name", "types", "abilities", "species"])
+        self.assertEqual(result, {k: self.payload[k] for k in ("id", "name", "types", "abilities")})
+
+    def test_whitespace_and_nested_fields(self):
+        text = json.dumps(self.payload, indent=4)
+        self.assertEqual(project_json(text, ["sprites", "moves"]),
+                         {"sprites": self.payload["sprites"], "moves": self.payload["moves"]})
+
+    def test_malformed_json(self):
+        for bad in ['[1, 2]', '{"moves": [1, "x]', '{"id" 1}', '{"moves": [1] "id": 2}']:
+            with self.assertRaises(ValueError):
+                project_json(bad, ["id"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+import sqlite3
+import unittest
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+
+from app import app
+from database import get_state_db
+from crud.etl import list_runs, get_run
+from data_processing.run_ledger import RunMetrics, create_run_ledger, start_run, finish_run, compare_runs
+
+
+def record_run(conn, strategy, seconds, loaded, failed=0):
+    run_id = start_run(conn, strategy, {"first_id": 1, "last_id": loaded + failed})
+    metrics = RunMetrics()
+    metrics.stage_seconds["extract"] = seconds
+    metrics.http_calls = 3 * (loaded + failed)
+    metrics.cache_hits, metrics.cache_misses = 9, 1
+    metrics.success_count, metrics.failure_count = loaded, failed
+    with patch("data_processing.run_ledger.time", return_value=1000.0 + seconds):
+        conn.execute("UPDATE etl_runs SET started_at = 1000.0 WHERE id = ?", (run_id,))
+        finish_run(conn, run_id, metrics, succeeded=loaded > 0)
+    return run_id
+
+
+class TestRunLedger(unittest.TestCase):
+
+    def setUp(self):
+        self.conn = sqlite3.connect(":memory:", check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.assertTrue(create_run_ledger(self.conn))
+
+    def tearDown(self):
+        app.dependency_overrides.clear()
+        self.conn.close()
+
+    def test_stage_timing(self):
+        metrics = RunMetrics()
+        with patch("data_processing.run_ledger.perf_counter", side_effect=[0.0, 0.5, 1.0, 1.25, 2.0, 2.0]):
+            self.assertEqual(list(metrics.timed_iter([1, 2], "extract")), [1, 2])
+        self.assertEqual(metrics.stage_seconds["extract"], 0.75)
+
+    def test_record_list_and_compare(self):
+        first = record_run(self.conn, "per_id", seconds=10, loaded=20)
+        second = record_run(self.conn, "per_id", seconds=20, loaded=20)
+
+        runs = list_runs(self.conn)
+        self.assertEqual([run["id"] for run in runs], [second, first])
+        self.assertEqual(runs[1]["status"], "succeeded")
+        self.assertEqual(runs[1]["pokemon_per_second"], 2.0)
+        self.assertEqual(runs[1]["cache_hit_rate"], 0.9)
+        self.assertEqual(runs[1]["config"], {"first_id": 1, "last_id": 20})
+
+        comparison = compare_runs(get_run(self.conn, first), get_run(self.conn, second))
+        self.assertEqual(comparison["pokemon_per_second"]["change_pct"], -50.0)
+        self.assertEqual(comparison["http_calls"]["change_pct"], 0.0)
+
+    def test_runs_endpoints(self):
+        first = record_run(self.conn, "chain", seconds=10, loaded=20)
+        record_run(self.conn, "per_id", seconds=5, loaded=5)
+        latest = record_run(self.conn, "chain", seconds=8, loaded=20)
+        app.dependency_overrides[get_state_db] = lambda: self.conn
+        client = TestClient(app)
+
+        runs = client.get("/etl/runs", params={"strategy": "chain"}).json()
+        self.assertEqual([run["id"] for run in runs], [latest, first])
+
+        comparison = client.get("/etl/runs/compare").json()
+        self.assertEqual((comparison["baseline"]["id"], comparison["candidate"]["id"]), (first, latest))
+        self.assertEqual(comparison["metrics"]["duration_seconds"]["change_pct"], -20.0)
+        self.assertEqual(client.get("/etl/runs/999").status_code, 404)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,101 @@
+import json
+import os
+import sqlite3
+import tempfile
+import unittest
+from unittest.mock import patch
+from data_processing.load import create_tables, load_pokemon
+from data_processing.shard import split_id_range, run_shard, merge_shards
+from tests.helpers import transformed
+
+
+class TestShard(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _shard(self, name, records):
+        path = os.path.join(self.tmp.name, name)
+        conn = sqlite3.connect(path)
+        create_tables(conn)
+        for record in records:
+            load_pokemon(conn, record)
+        conn.close()
+        return path
+
+    def test_split_id_range(self):
+        self.assertEqual(split_id_range(1, 7, 3), [[1, 2, 3], [4, 5], [6, 7]])
+        self.assertEqual(split_id_range(1, 2, 8), [[1], [2]])
+
+    def test_merge_deduplicates_lookups_and_chains(self):
+        chain = ["bulbasaur", "ivysaur", "venusaur"]
+        # A shard that saw another chain first, so its chain ids differ from the other shard
+        first = self._shard("a.db", [transformed(4, "charmander", ["charmander"]),
+                                     transformed(1, "bulbasaur", chain)])
+        second = self._shard("b.db", [transformed(2, "ivysaur", chain),
+                                      transformed(3, "venusaur", chain)])
+
+        conn = sqlite3.connect(":memory:")
+        create_tables(conn)
+        self.assertEqual(merge_shards(conn, [first, second]), 2)
+
+        self.assertEqual(conn.execute("SELECT COUNT(*) FROM pokemon").fetchone()[0], 4)
+        self.assertEqual(conn.execute("SELECT COUNT(*) FROM types").fetchone()[0], 2)
+        self.assertEqual(conn.execute("SELECT COUNT(*) FROM evolution_chains").fetchone()[0], 2)
+        rows = conn.execute("""
+            SELECT el.pokemon_name FROM evolution_links el
+            JOIN evolution_chains ec ON ec.id = el.chain_id
+            WHERE ec.chain_identifier = 'bulbasaur' ORDER BY el.stage
+        """).fetchall()
+        self.assertEqual([r[0] for r in rows], chain)
+        closure = conn.execute("""
+            SELECT ec.chain_identifier, cl.depth FROM evolution_closure cl
+            JOIN evolution_chains ec ON ec.id = cl.chain_id
+            WHERE cl.ancestor = 'bulbasaur' AND cl.descendant = 'venusaur'
+        """).fetchall()
+        self.assertEqual(closure, [("bulbasaur", 2)])
+        conn.close()
+
+    def test_merge_updates_changed_pokemon(self):
+        conn = sqlite3.connect(":memory:")
+        create_tables(conn)
+        load_pokemon(conn, transformed(1, "bulbasaur", ["bulbasaur"]))
+
+        changed = transformed(1, "bulbasaur", ["bulbasaur"])
+        changed["types"] = ["grass"]
+        changed["stats"] = [{"stat_name": "hp", "base_stat": 99}]
+        shard = self._shard("a.db", [changed])
+
+        self.assertEqual(merge_shards(conn, [shard]), 1)
+        types = conn.execute("SELECT t.name FROM pokemon_types pt JOIN types t ON t.id = pt.type_id").fetchall()
+        self.assertEqual(types, [("grass",)])
+        self.assertEqual(conn.execute("SELECT base_stat FROM pokemon_stats").fetchone()[0], 99)
+        doc = json.loads(conn.execute("SELECT doc FROM pokemon_docs WHERE pokemon_id = 1").fetchone()[0])
+        self.assertEqual(doc["types"], ["grass"])
+        self.assertEqual(conn.execute("SELECT pokemon_count, max_stat FROM stat_aggregates").fetchall(), [(1, 99)])
+        self.assertEqual(conn.execute("SELECT COUNT(*) FROM type_aggregates").fetchone()[0], 1)
+        conn.close()
+
+    @patch("data_processing.shard.sleep")
+    @patch("data_processing.shard.fetch_pokemon_data")
+    def test_run_shard_writes_private_file(self, mock_fetch, mock_sleep):
+        mock_fetch.side_effect = lambda i, counter=None: None if i == 2 else {
+            "id": i, "name": f"poke{i}", "is_evolved": False, "types": ["normal"],
+            "abilities": [], "stats": {"hp": 10}, "evolution_chain": [f"poke{i}"]
+        }
+        path = os.path.join(self.tmp.name, "shard_0.db")
+
+        shard_file, loaded, failures, (http_calls, cache_hits, cache_misses) = run_shard(0, [1, 2, 3], path)
+
+        self.assertEqual((shard_file, loaded), (path, [1, 3]))
+        self.assertEqual(failures, [(2, "extract", "ExtractError", "Could not fetch data", None)])
+        conn = sqlite3.connect(path)
+        self.assertEqual(conn.execute("SELECT COUNT(*) FROM pokemon").fetchone()[0], 2)
+        conn.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
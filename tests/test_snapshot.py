@@ -0,0 +1,92 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+from data_processing.load import create_tables, load_pokemon
+from unittest.mock import patch
+from data_processing.snapshot import (
+    prepare_staging, verify_database, publish_snapshot, refresh_lock, RefreshInProgress,
+)
+from main import run_blue_green
+
+
+def make_db(path, names):
+    conn = sqlite3.connect(path)
+    create_tables(conn)
+    for i, name in enumerate(names, start=1):
+        load_pokemon(conn, {
+            "main": {"id": i, "name": name, "is_evolved": False},
+            "types": [], "abilities": [], "stats": [],
+            "evolution_chain_identifier": name,
+            "evolution_links": [{"name": name, "stage": 1}]
+        })
+    conn.close()
+
+
+def names_in(path):
+    conn = sqlite3.connect(path)
+    try:
+        return [r[0] for r in conn.execute("SELECT name FROM pokemon ORDER BY id")]
+    finally:
+        conn.close()
+
+
+class TestSnapshot(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.serving = os.path.join(self.tmp.name, "serving.db")
+        self.staging = os.path.join(self.tmp.name, "staging.db")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_staging_is_seeded_from_serving(self):
+        make_db(self.serving, ["bulbasaur"])
+        self.assertTrue(prepare_staging(self.serving, self.staging))
+        self.assertEqual(names_in(self.staging), ["bulbasaur"])
+
+    def test_verify_rejects_empty_database(self):
+        make_db(self.staging, [])
+        self.assertFalse(verify_database(self.staging))
+
+    def test_publish_swaps_atomically(self):
+        make_db(self.serving, ["bulbasaur"])
+        reader = sqlite3.connect(self.serving)
+        make_db(self.staging, ["bulbasaur", "ivysaur"])
+
+        self.assertTrue(verify_database(self.staging))
+        self.assertTrue(publish_snapshot(self.staging, self.serving))
+
+        self.assertEqual(names_in(self.serving), ["bulbasaur", "ivysaur"])
+        self.assertFalse(os.path.exists(self.staging))
+        # An already-open reader keeps its consistent view of the old snapshot
+        self.assertEqual(reader.execute("SELECT COUNT(*) FROM pokemon").fetchone()[0], 1)
+        reader.close()
+
+    def test_refresh_lock_is_exclusive(self):
+        with refresh_lock(self.serving):
+            with self.assertRaises(RefreshInProgress):
+                with refresh_lock(self.serving):
+                    pass
+        with refresh_lock(self.serving):  # released on exit
+            pass
+
+    @patch("main.EXPORT_PACKED_SNAPSHOT", False)
+    def test_concurrent_refresh_leaves_running_build_alone(self):
+        make_db(self.serving, ["bulbasaur"])
+
+        def build(db_file):
+            # A second refresh while this one builds must not touch our staging file
+            with self.assertRaises(RefreshInProgress):
+                run_blue_green(lambda other: self.fail("second build ran"), self.serving, self.staging)
+            self.assertEqual(names_in(db_file), ["bulbasaur"])
+            make_db(db_file, ["bulbasaur", "ivysaur"])
+            return True
+
+        self.assertTrue(run_blue_green(build, self.serving, self.staging))
+        self.assertEqual(names_in(self.serving), ["bulbasaur", "ivysaur"])
+
+
+if __name__ == "__main__":
+    unittest.main()
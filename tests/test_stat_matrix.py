@@ -0,0 +1,113 @@
+import os
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+from app import app
+from database import get_db
+from data_processing.load import create_connection, create_tables, load_pokemon
+from stat_matrix import StatMatrix, get_stat_matrix
+
+
+def stat_record(pid, name, types, stats):
+    names = ["hp", "attack", "defense", "special-attack", "special-defense", "speed"]
+    return {
+        "main": {"id": pid, "name": name, "is_evolved": False},
+        "types": types, "abilities": [],
+        "stats": [{"stat_name": n, "base_stat": v} for n, v in zip(names, stats)],
+        "evolution_chain_identifier": name,
+        "evolution_links": [{"name": name, "stage": 1}],
+    }
+
+
+POKEMON = [
+    (1, "tank", ["normal"], [150, 50, 150, 50, 150, 20]),
+    (2, "bulky", ["water"], [140, 55, 140, 45, 140, 25]),
+    (3, "sweeper", ["electric"], [40, 130, 40, 130, 40, 150]),
+    (4, "speedy", ["water"], [45, 120, 45, 125, 45, 140]),
+    (5, "average", ["normal"], [80, 80, 80, 80, 80, 80]),
+]
+
+
+class TestStatMatrix(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_file = os.path.join(self.tmp.name, "pokemon.db")
+        conn = create_connection(self.db_file)
+        create_tables(conn)
+        for pid, name, types, stats in POKEMON:
+            load_pokemon(conn, stat_record(pid, name, types, stats))
+        conn.close()
+        self.conn = create_connection(self.db_file)
+
+    def tearDown(self):
+        self.conn.close()
+        app.dependency_overrides.clear()
+        self.tmp.cleanup()
+
+    def test_nearest_spread(self):
+        matrix = get_stat_matrix(self.conn)
+        for metric in ("cosine", "euclidean"):
+            neighbours = matrix.similar([1], 2, metric)[0]
+            self.assertEqual(neighbours[0][:2], (2, "bulky"), metric)
+            self.assertNotIn(1, [pid for pid, _, _ in neighbours])
+
+    def test_type_filter_and_batch(self):
+        matrix = get_stat_matrix(self.conn)
+        results = matrix.similar([3, 99, 1], 1, "cosine", types=["water"])
+        self.assertEqual(results[0][0][0], 4)
+        self.assertIsNone(results[1])
+        self.assertEqual(results[2][0][0], 2)
+
+    def test_matrix_is_cached_until_snapshot_changes(self):
+        first = get_stat_matrix(self.conn)
+        self.assertIs(get_stat_matrix(self.conn), first)
+
+        load_pokemon(self.conn, stat_record(6, "newcomer", ["fire"], [1, 2, 3, 4, 5, 6]))
+        os.utime(self.db_file, ns=(0, time.time_ns() + 10**9))
+        self.assertIsNot(get_stat_matrix(self.conn), first)
+
+    def test_full_dex_query_is_fast(self):
+        rng = np.random.default_rng(0)
+        n = 1025
+        matrix = StatMatrix(range(1, n + 1), [f"p{i}" for i in range(n)], rng.integers(1, 255, (n, 6)),
+                            ["normal", "water"], rng.random((n, 2)) > 0.5)
+        matrix.similar([1], 10)
+        start = time.perf_counter()
+        for i in range(100):
+            matrix.similar([i + 1], 10, "euclidean", types=["water"])
+        self.assertLess((time.perf_counter() - start) / 100, 0.005)
+
+    def test_similar_endpoints(self):
+        def override_db():
+            conn = create_connection(self.db_file)
+            try:
+                yield conn
+            finally:
+                conn.close()
+
+        app.dependency_overrides[get_db] = override_db
+        client = TestClient(app)
+
+        response = client.get("/pokemon/3/similar", params={"k": 1})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()[0]["name"], "speedy")
+        self.assertEqual(client.get("/pokemon/42/similar").status_code, 404)
+
+        batch = client.get("/pokemon/similar", params={"ids": "1,42", "k": 1, "metric": "euclidean"}).json()
+        self.assertEqual([item["id"] for item in batch], [1, 42])
+        self.assertEqual(batch[0]["similar"][0]["name"], "bulky")
+        self.assertIsNone(batch[1]["similar"])
+
+        with patch("routers.similarity.BATCH_MAX_ITEMS", 2):
+            response = client.get("/pokemon/similar", params={"ids": "1,2,3"})
+        self.assertEqual(response.status_code, 422)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,46 @@
+import os
+import tempfile
+import unittest
+
+from app import app
+from tests.helpers import transformed, create_test_database, serve_database
+
+
+class TestStatsRouter(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_file = os.path.join(self.tmp.name, "pokemon.db")
+        charmander = transformed(4, "charmander", ["charmander"])
+        charmander["types"] = ["fire"]
+        create_test_database(self.db_file, [
+            transformed(1, "bulbasaur", ["bulbasaur", "ivysaur"]),
+            transformed(2, "ivysaur", ["bulbasaur", "ivysaur"]),
+            charmander,
+        ])
+        self.client = serve_database(self.db_file)
+
+    def tearDown(self):
+        app.dependency_overrides.clear()
+        self.tmp.cleanup()
+
+    def test_type_stats(self):
+        response = self.client.get("/stats/types")
+        self.assertEqual(response.status_code, 200)
+        by_type = {entry["type"]: entry for entry in response.json()}
+        self.assertEqual(set(by_type), {"fire", "grass", "poison"})
+
+        grass = by_type["grass"]
+        self.assertEqual((grass["pokemon_count"], grass["evolved_count"], grass["unevolved_count"]), (2, 1, 1))
+        self.assertEqual(grass["stats"], [{"stat_name": "hp", "average": 41.5, "min": 41, "max": 42}])
+
+    def test_overview(self):
+        overview = self.client.get("/stats/overview").json()
+        self.assertEqual(overview["pokemon_count"], 3)
+        self.assertEqual(overview["evolved_count"], 1)
+        self.assertEqual(overview["type_count"], 3)
+        self.assertEqual(overview["stats"], [{"stat_name": "hp", "average": 42.33, "min": 41, "max": 44}])
+
+
+if __name__ == "__main__":
+    unittest.main()
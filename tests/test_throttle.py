@@ -0,0 +1,85 @@
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch, Mock
+import requests
+from data_processing.throttle import AdaptiveController, RequestCounter, get_with_retry, parse_retry_after
+
+
+class TestThrottle(unittest.TestCase):
+
+    @patch("data_processing.throttle.sleep")
+    @patch("data_processing.throttle.requests.get")
+    def test_retries_429_respecting_retry_after(self, mock_get, mock_sleep):
+        throttled = Mock(status_code=429, headers={"Retry-After": "7"})
+        ok = Mock(status_code=200, headers={})
+        mock_get.side_effect = [throttled, ok]
+
+        counter, other_run = RequestCounter(), RequestCounter()
+        response = get_with_retry("https://pokeapi.co/api/v2/pokemon/1/", counter=counter)
+
+        self.assertIs(response, ok)
+        self.assertEqual(mock_get.call_count, 2)
+        self.assertEqual((counter.count, other_run.count), (2, 0))  # retries counted, per run
+        self.assertGreaterEqual(mock_sleep.call_args[0][0], 7)
+
+    @patch("data_processing.throttle.sleep")
+    @patch("data_processing.throttle.requests.get")
+    def test_not_found_is_not_retried(self, mock_get, mock_sleep):
+        resp = Mock(status_code=404, headers={})
+        resp.raise_for_status.side_effect = requests.exceptions.HTTPError("404 Not Found")
+        mock_get.return_value = resp
+
+        with self.assertRaises(requests.exceptions.HTTPError):
+            get_with_retry("https://pokeapi.co/api/v2/pokemon/99999/")
+        self.assertEqual(mock_get.call_count, 1)
+        mock_sleep.assert_not_called()
+
+    @patch("data_processing.throttle.sleep")
+    @patch("data_processing.throttle.requests.get")
+    def test_gives_up_after_max_retries(self, mock_get, mock_sleep):
+        mock_get.side_effect = requests.exceptions.Timeout("slow")
+
+        with self.assertRaises(requests.exceptions.Timeout):
+            get_with_retry("https://pokeapi.co/api/v2/pokemon/1/", max_retries=2)
+        self.assertEqual(mock_get.call_count, 3)
+
+    def test_controller_additive_increase_and_latency_backoff(self):
+        controller = AdaptiveController(initial=2, max_limit=4)
+        for _ in range(10):
+            controller.record_success(0.1)
+        self.assertEqual(controller.limit, 4)
+
+        controller.record_success(1.0)  # 10x the baseline latency
+        self.assertLess(controller.limit, 4)
+
+    def test_controller_multiplicative_decrease_on_throttle(self):
+        controller = AdaptiveController(initial=8, max_limit=8)
+        controller.record_throttle()
+        controller.record_throttle()  # same congestion event, ignored
+        self.assertEqual(controller.limit, 4)
+
+    @patch("data_processing.throttle.requests.get")
+    def test_waiting_for_a_slot_is_not_upstream_latency(self, mock_get):
+        def constant_latency(url, timeout):
+            time.sleep(0.02)
+            return Mock(status_code=200, headers={})
+        mock_get.side_effect = constant_latency
+        controller = AdaptiveController(initial=2, max_limit=16)
+
+        with patch.object(controller, "_decrease", wraps=controller._decrease) as decrease:
+            with ThreadPoolExecutor(max_workers=16) as pool:
+                list(pool.map(lambda i: get_with_retry(f"https://pokeapi.co/api/v2/pokemon/{i}/", controller),
+                              range(64)))
+
+        decrease.assert_not_called()
+        self.assertGreater(controller.limit, 2)
+
+    def test_parse_retry_after(self):
+        self.assertEqual(parse_retry_after("3"), 3.0)
+        self.assertIsNone(parse_retry_after(None))
+        self.assertIsNone(parse_retry_after("soon"))
+
+
+if __name__ == "__main__":
+    unittest.main()
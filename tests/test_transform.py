@@ -1,5 +1,9 @@
 import unittest
-from data_processing.transform import transform_pokemon_data
+from concurrent.futures import ThreadPoolExecutor
+from data_processing.records import RawPokemon, TransformedPokemon
+from unittest.mock import patch
+from data_processing.transform import transform_pokemon_data, transform_batch, transform_in_processes
+from data_processing import transform
 
 
 class TestTransform(unittest.TestCase):
@@ -16,20 +20,56 @@ class TestTransform(unittest.TestCase):
         }
         out = transform_pokemon_data(raw)
 
-        self.assertEqual(out["main"]["id"], 25)
-        self.assertEqual(out["main"]["name"], "pikachu")
-        self.assertTrue(out["main"]["is_evolved"])
+        self.assertIsInstance(out, TransformedPokemon)
+        self.assertEqual(out.id, 25)
+        self.assertEqual(out.name, "pikachu")
+        self.assertTrue(out.is_evolved)
 
-        self.assertEqual(out["types"], ["electric"])
-        self.assertEqual(out["abilities"], ["static", "lightning-rod"])
+        self.assertEqual(out.types, ("electric",))
+        self.assertEqual(out.abilities, ("static", "lightning-rod"))
 
-        self.assertEqual(len(out["stats"]), 2)
-        self.assertIn({"stat_name": "hp", "base_stat": 35}, out["stats"])
+        self.assertEqual(len(out.stats), 2)
+        self.assertIn(("hp", 35), out.stats)
 
-        self.assertEqual(out["evolution_chain_identifier"], "pichu")
-        self.assertEqual(len(out["evolution_links"]), 3)
-        self.assertEqual(out["evolution_links"][1]["name"], "pikachu")
-        self.assertEqual(out["evolution_links"][1]["stage"], 2)
+        self.assertEqual(out.evolution_chain_identifier, "pichu")
+        self.assertEqual(len(out.evolution_links), 3)
+        self.assertEqual(out.evolution_links[1], ("pikachu", 2))
+
+    def test_transform_raw_record_reuses_fields(self):
+        raw = RawPokemon(
+            id=25, name="pikachu", types=("electric",), abilities=("static",),
+            stats=(("hp", 35), ("attack", 55)), evolution_chain=("pichu", "pikachu"), is_evolved=True
+        )
+        out = transform_pokemon_data(raw)
+
+        self.assertIs(out.types, raw.types)
+        self.assertIs(out.stats, raw.stats)
+        self.assertEqual(out, TransformedPokemon.from_dict(out.to_dict()))
+
+    def test_branching_chain_stages_by_depth(self):
+        raw = {
+            "id": 134, "name": "vaporeon", "is_evolved": True,
+            "types": ["water"], "abilities": [], "stats": {"hp": 130},
+            "evolution_chain": ["eevee", "vaporeon", "jolteon", "flareon"],
+            "evolution_edges": [["eevee", "vaporeon"], ["eevee", "jolteon"], ["eevee", "flareon"]]
+        }
+        out = transform_pokemon_data(raw)
+
+        self.assertEqual(dict(out.evolution_links), {"eevee": 1, "vaporeon": 2, "jolteon": 2, "flareon": 2})
+        self.assertIn(("eevee", "jolteon"), out.evolution_edges)
+
+    def test_content_hash_ignores_list_order(self):
+        raw = {
+            "id": 25, "name": "pikachu", "is_evolved": True,
+            "types": ["electric", "fairy"], "abilities": ["static"],
+            "stats": {"hp": 35, "attack": 55}, "evolution_chain": ["pichu", "pikachu"]
+        }
+        reordered = dict(raw, types=["fairy", "electric"], stats={"attack": 55, "hp": 35})
+        changed = dict(raw, stats={"hp": 36, "attack": 55})
+
+        digest = transform_pokemon_data(raw).content_hash
+        self.assertEqual(digest, transform_pokemon_data(reordered).content_hash)
+        self.assertNotEqual(digest, transform_pokemon_data(changed).content_hash)
 
     def test_missing_required_fields(self):
         raw = {"id": 1, "name": "missing_is_evolved"}
@@ -48,7 +88,72 @@ class TestTransform(unittest.TestCase):
             "types": "fire", "abilities": [], "stats": {}, "evolution_chain": ["a"]
         }
         out = transform_pokemon_data(raw)
-        self.assertEqual(out["types"], ["fire"])
+        self.assertEqual(out.types, ("fire",))
+
+    def test_batch_matches_per_record_transform(self):
+        chain = ["bulbasaur", "ivysaur", "venusaur"]
+        records = [
+            RawPokemon(id=i + 1, name=name, types=("grass",), abilities=(), stats=(("hp", 45 + i),),
+                       evolution_chain=tuple(chain), is_evolved=i > 0)
+            for i, name in enumerate(chain)
+        ] + [
+            {"id": 4, "name": "charmander", "is_evolved": False, "types": "fire", "abilities": [],
+             "stats": {"hp": 39.5, "speed": "fast"}, "evolution_chain": ["charmander"]},
+            {"id": 5, "name": "broken"},
+            {"id": 6, "name": "test", "is_evolved": False, "types": [], "abilities": [], "stats": {},
+             "evolution_chain": []},
+            None,
+        ]
+
+        with patch.object(transform, "evolution_stages", wraps=transform.evolution_stages) as stages:
+            batch = transform_batch(records)
+        self.assertEqual(stages.call_count, 2)  # once per distinct chain, not per Pokémon
+        self.assertEqual(batch, [transform_pokemon_data(record) for record in records])
+        self.assertEqual(batch[3].stats, (("hp", 39),))
+        self.assertEqual([out is None for out in batch], [False] * 4 + [True] * 3)
+
+    def test_batch_rejects_malformed_stats_per_record(self):
+        records = [
+            RawPokemon(id=i, name=f"poke{i}", types=("normal",), abilities=(), stats=stats,
+                       evolution_chain=(f"poke{i}",), is_evolved=False)
+            for i, stats in enumerate([(("hp", 10),), None, (("hp",),), (("hp", 7.9),)], start=1)
+        ]
+        batch = transform_batch(records)
+        self.assertEqual(batch, [transform_pokemon_data(record) for record in records])
+        self.assertEqual([out is None for out in batch], [False, True, True, False])
+        self.assertEqual(batch[3].stats, (("hp", 7),))
+
+    @patch("data_processing.transform.ProcessPoolExecutor")
+    def test_single_worker_skips_the_pool(self, pool):
+        records = [{"id": 1, "name": "poke1", "is_evolved": False, "types": [], "abilities": [],
+                    "stats": {"hp": 1}, "evolution_chain": ["poke1"]}]
+        self.assertEqual(list(transform_in_processes(records, workers=1)), transform_batch(records))
+        pool.assert_not_called()
+
+    def test_transform_in_processes_keeps_order(self):
+        records = [
+            {"id": i, "name": f"poke{i}", "is_evolved": False, "types": ["normal"], "abilities": [],
+             "stats": {"hp": i}, "evolution_chain": [f"poke{i}"]}
+            for i in range(1, 8)
+        ]
+        results = list(transform_in_processes(records, workers=2, batch_size=3))
+        self.assertEqual([out.id for out in results], list(range(1, 8)))
+        self.assertEqual(results, transform_batch(records))
+
+    def test_transform_in_processes_streams_its_input(self):
+        pulled = []
+
+        def records():
+            for i in range(1, 101):
+                pulled.append(i)
+                yield {"id": i, "name": f"poke{i}", "is_evolved": False, "types": ["normal"], "abilities": [],
+                       "stats": {"hp": i}, "evolution_chain": [f"poke{i}"]}
+
+        with patch.object(transform, "ProcessPoolExecutor", ThreadPoolExecutor):
+            results = transform_in_processes(records(), workers=2, batch_size=1)
+            self.assertEqual(next(results).id, 1)
+            self.assertLessEqual(len(pulled), 5)  # 2 * workers batches in flight, plus one refill
+            self.assertEqual([out.id for out in results], list(range(2, 101)))
 
 
 if __name__ == "__main__":
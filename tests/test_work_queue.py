@@ -0,0 +1,70 @@
+import sqlite3
+import unittest
+from unittest.mock import patch
+from data_processing.work_queue import (
+    create_work_queue, enqueue_ids, claim_batch, heartbeat,
+    complete_item, fail_item, release_leases, queue_summary,
+)
+
+
+class TestWorkQueue(unittest.TestCase):
+
+    def setUp(self):
+        self.conn = sqlite3.connect(":memory:")
+        create_work_queue(self.conn)
+        enqueue_ids(self.conn, range(1, 6))
+
+    def tearDown(self):
+        self.conn.close()
+
+    def test_enqueue_is_idempotent(self):
+        self.assertEqual(enqueue_ids(self.conn, range(1, 8)), 2)
+        self.assertEqual(queue_summary(self.conn)["pending"], 7)
+
+    def test_claims_do_not_overlap(self):
+        first = claim_batch(self.conn, "w1", 3)
+        second = claim_batch(self.conn, "w2", 3)
+        self.assertEqual(first, [1, 2, 3])
+        self.assertEqual(second, [4, 5])
+        self.assertEqual(claim_batch(self.conn, "w3", 3), [])
+
+    @patch("data_processing.work_queue.time")
+    def test_expired_lease_is_reclaimed(self, mock_time):
+        mock_time.return_value = 1000.0
+        claim_batch(self.conn, "crashed", 2, lease_seconds=60)
+
+        mock_time.return_value = 1030.0
+        self.assertEqual(claim_batch(self.conn, "w2", 2), [3, 4])
+
+        mock_time.return_value = 1061.0
+        self.assertEqual(claim_batch(self.conn, "w2", 5), [1, 2, 5])
+        # The crashed worker can no longer complete items it lost
+        self.assertFalse(complete_item(self.conn, "crashed", 1))
+        self.assertTrue(complete_item(self.conn, "w2", 1))
+
+    @patch("data_processing.work_queue.time")
+    def test_heartbeat_extends_lease(self, mock_time):
+        mock_time.return_value = 1000.0
+        claim_batch(self.conn, "w1", 2, lease_seconds=60)
+        mock_time.return_value = 1050.0
+        self.assertEqual(heartbeat(self.conn, "w1", lease_seconds=60), 2)
+        mock_time.return_value = 1070.0
+        self.assertEqual(claim_batch(self.conn, "w2", 5), [3, 4, 5])
+
+    def test_failures_retry_until_max_attempts(self):
+        for attempt in range(2):
+            self.assertEqual(claim_batch(self.conn, "w1", 1), [1])
+            fail_item(self.conn, "w1", 1, "boom", max_attempts=2)
+        row = self.conn.execute(
+            "SELECT status, attempts, last_error FROM etl_work_queue WHERE pokemon_id = 1"
+        ).fetchone()
+        self.assertEqual(row, ("failed", 2, "boom"))
+
+    def test_release_returns_items_to_pending(self):
+        claim_batch(self.conn, "w1", 2)
+        self.assertEqual(release_leases(self.conn, "w1"), 2)
+        self.assertEqual(queue_summary(self.conn)["pending"], 5)
+
+
+if __name__ == "__main__":
+    unittest.main()